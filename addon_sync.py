@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Incremental add-on sync from the staging directory into the server
+
+Replaces a plain `cp -r` on container start. A manifest in the target
+directory records every file this tool installed with its hash, size and
+modification time, so a restart with unchanged add-ons only stats files.
+Changed files are hard-linked from staging when both sides share a
+filesystem, reflinked where the filesystem supports it, and copied
+otherwise. Files that were installed earlier but have since been removed
+from staging are pruned; packs the server ships with are never touched.
+
+Usage: python3 addon_sync.py <source dir> <target dir> [<source> <target> ...]
+"""
+
+import errno
+import fcntl
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from pack_files import file_hash, write_json
+
+MANIFEST_NAME = ".addon_sync.json"
+
+# ioctl to share extents between files (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+
+
+def install(source: Path, target: Path) -> str:
+    """Place `source` at `target` atomically; returns how ("link", "reflink" or "copy")"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f".{target.name}.sync")
+    partial.unlink(missing_ok=True)
+    try:
+        os.link(source, partial)
+        method = "link"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        if _reflink(source, partial):
+            method = "reflink"
+        else:
+            shutil.copyfile(source, partial)
+            method = "copy"
+    shutil.copymode(source, partial)
+    os.replace(partial, target)
+    return method
+
+
+def _load_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text()).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def sync(source: str | Path, target: str | Path) -> dict:
+    """Make the add-on files under `target` match `source`"""
+    source, target = Path(source), Path(target)
+    started = time.perf_counter()
+    manifest_path = target / MANIFEST_NAME
+    previous = _load_manifest(manifest_path)
+    current = {}
+    stats = {"files": 0, "unchanged": 0, "link": 0, "reflink": 0, "copy": 0, "removed": 0}
+
+    if source.is_dir():
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                path = Path(root) / name
+                rel = path.relative_to(source).as_posix()
+                st = path.stat()
+                entry = previous.get(rel)
+                if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                    digest = entry["hash"]
+                else:
+                    digest = file_hash(path)
+                current[rel] = {"hash": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                stats["files"] += 1
+
+                installed = target / rel
+                if (entry and entry["hash"] == digest and installed.is_file()
+                        and installed.stat().st_size == st.st_size):
+                    stats["unchanged"] += 1
+                    continue
+                stats[install(path, installed)] += 1
+
+    # Prune files we installed earlier that are gone from staging
+    emptied = set()
+    for rel in previous.keys() - current.keys():
+        stale = target / rel
+        try:
+            stale.unlink()
+            stats["removed"] += 1
+        except FileNotFoundError:
+            pass
+        emptied.update(stale.parents)
+    for directory in sorted(emptied, key=lambda p: len(p.parts), reverse=True):
+        if directory != target and target in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+
+    if current or previous:
+        target.mkdir(parents=True, exist_ok=True)
+        write_json(manifest_path, {"files": current})
+
+    stats["seconds"] = round(time.perf_counter() - started, 4)
+    return stats
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) < 2 or len(argv) % 2:
+        print(__doc__.strip().splitlines()[-1])
+        return 1
+
+    for source, target in zip(argv[::2], argv[1::2]):
+        stats = sync(source, target)
+        changed = stats["link"] + stats["reflink"] + stats["copy"]
+        print(
+            f"{source} -> {target}: {stats['files']} files, {changed} updated "
+            f"({stats['link']} linked, {stats['reflink']} reflinked, {stats['copy']} copied), "
+            f"{stats['removed']} removed in {stats['seconds']:.3f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from addon_sync import sync
+from pack_files import PACK_TYPES
+from pack_index import ManifestError, PackIndex, read_manifest
+
+logger = logging.getLogger(__name__)
+
+# Behavior pack files that Bedrock's `reload` command picks up live;
+# anything else (entities, items, resource packs, manifests) needs a restart
+RELOADABLE_PREFIXES = ("functions/", "scripts/")
+
+
+def pack_files(pack_dir: Path) -> dict[str, tuple[int, int]]:
+    """(size, mtime) of every file in a pack, keyed by pack-relative path"""
+    files = {}
+    for root, _, names in os.walk(pack_dir):
+        for name in names:
+            path = Path(root) / name
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files[path.relative_to(pack_dir).as_posix()] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def _manifest_identity(path: Path) -> Optional[tuple]:
+    """The parts of a manifest that Bedrock only reads at startup"""
+    try:
+        manifest = read_manifest(path)
+    except (OSError, ManifestError):
+        return None
+    header = manifest["header"]
+    return (
+        header["uuid"],
+        tuple(header["version"]),
+        repr(manifest.get("modules")),
+        repr(manifest.get("dependencies")),
+    )
+
+
+class AddonWatcher:
+    """Polls the add-on staging directory and applies changes to a running server
+
+    Changes are debounced: nothing is applied until the staging tree has been
+    stable for `debounce` seconds, so an editor saving many files (or a git
+    checkout) is handled as one change. Changed pack types are then synced
+    into the live directories with addon_sync, and the server is sent
+    `reload` when only functions or scripts changed, or restarted when the
+    change needs it (new, removed or resource packs, manifest changes, other
+    behavior pack files).
+
+    The watcher also keeps the manager's `addon_index` of staged packs and
+    definitions up to date, so the add-on API never has to walk the tree.
+    """
+
+    def __init__(self, manager, staging: str | Path = '/app/custom_addons',
+                 live: str | Path = '/app', interval: float = 2.0, debounce: float = 2.0):
+        self.manager = manager
+        self.staging = Path(staging)
+        self.live = Path(live)
+        self.interval = interval
+        self.debounce = debounce
+        self.last_result: Optional[dict] = None
+        self.index = PackIndex(self.staging, persist=False)
+        manager.addon_index = self.index
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_environment(cls, manager) -> Optional["AddonWatcher"]:
+        """Watcher for the staging directory, unless ADDON_WATCH=0 or it does not exist"""
+        staging = Path(os.environ.get('ADDON_STAGING_DIR', '/app/custom_addons'))
+        if os.environ.get('ADDON_WATCH', '1') == '0' or not staging.is_dir():
+            return None
+        return cls(
+            manager,
+            staging=staging,
+            live=manager.directory,
+            interval=float(os.environ.get('ADDON_WATCH_INTERVAL', '2')),
+            debounce=float(os.environ.get('ADDON_WATCH_DEBOUNCE', '2')),
+        )
+
+    def snapshot(self) -> dict[str, tuple]:
+        """(files, manifest identity) of every staged pack, keyed by "<pack type>/<pack>"
+
+        The manifest identity is captured here rather than compared with the
+        live copy later, since synced files may be hard links to staging.
+        """
+        packs = {}
+        for pack_type in PACK_TYPES:
+            root = self.staging / pack_type
+            if not root.is_dir():
+                continue
+            for entry in os.scandir(root):
+                if entry.is_dir():
+                    pack_dir = Path(entry.path)
+                    packs[f"{pack_type}/{entry.name}"] = (
+                        pack_files(pack_dir), _manifest_identity(pack_dir / "manifest.json")
+                    )
+        return packs
+
+    def plan(self, before: dict, after: dict) -> dict:
+        """Which packs changed and whether `reload` is enough to apply them"""
+        changed = sorted(
+            pack for pack in before.keys() | after.keys() if before.get(pack) != after.get(pack)
+        )
+        reasons = []
+        for pack in changed:
+            if pack not in before or pack not in after:
+                reasons.append(f"{pack} {'added' if pack in after else 'removed'}")
+                continue
+            if pack.startswith("resource_packs/"):
+                reasons.append(f"{pack} is a resource pack")
+                continue
+            (old, old_manifest), (new, new_manifest) = before[pack], after[pack]
+            if new_manifest is None or new_manifest != old_manifest:
+                reasons.append(f"{pack} manifest changed")
+                continue
+            files = {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+            files.discard("manifest.json")
+            static = sorted(path for path in files if not path.startswith(RELOADABLE_PREFIXES))
+            if static:
+                reasons.append(f"{pack} changed {static[0]}" + (f" (+{len(static) - 1} more)" if len(static) > 1 else ""))
+        return {"packs": changed, "restart": bool(reasons), "reasons": reasons}
+
+    async def apply(self, before: dict, after: dict) -> dict:
+        """Sync the changed pack types and reload or restart the server"""
+        plan = self.plan(before, after)
+        for pack_type in sorted({pack.split("/", 1)[0] for pack in plan["packs"]}):
+            stats = await asyncio.to_thread(sync, self.staging / pack_type, self.live / pack_type)
+            logger.info(f"[ADDONS] Synced {pack_type}: {stats}")
+        await self.refresh_index()
+
+        if not self.manager.running:
+            action = "none"
+        elif plan["restart"]:
+            action = "restart"
+            logger.info(f"[ADDONS] Restarting server: {'; '.join(plan['reasons'])}")
+            await self.manager.stop_server()
+            await self.manager.start_server()
+            await self.manager.wait_until_ready()
+        else:
+            action = "reload"
+            logger.info(f"[ADDONS] Reloading {', '.join(plan['packs'])}")
+            await self.manager.send_command("reload")
+
+        self.last_result = {**plan, "action": action, "applied_at": datetime.now().isoformat()}
+        return self.last_result
+
+    async def refresh_index(self):
+        """Rescan the staged packs; only changed files are reparsed"""
+        try:
+            await asyncio.to_thread(self.index.scan)
+        except OSError as e:
+            logger.error(f"[ADDONS] Failed to index add-ons: {e}")
+
+    async def run(self):
+        baseline = last = await asyncio.to_thread(self.snapshot)
+        await self.refresh_index()
+        loop = asyncio.get_running_loop()
+        changed_at = loop.time()
+        while True:
+            await asyncio.sleep(self.interval)
+            current = await asyncio.to_thread(self.snapshot)
+            if current != last:
+                last, changed_at = current, loop.time()
+                continue
+            if current != baseline and loop.time() - changed_at >= self.debounce:
+                try:
+                    await self.apply(baseline, current)
+                except Exception as e:
+                    logger.error(f"[ADDONS] Failed to apply add-on changes: {e}")
+                baseline = current
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+            logger.info(f"[ADDONS] Watching {self.staging} for changes")
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            "watching": self.running,
+            "staging": str(self.staging),
+            "interval": self.interval,
+            "debounce": self.debounce,
+            "last_change": self.last_result,
+        }
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import queue
+import re
+import shutil
+import tarfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, Optional
+
+from console_events import HEADER_PATTERN
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Seconds a reader waits for the next uploaded chunk before giving up
+CHUNK_TIMEOUT = 300
+
+EXPORT_FORMATS = ("tar", "zip")
+
+# `save query` lists the files to copy as "path:length, path:length, ..."
+SAVE_FILES_PATTERN = re.compile(r"\S:\d+\s*$")
+
+
+def parse_save_query(line: str) -> Optional[list[tuple[str, int]]]:
+    """Files and lengths from the line `save query` prints once data is saved"""
+    header = HEADER_PATTERN.match(line)
+    message = header.group("message") if header else line.strip()
+    if not SAVE_FILES_PATTERN.search(message):
+        return None
+
+    files = []
+    for entry in message.split(", "):
+        path, sep, length = entry.rpartition(":")
+        if not sep or not path or not length.isdigit():
+            return None
+        files.append((path, int(length)))
+    return files
+
+
+def safe_path(path: str) -> str:
+    """Normalise a world-relative path, rejecting absolute or escaping ones"""
+    parts = PurePosixPath(path.replace("\\", "/")).parts
+    if not parts or parts[0] == "/" or ".." in parts:
+        raise ValueError(f"Unsafe path in backup: {path}")
+    return "/".join(part for part in parts if part != ".")
+
+
+class ChunkReader:
+    """Blocking file-like reader over chunks handed over through a queue
+
+    Lets a worker thread consume a request body that arrives on the event
+    loop: the producer puts bytes chunks and finally None, and `read` never
+    holds more than the current chunk. A producer that fails puts an
+    exception instead, which `read` raises so the consumer aborts rather
+    than treating a truncated body as complete. A producer that goes silent
+    for `timeout` seconds is treated the same way.
+    """
+
+    def __init__(self, maxsize: int = 8, timeout: float = CHUNK_TIMEOUT):
+        self.chunks: queue.Queue = queue.Queue(maxsize)
+        self.timeout = timeout
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = self.chunks.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No data received for {self.timeout}s")
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class _ChunkSink:
+    """Write-only, unseekable sink whose output is drained by a generator"""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return iter(chunks)
+
+
+def mount_points() -> set[str]:
+    """Paths something is mounted on, such as Docker bind mounts of single files"""
+    try:
+        with open("/proc/self/mountinfo") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return set()
+    points = set()
+    for line in lines:
+        fields = line.split(" ")
+        if len(fields) > 4:
+            # Spaces and other special characters are escaped as octal
+            points.add(re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4]))
+    return points
+
+
+def scan_world(worlds_dir: Path) -> list[tuple[str, int]]:
+    """Every file under the worlds directory, for backups while stopped"""
+    files = []
+    for root, _, names in os.walk(worlds_dir):
+        for name in names:
+            path = Path(root) / name
+            files.append((path.relative_to(worlds_dir).as_posix(), path.stat().st_size))
+    return sorted(files)
+
+
+class BackupStore:
+    """Content-addressed store of world snapshots
+
+    File contents are stored once under `objects/<sha256[:2]>/<sha256>`
+    however many snapshots reference them, and each snapshot is a JSON
+    manifest mapping world-relative paths to object hashes. A stat cache
+    (size, mtime, inode, copied length) remembers the hash of every file
+    from the last backup, so LevelDB table files that have not changed since
+    are neither read nor hashed again: a backup reads only changed data.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.snapshots = self.root / "snapshots"
+        self._lock = threading.Lock()
+        self._cache_path = self.root / "stat_cache.json"
+        self._cache: Optional[dict] = None
+
+    def _ensure_dirs(self):
+        for path in (self.objects, self.snapshots, self.root / "tmp"):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def _load_cache(self) -> dict:
+        if self._cache is None:
+            try:
+                self._cache = json.loads(self._cache_path.read_text())
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self):
+        partial = self._cache_path.with_suffix(".tmp")
+        partial.write_text(json.dumps(self._cache))
+        os.replace(partial, self._cache_path)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def _store_stream(self, chunks: Iterable[bytes]) -> tuple[str, int, bool]:
+        """Hash and store a stream of bytes; returns (hash, size, newly stored)"""
+        digest = hashlib.sha256()
+        size = 0
+        partial = self.root / "tmp" / uuid.uuid4().hex
+        try:
+            with open(partial, "wb") as out:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            target = self.object_path(digest.hexdigest())
+            if target.exists():
+                return digest.hexdigest(), size, False
+            target.parent.mkdir(exist_ok=True)
+            os.replace(partial, target)
+            return digest.hexdigest(), size, True
+        finally:
+            partial.unlink(missing_ok=True)
+
+    @staticmethod
+    def _read(path: Path, length: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def create(self, worlds_dir: str | Path, files: list[tuple[str, int]],
+               online: bool = False, label: Optional[str] = None) -> dict:
+        """Snapshot the first `length` bytes of each (path, length) under worlds_dir"""
+        worlds_dir = Path(worlds_dir)
+        with self._lock:
+            self._ensure_dirs()
+            cache = self._load_cache()
+            manifest_files = {}
+            new_files = new_bytes = total_bytes = 0
+            for path, length in files:
+                path = safe_path(path)
+                source = worlds_dir / path
+                stat = source.stat()
+                key = [length, stat.st_size, stat.st_mtime_ns, stat.st_ino]
+                cached = cache.get(path)
+                if cached and cached["key"] == key and self.object_path(cached["hash"]).exists():
+                    digest, size = cached["hash"], cached["size"]
+                else:
+                    digest, size, stored = self._store_stream(self._read(source, length))
+                    cache[path] = {"key": key, "hash": digest, "size": size}
+                    if stored:
+                        new_files += 1
+                        new_bytes += size
+                manifest_files[path] = {"size": size, "hash": digest}
+                total_bytes += size
+
+            # Forget files that no longer exist in the world
+            for path in set(cache) - set(manifest_files):
+                del cache[path]
+            self._save_cache()
+            return self._write_manifest(manifest_files, online=online, label=label,
+                                        new_files=new_files, new_bytes=new_bytes,
+                                        total_bytes=total_bytes)
+
+    def _write_manifest(self, files: dict, **info) -> dict:
+        snapshot_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        manifest = {
+            "id": snapshot_id,
+            "created": datetime.now().isoformat(),
+            "file_count": len(files),
+            **info,
+            "files": files,
+        }
+        partial = self.root / "tmp" / f"{snapshot_id}.json"
+        partial.write_text(json.dumps(manifest, indent=1))
+        os.replace(partial, self.snapshots / f"{snapshot_id}.json")
+        return self.summary(manifest)
+
+    @staticmethod
+    def summary(manifest: dict) -> dict:
+        return {key: value for key, value in manifest.items() if key != "files"}
+
+    def load(self, snapshot_id: str) -> dict:
+        if not re.fullmatch(r"[\w.-]+", snapshot_id):
+            raise KeyError(snapshot_id)
+        try:
+            return json.loads((self.snapshots / f"{snapshot_id}.json").read_text())
+        except FileNotFoundError:
+            raise KeyError(snapshot_id)
+
+    def missing_objects(self, snapshot_id: str) -> list[str]:
+        """Paths in a snapshot whose stored contents are missing"""
+        manifest = self.load(snapshot_id)
+        return sorted(path for path, entry in manifest["files"].items()
+                      if not self.object_path(entry["hash"]).is_file())
+
+    def list(self) -> list[dict]:
+        """Snapshot summaries, newest first"""
+        if not self.snapshots.exists():
+            return []
+        manifests = sorted(self.snapshots.glob("*.json"), reverse=True)
+        return [self.summary(json.loads(path.read_text())) for path in manifests]
+
+    def restore(self, snapshot_id: str, worlds_dir: str | Path) -> dict:
+        """Replace each level directory in the snapshot with its saved contents
+
+        Levels are copied into a staging directory first, then each file is
+        renamed into place and files the snapshot does not have are removed,
+        so an interrupted copy leaves the world untouched. Files mounted into
+        a level (Docker bind-mounts the world pack lists) can be neither
+        replaced nor removed, so they are left as they are. Only call this
+        while the server is stopped.
+        """
+        manifest = self.load(snapshot_id)
+        missing = self.missing_objects(snapshot_id)
+        if missing:
+            raise FileNotFoundError(f"Backup {snapshot_id} is missing stored files: {', '.join(missing[:5])}")
+        worlds_dir = Path(worlds_dir)
+        worlds_dir.mkdir(parents=True, exist_ok=True)
+        levels: dict[str, list[tuple[str, dict]]] = {}
+        for path, entry in manifest["files"].items():
+            level, _, rest = safe_path(path).partition("/")
+            levels.setdefault(level, []).append((rest, entry))
+
+        mounts = mount_points()
+        with self._lock:
+            for level, entries in levels.items():
+                staging = worlds_dir / f".restore-{level}"
+                if staging.exists():
+                    shutil.rmtree(staging)
+                for rest, entry in entries:
+                    target = staging / rest
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(self.object_path(entry["hash"]), target)
+
+                live = worlds_dir / level
+                live.mkdir(exist_ok=True)
+                restored = {rest for rest, _ in entries}
+                for rest in sorted(restored):
+                    target = live / rest
+                    if str(target.resolve()) in mounts:
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(staging / rest, target)
+                self._remove_stale(live, restored, mounts)
+                shutil.rmtree(staging)
+            # Restored files have new inodes, so nothing in the cache applies
+            self._cache = {}
+            if self._cache_path.exists():
+                self._save_cache()
+
+        return {"id": snapshot_id, "levels": sorted(levels), "file_count": len(manifest["files"])}
+
+    @staticmethod
+    def _remove_stale(live: Path, keep: set[str], mounts: set[str]):
+        """Remove what a restored level does not have, except mount points"""
+        for root, dirs, names in os.walk(live, topdown=False):
+            root = Path(root)
+            for name in names:
+                path = root / name
+                if path.relative_to(live).as_posix() not in keep and str(path.resolve()) not in mounts:
+                    path.unlink()
+            for name in dirs:
+                path = root / name
+                if not any(path.iterdir()) and str(path.resolve()) not in mounts:
+                    path.rmdir()
+
+    def _object_chunks(self, digest: str) -> Iterator[bytes]:
+        with open(self.object_path(digest), "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+    def export(self, snapshot_id: str, format: str = "tar") -> Iterator[bytes]:
+        """Stream a snapshot as an archive of world-relative paths
+
+        The archive is generated chunk by chunk straight from the object
+        store, so memory use is bounded by CHUNK_SIZE whatever the world's
+        size and nothing is written to disk. Raises KeyError for an unknown
+        snapshot before the first chunk.
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        manifest = self.load(snapshot_id)
+        if format == "zip":
+            return self._export_zip(manifest)
+        return self._export_tar(manifest)
+
+    def _export_tar(self, manifest: dict) -> Iterator[bytes]:
+        mtime = datetime.fromisoformat(manifest["created"]).timestamp()
+        for path, entry in sorted(manifest["files"].items()):
+            info = tarfile.TarInfo(path)
+            info.size = entry["size"]
+            info.mtime = mtime
+            info.mode = 0o644
+            yield info.tobuf(tarfile.PAX_FORMAT)
+            yield from self._object_chunks(entry["hash"])
+            padding = -entry["size"] % tarfile.BLOCKSIZE
+            if padding:
+                yield b"\0" * padding
+        # End-of-archive marker: two empty blocks
+        yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+    def _export_zip(self, manifest: dict) -> Iterator[bytes]:
+        created = datetime.fromisoformat(manifest["created"])
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            for path, entry in sorted(manifest["files"].items()):
+                info = zipfile.ZipInfo(path, created.timetuple()[:6])
+                with archive.open(info, "w", force_zip64=entry["size"] > 2**31) as out:
+                    for chunk in self._object_chunks(entry["hash"]):
+                        out.write(chunk)
+                        yield from sink.drain()
+                yield from sink.drain()
+        yield from sink.drain()
+
+    def import_tar(self, fileobj, label: Optional[str] = None) -> dict:
+        """Store a (possibly compressed) tar stream as a new snapshot
+
+        The archive is read sequentially and each member goes straight into
+        the object store, so the upload is never held in memory or written
+        out as a temporary archive.
+        """
+        with self._lock:
+            self._ensure_dirs()
+            files = {}
+            new_files = new_bytes = total_bytes = 0
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    path = safe_path(member.name)
+                    source = archive.extractfile(member)
+                    digest, size, stored = self._store_stream(iter(lambda: source.read(CHUNK_SIZE), b""))
+                    files[path] = {"size": size, "hash": digest}
+                    total_bytes += size
+                    if stored:
+                        new_files += 1
+                        new_bytes += size
+            if not files:
+                raise ValueError("Archive contains no files")
+            return self._write_manifest(files, online=False, label=label, imported=True,
+                                        new_files=new_files, new_bytes=new_bytes,
+                                        total_bytes=total_bytes)
+
+    def delete(self, snapshot_id: str) -> dict:
+        """Remove a snapshot and those of its objects no other snapshot references"""
+        with self._lock:
+            manifest = self.load(snapshot_id)
+            (self.snapshots / f"{snapshot_id}.json").unlink()
+            unreferenced = {entry["hash"] for entry in manifest["files"].values()}
+            for path in self.snapshots.glob("*.json"):
+                if not unreferenced:
+                    break
+                unreferenced.difference_update(e["hash"] for e in json.loads(path.read_text())["files"].values())
+            removed = freed = 0
+            for digest in unreferenced:
+                path = self.object_path(digest)
+                try:
+                    freed += path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        return {"id": snapshot_id, "deleted": True, "objects_removed": removed, "bytes_freed": freed}
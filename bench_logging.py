@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark server-output logging throughput
+
+Compares the old synchronous StreamHandler + FileHandler setup with the
+batching writer from log_writer.py. A producer thread logs LINES server-style
+lines as fast as it can, the way the output monitor does; we report how fast
+the producer gets through them (what limits reading stdout) and how long it
+takes until everything is on disk.
+
+Usage: python bench_logging.py [lines]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from log_writer import BatchLogHandler, RotatingLogFile
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LINE = "[SERVER] [2025-08-09 10:30:15:123 INFO] Player connected: Steve, xuid: 2535412345678901"
+
+
+def sync_handlers(path: Path, stream) -> list[logging.Handler]:
+    return [logging.StreamHandler(stream), logging.FileHandler(path)]
+
+
+def batch_handlers(path: Path, stream) -> list[logging.Handler]:
+    return [BatchLogHandler([stream, RotatingLogFile(path, max_bytes=1 << 30)])]
+
+
+def run(name: str, make_handlers, lines: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        path = Path(tmp) / "server.log"
+        handlers = make_handlers(path, devnull)
+        logger = logging.getLogger(f"bench.{name}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter(FORMAT))
+            logger.addHandler(handler)
+
+        def produce():
+            for i in range(lines):
+                logger.info(f"{LINE} {i}")
+
+        started = time.perf_counter()
+        producer = threading.Thread(target=produce)
+        producer.start()
+        producer.join()
+        produced = time.perf_counter() - started
+        for handler in handlers:
+            handler.flush()
+        written = time.perf_counter() - started
+
+        for handler in handlers:
+            logger.removeHandler(handler)
+            handler.close()
+        with open(path) as f:
+            assert sum(1 for _ in f) == lines, "lines missing from log file"
+
+    return {"name": name, "produce_rate": lines / produced, "write_rate": lines / written}
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"Logging {lines} lines to a file and /dev/null")
+    print(f"{'handler':<12} {'producer lines/s':>18} {'on disk lines/s':>18}")
+    for name, make_handlers in (("sync", sync_handlers), ("batched", batch_handlers)):
+        result = run(name, make_handlers, lines)
+        print(f"{name:<12} {result['produce_rate']:>18,.0f} {result['write_rate']:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+class CommandHistory:
+    """Command history with a bounded in-memory tail and an on-disk store
+
+    Every command is appended to a SQLite table keyed by an autoincrement
+    id, which doubles as the pagination cursor. Only the most recent
+    `tail_size` entries are kept in memory; older pages are read through the
+    primary key and timestamp indexes, so each query does a bounded amount
+    of work however long the history grows. Without a path the store lives
+    in memory.
+
+    A batch of commands is stored as a single entry whose `commands` field
+    lists the individual commands.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None, tail_size: int = 1000):
+        self.path = str(path) if path else ":memory:"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS commands ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " timestamp TEXT NOT NULL,"
+            " command TEXT NOT NULL,"
+            " batch INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(commands)")}
+        if "batch" not in columns:
+            # Stores created before batches were recorded
+            self._db.execute("ALTER TABLE commands ADD COLUMN batch INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_commands_timestamp ON commands(timestamp)")
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT * FROM commands ORDER BY id DESC LIMIT ?", (tail_size,)
+        ).fetchall()
+        self._tail: deque[dict] = deque((self._entry(row) for row in reversed(rows)), maxlen=tail_size)
+        # Ids are never reused or deleted, so the last id is the total count
+        self._count = self._tail[-1]["id"] if self._tail else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> dict:
+        entry = {"id": row["id"], "timestamp": row["timestamp"], "command": row["command"]}
+        if row["batch"]:
+            entry["commands"] = row["command"].split("\n")
+        return entry
+
+    def _insert(self, command: str, timestamp: Optional[str], batch: bool) -> dict:
+        timestamp = timestamp or datetime.now().isoformat()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO commands (timestamp, command, batch) VALUES (?, ?, ?)",
+                (timestamp, command, int(batch))
+            )
+            self._db.commit()
+            entry = {"id": cursor.lastrowid, "timestamp": timestamp, "command": command}
+            if batch:
+                entry["commands"] = command.split("\n")
+            self._tail.append(entry)
+            self._count = entry["id"]
+        return entry
+
+    def append(self, command: str, timestamp: Optional[str] = None) -> dict:
+        """Record a command and return the stored entry"""
+        return self._insert(command, timestamp, batch=False)
+
+    def append_batch(self, commands: list[str], timestamp: Optional[str] = None) -> dict:
+        """Record an ordered batch of commands as one entry"""
+        return self._insert("\n".join(commands), timestamp, batch=True)
+
+    def recent(self, limit: int = 100) -> list[dict]:
+        """Most recent entries from the in-memory tail, oldest first"""
+        if limit <= 0:
+            return []
+        return list(self._tail)[-limit:]
+
+    def query(self, limit: int = 100, before: Optional[int] = None,
+              after: Optional[int] = None, start: Optional[str] = None,
+              end: Optional[str] = None) -> list[dict]:
+        """Page through history, oldest first
+
+        `before`/`after` are exclusive id cursors and `start`/`end` inclusive
+        ISO timestamps. With only `after` set the page runs forward from the
+        cursor; otherwise it is the newest `limit` entries that match.
+
+        Entries are appended in time order, so a time range is resolved to
+        an id range with one seek each on the timestamp index, and the page
+        itself is read from the primary key without sorting.
+        """
+        unfiltered = before is None and after is None and start is None and end is None
+        if unfiltered and limit <= len(self._tail):
+            return self.recent(limit)
+        forward = after is not None and before is None
+
+        with self._lock:
+            if start is not None:
+                row = self._db.execute(
+                    "SELECT id FROM commands WHERE timestamp >= ? ORDER BY timestamp, id LIMIT 1", (start,)
+                ).fetchone()
+                if row is None:
+                    return []
+                after = max(after or 0, row["id"] - 1)
+            if end is not None:
+                row = self._db.execute(
+                    "SELECT id FROM commands WHERE timestamp <= ? ORDER BY timestamp DESC, id DESC LIMIT 1", (end,)
+                ).fetchone()
+                if row is None:
+                    return []
+                before = row["id"] + 1 if before is None else min(before, row["id"] + 1)
+
+            clauses, params = [], []
+            if before is not None:
+                clauses.append("id < ?")
+                params.append(before)
+            if after is not None:
+                clauses.append("id > ?")
+                params.append(after)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            order = "ASC" if forward else "DESC"
+            rows = self._db.execute(
+                f"SELECT * FROM commands {where} ORDER BY id {order} LIMIT ?",
+                (*params, limit)
+            ).fetchall()
+        entries = [self._entry(row) for row in rows]
+        return entries if forward else entries[::-1]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable, Optional
+
+
+# Priority classes, most urgent first
+PRIORITIES = {"control": 0, "normal": 1, "bulk": 2}
+
+# Commands that jump the queue so operators can always regain control
+CONTROL_COMMANDS = {
+    "stop", "kick", "ban", "ban-ip", "pardon", "op", "deop",
+    "allowlist", "whitelist", "save", "reload", "transfer",
+}
+
+
+def classify(command: str) -> str:
+    """Priority class for a single console command"""
+    verb = command.strip().split(" ", 1)[0].lstrip("/").lower()
+    return "control" if verb in CONTROL_COMMANDS else "normal"
+
+
+class CommandRejected(Exception):
+    """A command was refused by the scheduler"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(CommandRejected):
+    pass
+
+
+class RateLimitedError(CommandRejected):
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float = 1) -> float:
+        """Consume `cost` tokens; return 0 on success or seconds until possible
+
+        A cost above the burst size is admitted once the bucket is full and
+        leaves it in debt, so whatever follows waits until that is repaid.
+        """
+        self._refill(time.monotonic())
+        needed = min(cost, self.burst)
+        if needed <= self.tokens:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class CommandScheduler:
+    """Priority queue and per-client rate limiter in front of the stdin pipe
+
+    `submit` admits or rejects a write immediately and returns a future that
+    resolves once the data has reached stdin. A single worker drains the
+    queue in priority order, coalescing whatever is pending into one write.
+    Control commands from clients have `control_reserve` extra slots beyond
+    `max_depth` and a per-client bucket of their own, so a client that has
+    used up its command rate can still stop the server or kick a player,
+    but cannot flood the queue with them either. Internal callers (client
+    None) are not rate limited, and their control commands are never
+    refused.
+    """
+
+    def __init__(self, writer: Callable[[str], Awaitable[None]], max_depth: int = 1000,
+                 rate: float = 20.0, burst: float = 40.0, max_clients: int = 10000,
+                 control_reserve: int = 10, control_rate: float = 1.0, control_burst: float = 5.0):
+        self._writer = writer
+        self.max_depth = max_depth
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.control_reserve = control_reserve
+        self.control_rate = control_rate
+        self.control_burst = control_burst
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._buckets: dict[str, TokenBucket] = {}
+        self._control_buckets: dict[str, TokenBucket] = {}
+        self._order = itertools.count()
+        self.rejected = {"queue_full": 0, "rate_limited": 0}
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "clients": len(self._buckets),
+            "rejected": dict(self.rejected),
+        }
+
+    def _bucket(self, client: str, control: bool = False) -> TokenBucket:
+        buckets = self._control_buckets if control else self._buckets
+        bucket = buckets.get(client)
+        if bucket is None:
+            if len(buckets) >= self.max_clients:
+                # Forget clients whose buckets have fully refilled
+                buckets = {k: b for k, b in buckets.items() if not b.idle}
+                if control:
+                    self._control_buckets = buckets
+                else:
+                    self._buckets = buckets
+            if control:
+                bucket = TokenBucket(self.control_rate, self.control_burst)
+            else:
+                bucket = TokenBucket(self.rate, self.burst)
+            buckets[client] = bucket
+        return bucket
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.PriorityQueue()
+            self._worker = loop.create_task(self._run())
+
+    def submit(self, data: str, priority: str = "normal", client: Optional[str] = None,
+               cost: float = 1) -> asyncio.Future:
+        """Admit `data` for writing or raise QueueFullError/RateLimitedError"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        self._ensure_worker()
+
+        control = priority == "control"
+        if not (control and client is None):
+            limit = self.max_depth + (self.control_reserve if control else 0)
+            if self._queue.qsize() >= limit:
+                self.rejected["queue_full"] += 1
+                raise QueueFullError("Command queue is full", retry_after=1.0)
+
+        if client is not None:
+            wait = self._bucket(client, control).take(cost)
+            if wait:
+                self.rejected["rate_limited"] += 1
+                raise RateLimitedError(f"Rate limit exceeded for client {client}", retry_after=wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((PRIORITIES[priority], next(self._order), data, future))
+        return future
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._writer("".join(item[2] for item in batch))
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    def cancel(self):
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
+class ConsoleEvent:
+    """A recognised line of Bedrock console output"""
+    type: str
+    message: str
+    level: Optional[str] = None
+    data: dict = field(default_factory=dict)
+
+
+# Bedrock prefixes most lines with "[2025-08-09 10:30:15:123 INFO] "
+HEADER_PATTERN = re.compile(r"^\[(?P<time>[^\]]*?)\s*(?P<level>[A-Z]+)\]\s*(?P<message>.*)$")
+
+# (event type, pattern) in match order; named groups become event data
+EVENT_RULES = [
+    ("player_connected", re.compile(
+        r"^Player connected: (?P<name>.+?), xuid: (?P<xuid>\d*)")),
+    ("player_disconnected", re.compile(
+        r"^Player disconnected: (?P<name>.+?), xuid: (?P<xuid>\d*)")),
+    ("player_spawned", re.compile(
+        r"^Player Spawned: (?P<name>.+?) xuid: (?P<xuid>\d*)")),
+    ("level_loading", re.compile(r"^(?:Opening level|Level Name:)")),
+    ("server_started", re.compile(r"^Server started\.")),
+    ("server_stopping", re.compile(r"^(?:Server stop requested|Stopping server\.\.\.)")),
+    ("server_quit", re.compile(r"^Quit correctly")),
+    ("world_saved", re.compile(r"^(?:Data saved|Level saved|World saved)")),
+]
+
+
+class EventParser:
+    """Turns console lines into ConsoleEvents
+
+    Lines logged at ERROR level, or that match no rule but start with
+    "Error", become `error` events; everything else unrecognised is ignored.
+    """
+
+    def __init__(self, rules: list = EVENT_RULES):
+        self.rules = rules
+
+    def parse(self, line: str) -> Optional[ConsoleEvent]:
+        level = None
+        message = line
+        header = HEADER_PATTERN.match(line)
+        if header:
+            level = header.group("level")
+            message = header.group("message")
+
+        for event_type, pattern in self.rules:
+            match = pattern.search(message)
+            if match:
+                return ConsoleEvent(event_type, message, level, match.groupdict())
+
+        if level == "ERROR" or message.startswith("Error"):
+            return ConsoleEvent("error", message, level or "ERROR")
+        return None
+
+
+class PlayerIndex:
+    """Online players and per-player session counts, updated from events
+
+    Players are keyed by xuid (falling back to name when the xuid is
+    missing), so lookups and updates are O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._online: dict[str, dict] = {}
+        self._known: dict[str, dict] = {}
+        self._names: dict[str, str] = {}
+
+    @staticmethod
+    def _key(name: str, xuid: Optional[str]) -> str:
+        return xuid or f"name:{name}"
+
+    def apply(self, event: ConsoleEvent):
+        if event.type == "player_connected":
+            self.connect(event.data["name"], event.data.get("xuid"))
+        elif event.type == "player_disconnected":
+            self.disconnect(event.data["name"], event.data.get("xuid"))
+        elif event.type in ("server_started", "server_quit"):
+            self.clear()
+
+    def connect(self, name: str, xuid: Optional[str] = None):
+        now = datetime.now().isoformat()
+        key = self._key(name, xuid)
+        with self._lock:
+            known = self._known.setdefault(key, {"name": name, "xuid": xuid, "sessions": 0})
+            known["name"] = name
+            self._names[name] = key
+            known["sessions"] += 1
+            known["last_seen"] = now
+            self._online[key] = {"name": name, "xuid": xuid, "connected_at": now}
+
+    def disconnect(self, name: str, xuid: Optional[str] = None):
+        key = self._key(name, xuid)
+        with self._lock:
+            self._online.pop(key, None)
+            if key in self._known:
+                self._known[key]["last_seen"] = datetime.now().isoformat()
+
+    def clear(self):
+        """Everyone is gone when the server (re)starts or quits"""
+        with self._lock:
+            self._online.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self._online)
+
+    def online(self) -> list[dict]:
+        with self._lock:
+            return list(self._online.values())
+
+    def get(self, name: str) -> Optional[dict]:
+        with self._lock:
+            key = self._names.get(name)
+            if key is None:
+                return None
+            return {**self._known[key], "online": key in self._online}
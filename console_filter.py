@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from console_events import HEADER_PATTERN
+
+
+# Bedrock level names to logging levels
+LEVELS = {
+    "VERBOSE": logging.DEBUG,
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARN": logging.WARNING,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "FATAL": logging.CRITICAL,
+    "CRITICAL": logging.CRITICAL,
+}
+
+FILTER_ACTIONS = ("keep", "drop", "sample")
+
+
+@dataclass(slots=True)
+class FilterRule:
+    """A compiled console filter rule
+
+    `keep` lines are logged (at `level` if set), `drop` lines are not, and
+    `sample` lines are logged once every `every` matches.
+    """
+    pattern: re.Pattern
+    action: str = "keep"
+    level: Optional[int] = None
+    every: int = 1
+    seen: int = 0
+
+    @classmethod
+    def from_dict(cls, rule: dict) -> "FilterRule":
+        action = rule.get("action", "keep")
+        if action not in FILTER_ACTIONS:
+            raise ValueError(f"Unknown filter action: {action}")
+        level = rule.get("level")
+        if level is not None and level.upper() not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+        every = int(rule.get("every", 1))
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        return cls(
+            pattern=re.compile(rule["pattern"]),
+            action=action,
+            level=LEVELS[level.upper()] if level else None,
+            every=every,
+        )
+
+
+class ConsoleFilter:
+    """Decides which console lines reach the log, and at what level
+
+    Each line's level comes from its Bedrock header (INFO, WARN, ERROR),
+    unless the first matching rule overrides it. Runs of lines with the same
+    message (ignoring the header timestamp) are collapsed: the first is
+    logged, the rest are counted and reported as one "repeated N times"
+    record when the run ends or every `max_repeats` lines.
+
+    `process` returns the (level, text) records to log for a line. It is
+    called from the single output reader, so it keeps no locks.
+    """
+
+    def __init__(self, rules: Optional[list[FilterRule]] = None,
+                 collapse_repeats: bool = True, max_repeats: int = 1000):
+        self.rules = rules or []
+        self.collapse_repeats = collapse_repeats
+        self.max_repeats = max_repeats
+        self.suppressed = {"drop": 0, "sample": 0, "repeat": 0}
+        self._last_message: Optional[str] = None
+        self._last_level = logging.INFO
+        self._last_logged = False
+        self._repeats = 0
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> "ConsoleFilter":
+        """Filter from the JSON file named by CONSOLE_FILTERS, if any
+
+        The file holds `{"rules": [...], "collapse_repeats": true}`; each
+        rule has a `pattern` and optionally `action`, `level` and `every`.
+        """
+        path = path or os.environ.get('CONSOLE_FILTERS')
+        if not path:
+            return cls()
+
+        with open(path) as f:
+            config = json.load(f)
+        return cls(
+            rules=[FilterRule.from_dict(rule) for rule in config.get("rules", [])],
+            collapse_repeats=config.get("collapse_repeats", True),
+            max_repeats=int(config.get("max_repeats", 1000)),
+        )
+
+    def _summary(self) -> list[tuple[int, str]]:
+        repeats, self._repeats = self._repeats, 0
+        if not repeats or not self._last_logged:
+            return []
+        plural = "time" if repeats == 1 else "times"
+        return [(self._last_level, f"Previous line repeated {repeats} {plural}")]
+
+    def process(self, line: str) -> list[tuple[int, str]]:
+        level_name = None
+        message = line
+        header = HEADER_PATTERN.match(line)
+        if header:
+            level_name = header.group("level")
+            message = header.group("message")
+
+        if self.collapse_repeats and message == self._last_message:
+            self._repeats += 1
+            self.suppressed["repeat"] += 1
+            if self._repeats >= self.max_repeats:
+                return self._summary()
+            return []
+
+        records = self._summary()
+        self._last_message = message
+        self._last_logged = False
+
+        level = LEVELS.get(level_name, logging.INFO)
+        for rule in self.rules:
+            if rule.pattern.search(message):
+                if rule.level is not None:
+                    level = rule.level
+                if rule.action == "drop":
+                    self.suppressed["drop"] += 1
+                    return records
+                if rule.action == "sample":
+                    rule.seen += 1
+                    if (rule.seen - 1) % rule.every:
+                        self.suppressed["sample"] += 1
+                        return records
+                break
+
+        self._last_level = level
+        self._last_logged = True
+        records.append((level, line))
+        return records
+
+    def flush(self) -> list[tuple[int, str]]:
+        """Records still pending at end of output (an unfinished run)"""
+        records = self._summary()
+        self._last_message = None
+        return records
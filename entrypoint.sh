@@ -1,28 +1,20 @@
 #!/bin/bash
 set -e
 
-# --- Copy Custom Add-ons ---
-echo ">>> Copying custom add-ons..."
+# --- Sync Custom Add-ons ---
+# Only changed files are copied (or linked), and packs deleted from staging
+# are removed again; see addon_sync.py
+echo ">>> Syncing custom add-ons..."
+python3 /app/addon_sync.py \
+  /app/custom_addons/behavior_packs /app/behavior_packs \
+  /app/custom_addons/resource_packs /app/resource_packs
 
-# Copy behavior packs
-BEHAVIOR_PACKS_DIR="/app/custom_addons/behavior_packs"
-if [ -d "$BEHAVIOR_PACKS_DIR" ] && [ "$(ls -A $BEHAVIOR_PACKS_DIR)" ]; then
-  echo "Found custom behavior packs, copying to server..."
-  cp -r $BEHAVIOR_PACKS_DIR/* /app/behavior_packs/
-else
-  echo "No custom behavior packs found."
-fi
+echo ">>> Add-on sync complete."
 
-# Copy resource packs
-RESOURCE_PACKS_DIR="/app/custom_addons/resource_packs"
-if [ -d "$RESOURCE_PACKS_DIR" ] && [ "$(ls -A $RESOURCE_PACKS_DIR)" ]; then
-  echo "Found custom resource packs, copying to server..."
-  cp -r $RESOURCE_PACKS_DIR/* /app/resource_packs/
-else
-  echo "No custom resource packs found."
-fi
-
-echo ">>> Add-on copy complete."
+# --- Validate Add-ons ---
+# Problems are reported but do not stop the server; see pack_validate.py
+echo ">>> Validating custom add-ons..."
+python3 /app/pack_validate.py --addons /app/custom_addons || echo ">>> Add-on validation found errors (see above)."
 echo "----------------------------------------"
 
 # --- Execute the main process passed as arguments ---
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+# What to do with a subscriber whose queue is full
+SLOW_CONSUMER_POLICIES = ("drop", "disconnect")
+
+
+class Subscriber:
+    """A single streaming consumer with its own bounded queue"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next entry, or None once the subscriber has been closed
+
+        Raises asyncio.TimeoutError if nothing arrives within `timeout`.
+        """
+        if self.closed and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self, reason: str):
+        """Discard anything pending and wake the consumer with a sentinel"""
+        self.closed = True
+        self.close_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class LogBroadcaster:
+    """Fans out server output lines to streaming subscribers
+
+    `publish` may be called from the output monitor thread or the event loop.
+    Nothing is done when there are no subscribers; otherwise delivery runs on
+    the event loop and never blocks the reader. A subscriber that falls
+    `queue_size` lines behind either loses its oldest queued lines ("drop") or
+    is disconnected ("disconnect").
+    """
+
+    def __init__(self, queue_size: int = 1000, policy: str = "drop",
+                 max_subscribers: int = 500):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_subscribers = max_subscribers
+        self._subscribers: set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self.published = 0
+        self.disconnected = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        """Register a new subscriber (must be called on the event loop)"""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise RuntimeError("Too many log stream subscribers")
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, seq: int, line: str):
+        """Queue a line for every subscriber"""
+        if not self._subscribers:
+            return
+        entry = {"seq": seq, "timestamp": datetime.now().isoformat(), "line": line}
+        if threading.get_ident() == self._loop_thread:
+            self._deliver(entry)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, entry)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                pass
+
+    def _deliver(self, entry: dict):
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                if self.policy == "disconnect":
+                    self._subscribers.discard(subscriber)
+                    subscriber.close("slow_consumer")
+                    self.disconnected += 1
+                else:
+                    subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(entry)
+                    subscriber.dropped += 1
+
+    def close_all(self, reason: str):
+        for subscriber in list(self._subscribers):
+            subscriber.close(reason)
+        self._subscribers.clear()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import gzip
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, TextIO
+
+
+class RotatingLogFile:
+    """Append-only log file rotated by size and age
+
+    A rotated segment is renamed to `<name>.<timestamp>` and gzip-compressed
+    by a background worker, so rotation itself is two syscalls on the writer
+    thread. Only the newest `backups` segments are kept.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = 50 * 1024 * 1024,
+                 max_age: Optional[float] = 24 * 3600, backups: int = 10,
+                 compress: bool = True):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.compress = compress
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+        self._file: Optional[TextIO] = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._opened = time.monotonic()
+
+    def _due(self, incoming: int) -> bool:
+        if self._size == 0:
+            return False
+        if self.max_bytes and self._size + incoming > self.max_bytes:
+            return True
+        return bool(self.max_age) and time.monotonic() - self._opened >= self.max_age
+
+    def write(self, text: str):
+        data_size = len(text) if text.isascii() else len(text.encode("utf-8"))
+        if self._due(data_size):
+            self.rotate()
+        self._file.write(text)
+        self._size += data_size
+
+    def flush(self):
+        self._file.flush()
+
+    def rotate(self):
+        """Start a new segment and compress the old one in the background"""
+        self._file.close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        segment = self.path.with_name(f"{self.path.name}.{stamp}")
+        os.replace(self.path, segment)
+        self._open()
+        if self.compress:
+            self._compressor.submit(self._compress, segment)
+        else:
+            self._prune()
+
+    def _compress(self, segment: Path):
+        target = segment.with_name(f"{segment.name}.gz")
+        partial = segment.with_name(f"{segment.name}.gz.tmp")
+        try:
+            with open(segment, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(partial, target)
+            segment.unlink()
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not compress {segment}: {e}")
+        self._prune()
+
+    def segments(self) -> list[Path]:
+        """Rotated segments, oldest first"""
+        return sorted(
+            p for p in self.path.parent.glob(f"{self.path.name}.*")
+            if not p.name.endswith(".tmp")
+        )
+
+    def _prune(self):
+        for old in self.segments()[:-self.backups or None]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def close(self):
+        self._compressor.shutdown(wait=True)
+        if self._file and not self._file.closed:
+            self._file.close()
+
+
+class BatchLogHandler(logging.Handler):
+    """Logging handler that hands records to a writer thread
+
+    `emit` only appends the record to a bounded queue, so the thread reading
+    server output never waits on disk. The writer thread formats whatever
+    has accumulated (up to `max_batch` records) and writes it to each target
+    with one write and one flush per batch. If the queue is full, records
+    are dropped and the count is reported in the next batch rather than
+    blocking the caller.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, targets: list, queue_size: int = 100000, max_batch: int = 1000):
+        super().__init__()
+        self.targets = targets
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been written"""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((self._FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(10)
+        for target in self.targets:
+            if isinstance(target, RotatingLogFile):
+                target.close()
+        super().close()
+
+    def _run(self):
+        reported = 0
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            if self.dropped != reported:
+                lines.append(f"[log-writer] dropped {self.dropped - reported} log records (queue full)\n")
+                reported = self.dropped
+            waiters, stop = [], False
+            for item in batch:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, tuple):
+                    waiters.append(item[1])
+                else:
+                    try:
+                        lines.append(self.format(item) + "\n")
+                    except Exception:
+                        self.handleError(item)
+            if lines:
+                self._write("".join(lines))
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+
+    def _write(self, text: str):
+        for target in self.targets:
+            try:
+                target.write(text)
+                target.flush()
+            except Exception as e:
+                # Never let a full disk or closed stream kill the writer thread
+                print(f"log-writer: could not write to {target}: {e}", file=sys.__stderr__)
+
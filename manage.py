@@ -3,10 +3,58 @@
 import requests
 import sys
 import json
-from typing import Optional
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+from urllib.parse import urlencode
+
+try:
+    import readline
+except ImportError:  # e.g. Windows without pyreadline
+    readline = None
 
 API_BASE = "http://localhost:8000"
 
+CONSOLE_PROMPT = "> "
+CONSOLE_HISTORY = os.path.expanduser("~/.mcs_console_history")
+
+# Commands the Bedrock dedicated server accepts, for completion
+BEDROCK_COMMANDS = sorted([
+    "allowlist", "alwaysday", "camera", "camerashake", "changesetting", "clear", "clearspawnpoint",
+    "clone", "damage", "daylock", "deop", "dialogue", "difficulty", "effect", "enchant", "event",
+    "execute", "fill", "fog", "function", "gamemode", "gamerule", "give", "help", "inputpermission",
+    "kick", "kill", "list", "locate", "loot", "me", "mobevent", "music", "op", "particle",
+    "permission", "place", "playanimation", "playsound", "recipe", "reload", "replaceitem", "ride",
+    "save", "say", "schedule", "scoreboard", "script", "scriptevent", "setblock", "setmaxplayers",
+    "setworldspawn", "spawnpoint", "spreadplayers", "stop", "stopsound", "structure", "summon",
+    "tag", "teleport", "tell", "tellraw", "testfor", "testforblock", "testforblocks",
+    "tickingarea", "time", "title", "titleraw", "toggledownfall", "tp", "transfer", "w",
+    "weather", "wsserver", "xp",
+])
+
+# Fixed first arguments of some commands
+COMMAND_ARGUMENTS = {
+    "allowlist": ["add", "list", "off", "on", "reload", "remove"],
+    "difficulty": ["easy", "hard", "normal", "peaceful"],
+    "gamemode": ["adventure", "creative", "default", "spectator", "survival"],
+    "save": ["hold", "query", "resume"],
+    "time": ["add", "query", "set"],
+    "weather": ["clear", "query", "rain", "thunder"],
+}
+
+TARGET_SELECTORS = ["@a", "@e", "@p", "@r", "@s"]
+
+CONSOLE_COMMANDS = {
+    ".help": "Show this help",
+    ".status": "Server status",
+    ".players": "Online players",
+    ".exit": "Leave the console (or Ctrl-D)",
+}
+
+# Seconds to cache the online player list used for completion
+PLAYER_CACHE_SECONDS = 5.0
+
 def send_request(method: str, endpoint: str, data: Optional[dict] = None) -> dict:
     """Send request to server API"""
     try:
@@ -28,6 +76,212 @@ def send_request(method: str, endpoint: str, data: Optional[dict] = None) -> dic
         print(f"Error: {e}")
         sys.exit(1)
 
+def iter_sse(lines: Iterable[str]) -> Iterator[dict]:
+    """Server-sent events from a stream of lines, as {"event", "id", "data"} dicts"""
+    event = {}
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield {"event": event.get("event", "message"), "id": event.get("id"), "data": "\n".join(data)}
+            event, data = {}, []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "data":
+            data.append(value)
+        elif field in ("event", "id"):
+            event[field] = value
+
+
+class Console:
+    """Interactive console: commands go out over one kept-alive connection
+    while a second one follows the server output
+    
+    Output lines are printed above the prompt, and whatever has been typed
+    so far is redrawn after them.
+    """
+    
+    def __init__(self, base: str = API_BASE, session: Optional[requests.Session] = None,
+                 stream_session: Optional[requests.Session] = None, output=None):
+        self.base = base
+        self.session = session or requests.Session()
+        self.stream_session = stream_session or requests.Session()
+        self.output = output or sys.stdout
+        self.last_seq: Optional[int] = None
+        self.prompting = False
+        self._players: list[str] = []
+        self._players_fetched = 0.0
+        self._stop = threading.Event()
+        self._response = None
+        self._lock = threading.Lock()
+    
+    def print(self, text: str):
+        """Print a line without corrupting the input being typed"""
+        with self._lock:
+            if self.prompting and readline and self.output.isatty():
+                self.output.write(f"\r\033[K{text}\n{CONSOLE_PROMPT}{readline.get_line_buffer()}")
+            else:
+                self.output.write(f"{text}\n")
+            self.output.flush()
+    
+    def request(self, method: str, endpoint: str, **kwargs) -> Optional[dict]:
+        """Call the API over the console's session; errors are printed and give None"""
+        try:
+            response = self.session.request(method, f"{self.base}{endpoint}", timeout=30, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self.print("Error: Could not connect to server API. Is the container running?")
+            return None
+        except requests.exceptions.RequestException as e:
+            self.print(f"Error: {e}")
+            return None
+        if response.status_code == 429:
+            self.print(f"Rate limited; try again in {response.headers.get('Retry-After', '1')}s")
+            return None
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.reason)
+            except ValueError:
+                detail = response.reason
+            self.print(f"Error: {detail}")
+            return None
+        return response.json()
+    
+    def send(self, command: str):
+        """Send a server command; its output arrives on the log stream"""
+        self.request("POST", "/command", json={"command": command})
+    
+    def players(self) -> list[str]:
+        now = time.monotonic()
+        if now - self._players_fetched > PLAYER_CACHE_SECONDS:
+            self._players_fetched = now
+            try:
+                response = self.session.get(f"{self.base}/players", timeout=2)
+                self._players = [player["name"] for player in response.json()["players"]]
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+                pass
+        return self._players
+    
+    def candidates(self, line: str, text: str) -> list[str]:
+        """Completions for the word `text` at the end of `line`"""
+        words = line.split()
+        if len(words) == 0 or (len(words) == 1 and text):
+            options = BEDROCK_COMMANDS + list(CONSOLE_COMMANDS)
+        else:
+            command = words[0].lstrip("/")
+            position = len(words) - (1 if text else 0)
+            options = (COMMAND_ARGUMENTS.get(command, []) if position == 1 else []) + TARGET_SELECTORS + self.players()
+        return [option for option in options if option.startswith(text)]
+    
+    def complete(self, text: str, state: int) -> Optional[str]:
+        """readline completer"""
+        if state == 0:
+            line = readline.get_line_buffer()[:readline.get_begidx()] + text if readline else text
+            self._matches = self.candidates(line, text)
+        return self._matches[state] if state < len(self._matches) else None
+    
+    def follow(self):
+        """Print server output as it arrives, reconnecting where it left off"""
+        delay = 0.5
+        while not self._stop.is_set():
+            params = {} if self.last_seq is None else {"since": self.last_seq}
+            try:
+                with self.stream_session.get(f"{self.base}/logs/stream", params=params,
+                                             stream=True, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    self._response = response
+                    delay = 0.5
+                    for event in iter_sse(response.iter_lines(decode_unicode=True)):
+                        self._handle_event(event)
+                        if self._stop.is_set():
+                            return
+            except (requests.exceptions.RequestException, AttributeError, ValueError):
+                # AttributeError/ValueError come from a response closed by stop()
+                pass
+            finally:
+                self._response = None
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, 5.0)
+    
+    def _handle_event(self, event: dict):
+        data = json.loads(event["data"])
+        if event["event"] == "dropped":
+            self.print(f"[{data['dropped']} lines skipped]")
+        elif event["event"] == "close":
+            self.print(f"[log stream closed: {data['reason']}]")
+        elif event["event"] == "message":
+            self.last_seq = data["seq"]
+            self.print(data["line"])
+    
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            response.close()
+    
+    def meta(self, line: str):
+        """Console commands, which start with a dot"""
+        if line == ".help":
+            for name, description in CONSOLE_COMMANDS.items():
+                self.print(f"  {name:<10} {description}")
+            self.print("Anything else is sent to the server as a command.")
+        elif line == ".status":
+            result = self.request("GET", "/status")
+            if result is not None:
+                self.print(json.dumps(result, indent=2))
+        elif line == ".players":
+            result = self.request("GET", "/players")
+            if result is not None:
+                names = ", ".join(player["name"] for player in result["players"])
+                self.print(f"{result['count']} online" + (f": {names}" if names else ""))
+        else:
+            self.print(f"Unknown console command {line} (try .help)")
+    
+    def run(self, read_line: Callable[[str], str] = input, follow: bool = True):
+        if readline:
+            try:
+                readline.read_history_file(CONSOLE_HISTORY)
+            except OSError:
+                pass
+            readline.set_history_length(1000)
+            readline.set_completer_delims(" ")
+            readline.set_completer(self.complete)
+            readline.parse_and_bind("tab: complete")
+        if follow:
+            threading.Thread(target=self.follow, daemon=True).start()
+        
+        self.print(f"Connected to {self.base}. Type .help for help, Ctrl-D to leave.")
+        try:
+            while True:
+                self.prompting = True
+                try:
+                    line = read_line(CONSOLE_PROMPT).strip()
+                except EOFError:
+                    self.output.write("\n")
+                    break
+                except KeyboardInterrupt:
+                    self.output.write("\n")
+                    continue
+                finally:
+                    self.prompting = False
+                if line in (".exit", ".quit"):
+                    break
+                if line.startswith("."):
+                    self.meta(line)
+                elif line:
+                    self.send(line.lstrip("/"))
+        finally:
+            self.stop()
+            if readline:
+                try:
+                    readline.write_history_file(CONSOLE_HISTORY)
+                except OSError:
+                    pass
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python3 manage.py <command>")
@@ -37,7 +291,12 @@ def main():
         print("  stop         - Stop server")
         print("  restart      - Restart server")
         print("  cmd <text>   - Send command to server")
+        print("  batch <file> - Send every line of a file as one batch ('-' for stdin)")
         print("  history      - Show command history")
+        print("  backup [label] - Take an incremental world backup")
+        print("  backups      - List world backups")
+        print("  restore <id> - Restore a world backup (restarts the server)")
+        print("  console      - Interactive console with live server output")
         return
     
     command = sys.argv[1]
@@ -67,10 +326,43 @@ def main():
         result = send_request("POST", "/command", {"command": cmd_text})
         print(json.dumps(result, indent=2))
     
+    elif command == "batch":
+        if len(sys.argv) < 3:
+            print("Usage: python3 manage.py batch <file>")
+            return
+        
+        source = sys.stdin if sys.argv[2] == "-" else open(sys.argv[2])
+        with source:
+            commands = [line.strip() for line in source if line.strip()]
+        result = send_request("POST", "/commands", {"commands": commands})
+        print(json.dumps(result, indent=2))
+    
     elif command == "history":
         result = send_request("GET", "/command/history")
         print(json.dumps(result, indent=2))
     
+    elif command == "backup":
+        endpoint = "/backups"
+        if len(sys.argv) > 2:
+            endpoint += "?" + urlencode({"label": " ".join(sys.argv[2:])})
+        result = send_request("POST", endpoint)
+        print(json.dumps(result, indent=2))
+    
+    elif command == "backups":
+        result = send_request("GET", "/backups")
+        print(json.dumps(result, indent=2))
+    
+    elif command == "restore":
+        if len(sys.argv) < 3:
+            print("Usage: python3 manage.py restore <backup id>")
+            return
+        
+        result = send_request("POST", f"/backups/{sys.argv[2]}/restore")
+        print(json.dumps(result, indent=2))
+    
+    elif command == "console":
+        Console().run()
+    
     else:
         print(f"Unknown command: {command}")
         sys.exit(1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+class OutputBuffer:
+    """Bounded, sequence-numbered ring buffer of server output lines
+
+    Every line gets a monotonically increasing sequence number. The buffer
+    keeps the most recent `capacity` lines in a fixed array indexed by
+    `seq % capacity`, so memory stays constant and reading from a cursor only
+    touches the lines being returned.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots: list[Optional[tuple[int, str, str]]] = [None] * capacity
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    @property
+    def first_seq(self) -> int:
+        """Oldest sequence number still held"""
+        return max(1, self._next_seq - self.capacity)
+
+    @property
+    def last_seq(self) -> int:
+        """Most recent sequence number (0 if nothing has been written)"""
+        return self._next_seq - 1
+
+    def append(self, line: str) -> int:
+        """Store a line and return its sequence number"""
+        with self._lock:
+            seq = self._next_seq
+            self._slots[seq % self.capacity] = (seq, datetime.now().isoformat(), line)
+            self._next_seq = seq + 1
+            return seq
+
+    def read(self, since: Optional[int] = None, limit: int = 100) -> dict:
+        """Return up to `limit` lines with a sequence number above `since`
+
+        Without `since`, the most recent `limit` lines are returned. The
+        `next` cursor in the result is passed back as `since` to fetch only
+        newer lines; `truncated` is set when lines after `since` have already
+        been overwritten. A cursor ahead of the buffer (e.g. from before a
+        wrapper restart) starts again from the oldest line.
+        """
+        with self._lock:
+            first, last = self.first_seq, self.last_seq
+            if since is not None and since > last:
+                since = first - 1
+            if since is None:
+                start = max(first, last - limit + 1)
+            else:
+                start = max(first, since + 1)
+            end = min(last, start + limit - 1)
+            lines = []
+            for seq in range(start, end + 1):
+                _, timestamp, line = self._slots[seq % self.capacity]
+                lines.append({"seq": seq, "timestamp": timestamp, "line": line})
+
+        return {
+            "lines": lines,
+            "next": end if lines else last,
+            "first_seq": first,
+            "last_seq": last,
+            "truncated": since is not None and since + 1 < first,
+        }
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Package the add-ons as .mcpack files and one .mcaddon bundle
+
+Every pack directory under addons/behavior_packs and addons/resource_packs
+becomes dist/<pack>.bp.mcpack or dist/<pack>.rp.mcpack, so a behavior pack
+and its resource pack may share a name, and all of them together become
+dist/addons.mcaddon. Archives are deterministic: entries are sorted and
+carry fixed timestamps and permissions, so the same pack contents always
+produce the same bytes. PNGs and JSON are shrunk losslessly on the way in
+(see pack_optimize.py); optimised files are cached by content hash.
+
+A cache in the output directory records each pack's content hash (built
+from per-file hashes, themselves cached by size and mtime). Packs whose
+hash and archive are unchanged are skipped. For the rest, files not yet
+optimised are shrunk one per job in a process pool, then the archives are
+written there too, so a rebuild costs time proportional to what changed.
+
+Usage: python3 pack_build.py [--addons DIR] [--out DIR] [--jobs N] [--force] [--no-optimize]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from pack_files import PACK_TYPES, file_hash, write_json
+from pack_optimize import OPTIMIZER_VERSION, optimize, optimizer_kind
+
+# Archive name suffix for each pack type
+PACK_SUFFIXES = {"behavior_packs": "bp", "resource_packs": "rp"}
+
+CACHE_NAME = ".pack_build_cache.json"
+
+OPTIMIZED_DIR = ".optimized"
+
+# Bump when the archive layout changes so every cached pack is rebuilt
+BUILD_VERSION = 3
+
+# Earliest timestamp a zip entry can hold
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def pack_contents(pack_dir: Path) -> list[str]:
+    """Pack-relative paths of the files to package, sorted; dotfiles are left out"""
+    files = []
+    for root, dirs, names in os.walk(pack_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if not name.startswith("."):
+                files.append((Path(root) / name).relative_to(pack_dir).as_posix())
+    return sorted(files)
+
+
+def find_packs(addons_dir: Path) -> dict[str, Path]:
+    """Pack directories keyed by "<pack type>/<name>", behavior packs first"""
+    packs = {}
+    for pack_type in PACK_TYPES:
+        root = addons_dir / pack_type
+        if not root.is_dir():
+            continue
+        for entry in sorted(os.scandir(root), key=lambda e: e.name):
+            if entry.is_dir() and not entry.name.startswith("."):
+                packs[f"{pack_type}/{entry.name}"] = Path(entry.path)
+    return packs
+
+
+def archive_name(key: str) -> str:
+    """File name of a pack's archive, e.g. tools.bp.mcpack for behavior_packs/tools"""
+    pack_type, name = key.split("/", 1)
+    return f"{name}.{PACK_SUFFIXES[pack_type]}.mcpack"
+
+
+def _entry(name: str) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+    info.create_system = 3
+    info.external_attr = 0o644 << 16
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def write_archive(output: Path, members: list[tuple[str, bytes]], compresslevel: int = 9):
+    """Write a deterministic zip of (name, data) pairs atomically"""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(f".{output.name}.tmp")
+    with zipfile.ZipFile(partial, "w") as archive:
+        for name, data in sorted(members):
+            archive.writestr(_entry(name), data, compresslevel=compresslevel)
+    os.replace(partial, output)
+
+
+def optimized_contents(path: Path, rel: str, digest: str, cache_dir: Path) -> bytes:
+    """`optimize()` of a file, reusing the result stored under its content hash"""
+    kind = optimizer_kind(rel)
+    if kind is None:
+        return path.read_bytes()
+    cached = cache_dir / digest[:2] / f"{digest}.{kind}"
+    try:
+        return cached.read_bytes()
+    except FileNotFoundError:
+        pass
+    data = optimize(rel, path.read_bytes())
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    partial = cached.with_name(f".{cached.name}.{os.getpid()}")
+    partial.write_bytes(data)
+    os.replace(partial, cached)
+    return data
+
+
+def optimize_file(path: str, rel: str, digest: str, cache_dir: str):
+    """Store the optimised contents of one file in the cache; runs in a worker process"""
+    optimized_contents(Path(path), rel, digest, Path(cache_dir))
+
+
+def build_pack(pack_dir: str, files: list[tuple[str, str]], output: str,
+               cache_dir: Optional[str] = None) -> dict:
+    """Build one .mcpack, optimising files if `cache_dir` is given; runs in a worker process"""
+    started = time.perf_counter()
+    pack_dir, output = Path(pack_dir), Path(output)
+    members = []
+    size = 0
+    for rel, digest in files:
+        path = pack_dir / rel
+        if cache_dir:
+            data = optimized_contents(path, rel, digest, Path(cache_dir))
+        else:
+            data = path.read_bytes()
+        size += path.stat().st_size
+        members.append((rel, data))
+    write_archive(output, members)
+    return {
+        "bytes": output.stat().st_size,
+        "saved": size - sum(len(data) for _, data in members),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+class PackBuilder:
+    """Builds the add-on archives, skipping packs whose contents are unchanged"""
+
+    def __init__(self, addons_dir: str | Path, out_dir: str | Path,
+                 jobs: Optional[int] = None, bundle_name: str = "addons.mcaddon",
+                 optimize: bool = True):
+        self.addons_dir = Path(addons_dir)
+        self.out_dir = Path(out_dir)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.bundle = self.out_dir / bundle_name
+        self.cache_path = self.out_dir / CACHE_NAME
+        self.optimize = optimize
+        self.optimized_dir = self.out_dir / OPTIMIZED_DIR / f"v{OPTIMIZER_VERSION}"
+
+    def _load_cache(self) -> dict:
+        try:
+            cache = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return {"files": {}, "packs": {}}
+        if cache.get("version") != BUILD_VERSION:
+            return {"files": {}, "packs": {}}
+        return cache
+
+    def _save_cache(self, cache: dict):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        write_json(self.cache_path, {**cache, "version": BUILD_VERSION})
+
+    def pack_digest(self, pack_dir: Path, files: list[str], known: dict, fresh: dict) -> str:
+        """Hash of a pack's file names, contents and build options; unchanged files are not re-read"""
+        digest = hashlib.sha256(f"optimize={OPTIMIZER_VERSION if self.optimize else 0}\n".encode())
+        for rel in files:
+            path = pack_dir / rel
+            key = path.relative_to(self.addons_dir).as_posix()
+            st = path.stat()
+            entry = known.get(key)
+            if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": file_hash(path)}
+            fresh[key] = entry
+            digest.update(f"{rel}\0{entry['hash']}\n".encode())
+        return digest.hexdigest()
+
+    def _prune_optimized(self, hashes: set[str]):
+        if not self.optimized_dir.parent.is_dir():
+            return
+        for version in os.scandir(self.optimized_dir.parent):
+            if version.path != str(self.optimized_dir):
+                shutil.rmtree(version.path, ignore_errors=True)
+                continue
+            for bucket in os.scandir(version.path):
+                for entry in os.scandir(bucket.path):
+                    if entry.name.split(".", 1)[0] not in hashes:
+                        os.unlink(entry.path)
+
+    def _optimize_jobs(self, todo: dict) -> dict:
+        """optimize_file() arguments for every file of the packs to build not yet in the cache"""
+        jobs = {}
+        for pack_dir, hashes, _, cache_dir in todo.values():
+            if cache_dir is None:
+                continue
+            for rel, digest in hashes:
+                kind = optimizer_kind(rel)
+                if kind and not (self.optimized_dir / digest[:2] / f"{digest}.{kind}").is_file():
+                    jobs[(digest, kind)] = (str(Path(pack_dir) / rel), rel, digest, cache_dir)
+        return jobs
+
+    @staticmethod
+    def _run(pool: Optional[ProcessPoolExecutor], func, jobs: dict) -> dict:
+        """Results of func(*args) for each job, run in the pool if there is one"""
+        if pool is None or len(jobs) < 2:
+            return {key: func(*args) for key, args in jobs.items()}
+        futures = {key: pool.submit(func, *args) for key, args in jobs.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+    def build(self, force: bool = False) -> dict:
+        started = time.perf_counter()
+        cache = self._load_cache()
+        files_cache = {}
+        packs_cache = {}
+        todo = {}
+        results = {}
+
+        for name, pack_dir in find_packs(self.addons_dir).items():
+            files = pack_contents(pack_dir)
+            digest = self.pack_digest(pack_dir, files, cache["files"], files_cache)
+            output = self.out_dir / archive_name(name)
+            previous = cache["packs"].get(name, {})
+            if not force and previous.get("digest") == digest and output.is_file():
+                results[name] = {"built": False, "bytes": output.stat().st_size, "saved": previous.get("saved", 0)}
+            else:
+                hashes = [
+                    (rel, files_cache[(pack_dir / rel).relative_to(self.addons_dir).as_posix()]["hash"])
+                    for rel in files
+                ]
+                cache_dir = str(self.optimized_dir) if self.optimize else None
+                todo[name] = (str(pack_dir), hashes, str(output), cache_dir)
+            packs_cache[name] = {"digest": digest}
+
+        # Files are optimised one job each, so a single large pack still uses
+        # every worker; the archives are then written from the cache
+        optimize_jobs = self._optimize_jobs(todo)
+        workers = min(self.jobs, max(len(todo), len(optimize_jobs)))
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            self._run(pool, optimize_file, optimize_jobs)
+            for name, result in self._run(pool, build_pack, todo).items():
+                results[name] = {"built": True, **result}
+        finally:
+            if pool:
+                pool.shutdown()
+
+        for name, result in results.items():
+            packs_cache[name]["saved"] = result["saved"]
+
+        # Drop archives of packs that no longer exist (or that older builds
+        # named differently), and optimised files nothing uses
+        archives = {archive_name(name) for name in packs_cache}
+        if self.out_dir.is_dir():
+            for entry in os.scandir(self.out_dir):
+                if entry.name.endswith(".mcpack") and entry.name not in archives:
+                    os.unlink(entry.path)
+        self._prune_optimized({entry["hash"] for entry in files_cache.values()})
+
+        bundle_digest = hashlib.sha256(
+            "".join(f"{name}\0{entry['digest']}\n" for name, entry in sorted(packs_cache.items())).encode()
+        ).hexdigest()
+        bundle_built = False
+        if packs_cache and (force or cache.get("bundle") != bundle_digest or not self.bundle.is_file()):
+            # The .mcpack members are already compressed; deflating them again gains nothing
+            write_archive(self.bundle, [
+                (archive_name(name), (self.out_dir / archive_name(name)).read_bytes()) for name in packs_cache
+            ], compresslevel=0)
+            bundle_built = True
+        elif not packs_cache:
+            self.bundle.unlink(missing_ok=True)
+
+        self._save_cache({"files": files_cache, "packs": packs_cache, "bundle": bundle_digest})
+        return {
+            "packs": results,
+            "built": len(todo),
+            "bundle": bundle_built,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Package add-ons as .mcpack/.mcaddon archives")
+    parser.add_argument("--addons", default=Path(__file__).parent / "addons", type=Path,
+                        help="directory holding behavior_packs/ and resource_packs/")
+    parser.add_argument("--out", default=Path(__file__).parent / "dist", type=Path,
+                        help="output directory (default: dist/)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="rebuild every pack")
+    parser.add_argument("--no-optimize", action="store_true",
+                        help="package files as they are, without shrinking PNGs and JSON")
+    args = parser.parse_args(argv)
+
+    builder = PackBuilder(args.addons, args.out, args.jobs, optimize=not args.no_optimize)
+    result = builder.build(force=args.force)
+
+    for name, pack in result["packs"].items():
+        state = f"built in {pack['seconds']:.3f}s" if pack["built"] else "unchanged"
+        print(f"  {archive_name(name)}: {pack['bytes']} bytes ({pack['saved']} bytes saved), {state}")
+    saved = sum(pack["saved"] for pack in result["packs"].values())
+    print(
+        f"{len(result['packs'])} packs, {result['built']} rebuilt, {saved} bytes saved"
+        f"{', bundle rebuilt' if result['bundle'] else ''} in {result['seconds']:.3f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
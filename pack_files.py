@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the add-on tools
+
+Pack layout constants, content hashing, Bedrock's commented JSON and the
+atomic JSON writes the tools use for their caches and manifests.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+# Pack directories under addons/ and the pack type each holds
+PACK_TYPES = {"behavior_packs": "behavior", "resource_packs": "resource"}
+
+# Atlases whose texture names share one namespace across all resource packs
+TEXTURE_ATLASES = {"textures/item_texture.json": "item_texture", "textures/terrain_texture.json": "terrain_texture"}
+
+# Strings, or // and /* */ comments (which Bedrock accepts in its JSON)
+_JSON_TOKENS = re.compile(r'"(?:\\.|[^"\\])*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def strip_comments(text: str) -> str:
+    return _JSON_TOKENS.sub(lambda m: m.group() if m.group().startswith('"') else "", text)
+
+
+def write_json(path: Path, data) -> None:
+    """Replace `path` with `data` as JSON atomically
+
+    The temporary file has a unique name in the same directory, so
+    concurrent writers never collide; the last rename wins.
+    """
+    fd, partial = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Generate pack registration files from the add-on manifests
+
+Scans addons/behavior_packs/* and addons/resource_packs/*, reads each
+pack's manifest.json into an index cached by path and mtime, and writes
+valid_known_packs.json and world_configs/world_{behavior,resource}_packs.json
+from it. Differences from the files on disk are reported first; with
+--check nothing is written and the exit status is 1 if anything differs.
+
+Usage: python3 pack_index.py [--root DIR] [--addons DIR] [--cache FILE] [--check]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+from pack_files import PACK_TYPES, TEXTURE_ATLASES, strip_comments, write_json
+
+# Manifest module types that belong in each kind of pack
+MODULE_TYPES = {
+    "behavior": {"data", "script", "javascript", "client_data"},
+    "resource": {"resources"},
+}
+
+CACHE_NAME = ".pack_index_cache.json"
+
+class ManifestError(ValueError):
+    pass
+
+
+def read_manifest(path: Path) -> dict:
+    """Parse a manifest.json, tolerating a BOM and trailing junk after the object"""
+    text = path.read_text(encoding="utf-8-sig")
+    try:
+        manifest, _ = json.JSONDecoder().raw_decode(text.lstrip())
+    except ValueError as e:
+        raise ManifestError(f"{path}: invalid JSON: {e}")
+    header = manifest.get("header") if isinstance(manifest, dict) else None
+    if not isinstance(header, dict) or "uuid" not in header or "version" not in header:
+        raise ManifestError(f"{path}: manifest has no header uuid/version")
+    return manifest
+
+
+def _pack_record(manifest: dict, pack_type: str, path: str) -> dict:
+    header = manifest["header"]
+    return {
+        "type": pack_type,
+        "path": path,
+        "name": header.get("name", ""),
+        "uuid": header["uuid"],
+        "version": list(header["version"]),
+        "modules": [
+            {"type": module.get("type"), "uuid": module.get("uuid")}
+            for module in manifest.get("modules", [])
+        ],
+        "dependencies": [
+            {"uuid": dep.get("uuid"), "module_name": dep.get("module_name"), "version": dep.get("version")}
+            for dep in manifest.get("dependencies", [])
+        ],
+    }
+
+
+def _read_json(path: Path):
+    """A pack JSON file, tolerating comments and trailing junk; None if unreadable"""
+    try:
+        text = path.read_text(encoding="utf-8-sig")
+        value, _ = json.JSONDecoder().raw_decode(strip_comments(text).lstrip())
+        return value
+    except (OSError, UnicodeDecodeError, ValueError):
+        return None
+
+
+def file_definitions(value, rel: str) -> list[list[str]]:
+    """[kind, identifier] pairs a pack file defines"""
+    if not isinstance(value, dict):
+        return []
+    if rel in TEXTURE_ATLASES:
+        data = value.get("texture_data")
+        return [[TEXTURE_ATLASES[rel], name] for name in data] if isinstance(data, dict) else []
+    definitions = []
+    for key, body in value.items():
+        if not key.startswith("minecraft:") or not isinstance(body, dict):
+            continue
+        description = body.get("description")
+        identifier = description.get("identifier") if isinstance(description, dict) else None
+        if isinstance(identifier, str):
+            kind = key.split(":", 1)[1]
+            definitions.append(["recipe" if kind.startswith("recipe_") else kind, identifier])
+    return definitions
+
+
+class PackIndex:
+    """Pack manifests and definitions under an addons directory, cached by path and mtime
+
+    The cache maps each pack to its manifest's size, mtime and parsed
+    record, and each of its JSON files to its size, mtime and the
+    identifiers it defines, so a rescan only parses files that changed. It
+    is kept in memory between scans and, with `persist`, in a JSON file.
+    Scans are serialised, and `packs` and `definitions` are replaced whole
+    when one finishes, so readers always see a complete scan.
+    """
+
+    def __init__(self, addons_dir: str | Path, cache_path: Optional[str | Path] = None,
+                 persist: bool = True):
+        self.addons_dir = Path(addons_dir)
+        self.cache_path = Path(cache_path) if cache_path else self.addons_dir / CACHE_NAME
+        self.persist = persist
+        self.parsed = 0
+        self.errors: list[str] = []
+        self.packs: Optional[list[dict]] = None
+        self.definitions: list[dict] = []
+        self._cache: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def _load_cache(self) -> dict:
+        if self._cache is None:
+            self._cache = {}
+            if self.persist:
+                try:
+                    self._cache = json.loads(self.cache_path.read_text())
+                except (OSError, ValueError):
+                    pass
+        return self._cache
+
+    def _scan_definitions(self, pack_dir: Path, key: str, cached: dict, definitions: list) -> tuple[dict, int]:
+        """Per-file definition entries for one pack and how many files were reparsed"""
+        files = {}
+        parsed = 0
+        for root, dirs, names in os.walk(pack_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if not name.endswith(".json") or name == "manifest.json":
+                    continue
+                path = Path(root) / name
+                rel = path.relative_to(pack_dir).as_posix()
+                st = path.stat()
+                entry = cached.get(rel)
+                if not entry or entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size:
+                    entry = {
+                        "mtime_ns": st.st_mtime_ns,
+                        "size": st.st_size,
+                        "defines": file_definitions(_read_json(path), rel),
+                    }
+                    parsed += 1
+                files[rel] = entry
+                for kind, identifier in entry["defines"]:
+                    definitions.append({"identifier": identifier, "kind": kind, "pack": key, "file": rel})
+        return files, parsed
+
+    def scan(self) -> list[dict]:
+        """Records for every pack, behavior packs first, each sorted by path"""
+        with self._lock:
+            cache = self._load_cache()
+            fresh = {}
+            packs = []
+            definitions = []
+            errors = []
+            parsed = 0
+            for directory, pack_type in PACK_TYPES.items():
+                root = self.addons_dir / directory
+                if not root.is_dir():
+                    continue
+                for entry in sorted(os.scandir(root), key=lambda e: e.name):
+                    if not entry.is_dir():
+                        continue
+                    manifest_path = Path(entry.path) / "manifest.json"
+                    try:
+                        st = manifest_path.stat()
+                    except FileNotFoundError:
+                        errors.append(f"{directory}/{entry.name}: no manifest.json")
+                        continue
+                    key = f"{directory}/{entry.name}"
+                    cached = cache.get(key)
+                    if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+                        record = cached["record"]
+                    else:
+                        try:
+                            record = _pack_record(read_manifest(manifest_path), pack_type, key)
+                        except ManifestError as e:
+                            errors.append(str(e))
+                            continue
+                        parsed += 1
+                    files, reparsed = self._scan_definitions(
+                        Path(entry.path), key, (cached or {}).get("files", {}), definitions
+                    )
+                    parsed += reparsed
+                    fresh[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "record": record, "files": files}
+                    packs.append(record)
+
+            if self.persist and fresh != cache:
+                write_json(self.cache_path, fresh)
+            self._cache = fresh
+            self.parsed, self.errors = parsed, errors
+            self.packs, self.definitions = packs, definitions
+            return packs
+
+
+def version_string(version: list) -> str:
+    return ".".join(str(part) for part in version)
+
+
+def registration_files(packs: list[dict]) -> dict[str, list]:
+    """Contents of the three registration files, keyed by path relative to the repo root"""
+    return {
+        "valid_known_packs.json": [
+            {
+                "file_system": "RawPath",
+                "path": pack["path"],
+                "uuid": pack["uuid"],
+                "version": version_string(pack["version"]),
+            }
+            for pack in packs
+        ],
+        "world_configs/world_behavior_packs.json": [
+            {"pack_id": pack["uuid"], "version": pack["version"]}
+            for pack in packs if pack["type"] == "behavior"
+        ],
+        "world_configs/world_resource_packs.json": [
+            {"pack_id": pack["uuid"], "version": pack["version"]}
+            for pack in packs if pack["type"] == "resource"
+        ],
+    }
+
+
+def _keep_order(existing: list, generated: list, key) -> list:
+    """Generated entries in the order they already appear on disk, new ones last"""
+    position = {key(entry): i for i, entry in enumerate(existing)}
+    return sorted(generated, key=lambda entry: position.get(key(entry), len(position)))
+
+
+def order_by_dependencies(entries: list[dict], packs: list[dict]) -> tuple[list[dict], list[str]]:
+    """World pack list entries with every pack ahead of the packs it depends on
+
+    Packs listed first take priority, so a pack must come before its
+    dependencies to be able to override them. Otherwise the given order is
+    kept. A dependency cycle is reported and left in the given order.
+    """
+    depends = {
+        pack["uuid"]: {dep["uuid"] for dep in pack["dependencies"] if dep.get("uuid")}
+        for pack in packs
+    }
+    pending = list(entries)
+    ordered = []
+    while pending:
+        waiting = {uuid for entry in pending for uuid in depends.get(entry["pack_id"], ())}
+        ready = next((entry for entry in pending if entry["pack_id"] not in waiting), None)
+        if ready is None:
+            cycle = ", ".join(entry["pack_id"] for entry in pending)
+            return ordered + pending, [f"dependency cycle between packs {cycle}"]
+        ordered.append(ready)
+        pending.remove(ready)
+    return ordered, []
+
+
+def definition_groups(definitions: list[dict], priority: list[str]) -> list[dict]:
+    """Definitions grouped by kind and identifier, sorted by identifier
+
+    `priority` lists pack paths highest priority first (the world list
+    order); the first pack in each group's `packs` is the one that wins.
+    """
+    rank = {path: i for i, path in enumerate(priority)}
+    by_key = {}
+    for definition in definitions:
+        by_key.setdefault((definition["identifier"], definition["kind"]), []).append(definition)
+
+    groups = []
+    for (identifier, kind), found in sorted(by_key.items()):
+        files = {}
+        for definition in found:
+            files.setdefault(definition["pack"], definition["file"])
+        groups.append({
+            "identifier": identifier,
+            "kind": kind,
+            "packs": sorted(files, key=lambda path: (rank.get(path, len(rank)), path)),
+            "files": files,
+            "overrides_vanilla": identifier.startswith("minecraft:"),
+        })
+    return groups
+
+
+def find_conflicts(definitions: list[dict], priority: list[str]) -> list[dict]:
+    """Identifiers defined by more than one pack, or overriding a vanilla one"""
+    return [
+        group for group in definition_groups(definitions, priority)
+        if len(group["packs"]) > 1 or group["overrides_vanilla"]
+    ]
+
+
+def who_defines(definitions: list[dict], identifier: str, priority: list[str]) -> list[dict]:
+    """The packs defining an identifier, one group per kind"""
+    return definition_groups([d for d in definitions if d["identifier"] == identifier], priority)
+
+
+def pack_priority(packs: list[dict], world_lists: list[Optional[list]]) -> list[str]:
+    """Pack paths highest priority first, as ordered by the world pack lists"""
+    by_uuid = {pack["uuid"]: pack["path"] for pack in packs}
+    order = [
+        by_uuid[entry["pack_id"]]
+        for entries in world_lists for entry in entries or []
+        if isinstance(entry, dict) and entry.get("pack_id") in by_uuid
+    ]
+    return order + [pack["path"] for pack in packs if pack["path"] not in order]
+
+
+def check_packs(packs: list[dict]) -> list[str]:
+    """Problems inside the manifests themselves"""
+    problems = []
+    seen = {}
+    uuids = {pack["uuid"] for pack in packs}
+    for pack in packs:
+        for dep in pack["dependencies"]:
+            if dep.get("uuid") and dep["uuid"] not in uuids:
+                problems.append(f"{pack['path']}: depends on {dep['uuid']}, which no pack in addons/ provides")
+        if pack["uuid"] in seen:
+            problems.append(f"{pack['path']}: uuid {pack['uuid']} is also used by {seen[pack['uuid']]}")
+        seen[pack["uuid"]] = pack["path"]
+        for module in pack["modules"]:
+            if module["type"] not in MODULE_TYPES[pack["type"]]:
+                problems.append(f"{pack['path']}: module type '{module['type']}' in a {pack['type']} pack")
+    return problems
+
+
+def compare(existing: Optional[list], generated: list, name: str, key: str) -> list[str]:
+    """Human-readable differences between a registration file and the manifests"""
+    if existing is None:
+        return [f"{name}: missing"]
+    on_disk = {entry.get(key): entry for entry in existing if isinstance(entry, dict)}
+    wanted = {entry[key]: entry for entry in generated}
+    problems = []
+    for id_, entry in wanted.items():
+        if id_ not in on_disk:
+            problems.append(f"{name}: {id_} is not registered")
+        elif on_disk[id_] != entry:
+            problems.append(f"{name}: {id_} is {json.dumps(on_disk[id_])}, manifest says {json.dumps(entry)}")
+    for id_ in on_disk.keys() - wanted.keys():
+        problems.append(f"{name}: {id_} has no matching pack in addons/")
+    return problems
+
+
+def _read_list(path: Path) -> Optional[list]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _describe(conflict: dict) -> str:
+    packs = ", ".join(f"{pack} ({conflict['files'][pack]})" for pack in conflict["packs"])
+    vanilla = ", overrides vanilla" if conflict["overrides_vanilla"] else ""
+    return f"{conflict['identifier']} ({conflict['kind']}{vanilla}): {packs}"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate pack registration files from manifests")
+    parser.add_argument("--root", default=Path(__file__).parent, type=Path,
+                        help="directory holding valid_known_packs.json and world_configs/")
+    parser.add_argument("--addons", type=Path, help="add-on directory (default: ROOT/addons)")
+    parser.add_argument("--cache", type=Path, help=f"index cache file (default: ADDONS/{CACHE_NAME})")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="only report differences")
+    mode.add_argument("--who", metavar="IDENTIFIER", help="list the packs that define an identifier")
+    mode.add_argument("--conflicts", action="store_true",
+                      help="list identifiers defined by several packs or overriding vanilla")
+    args = parser.parse_args(argv)
+
+    index = PackIndex(args.addons or args.root / "addons", args.cache)
+    packs = index.scan()
+
+    if args.who or args.conflicts:
+        priority = pack_priority(packs, [
+            _read_list(args.root / "world_configs/world_behavior_packs.json"),
+            _read_list(args.root / "world_configs/world_resource_packs.json"),
+        ])
+        if args.who:
+            groups = who_defines(index.definitions, args.who, priority)
+            if not groups:
+                print(f"{args.who} is not defined by any pack")
+                return 1
+        else:
+            groups = find_conflicts(index.definitions, priority)
+        for group in groups:
+            print(_describe(group))
+        if args.conflicts:
+            print(f"{len(groups)} conflicts; where several packs are listed, the first one wins")
+        return 0
+
+    problems = index.errors + check_packs(packs)
+
+    keys = {"valid_known_packs.json": "path"}
+    changed = []
+    for name, generated in registration_files(packs).items():
+        key = keys.get(name, "pack_id")
+        path = args.root / name
+        existing = _read_list(path)
+        generated = _keep_order(existing or [], generated, lambda entry: entry.get(key))
+        problems += compare(existing, generated, name, key)
+        if key == "pack_id":
+            kept = generated
+            generated, cycles = order_by_dependencies(kept, packs)
+            problems += [f"{name}: {cycle}" for cycle in cycles]
+            if generated != kept:
+                problems.append(f"{name}: packs must be listed ahead of the packs they depend on")
+        if existing != generated:
+            changed.append((path, generated))
+
+    for problem in problems:
+        print(f"  ! {problem}")
+    print(f"{len(packs)} packs ({index.parsed} files parsed), {len(changed)} files out of date")
+
+    if args.check:
+        return 1 if problems else 0
+    for path, generated in changed:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(generated, indent=4) + "\n")
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
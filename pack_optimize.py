@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Lossless size optimisation for pack files
+
+PNGs are decoded to their scanlines and re-encoded with the best of
+several filter choices at maximum zlib effort (large images keep their
+own filters), keeping only the chunks that affect the pixels. JSON is parsed and written back without
+whitespace. Anything that cannot be parsed is passed through unchanged,
+as is any result that would not be smaller.
+"""
+
+import json
+import struct
+import zlib
+from typing import Optional
+
+from pack_files import strip_comments
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Chunks that change how the pixels decode; every other chunk is metadata
+PNG_KEEP = {b"IHDR", b"PLTE", b"tRNS", b"IDAT", b"IEND"}
+
+# Samples per pixel for each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+JSON_SUFFIXES = (".json", ".material")
+
+# Bump when the output of optimize() changes so cached results are discarded
+OPTIMIZER_VERSION = 2
+
+# Re-filtering runs per byte in Python, so only images up to this much raw
+# data (256x256 RGBA) get it; larger ones keep their filters and are just
+# deflated again
+REFILTER_MAX_BYTES = 256 * 256 * 4 + 256
+
+
+class PNGError(ValueError):
+    pass
+
+
+def _chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise PNGError("not a PNG")
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise PNGError("truncated chunk header")
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length or pos + 12 + length > len(data):
+            raise PNGError(f"truncated {kind!r} chunk")
+        crc, = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        if zlib.crc32(kind + body) != crc:
+            raise PNGError(f"bad CRC in {kind!r} chunk")
+        chunks.append((kind, body))
+        pos += 12 + length
+        if kind == b"IEND":
+            break
+    if not chunks or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        raise PNGError("missing IHDR or IEND")
+    return chunks
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def unfilter(raw: bytes, height: int, stride: int, bpp: int) -> list[bytearray]:
+    """Reconstruct the scanlines of a non-interlaced image"""
+    if len(raw) != height * (stride + 1):
+        raise PNGError("image data has the wrong length")
+    rows = []
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif kind == 2:
+            for i in range(stride):
+                row[i] = (row[i] + prev[i]) & 0xFF
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                upper_left = prev[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, prev[i], upper_left)) & 0xFF
+        elif kind != 0:
+            raise PNGError(f"unknown filter type {kind}")
+        rows.append(row)
+        prev = row
+    return rows
+
+
+def _filter_row(kind: int, row: bytearray, prev: bytearray, bpp: int) -> bytes:
+    if kind == 0:
+        return bytes(row)
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        if kind == 1:
+            predicted = left
+        elif kind == 2:
+            predicted = prev[i]
+        elif kind == 3:
+            predicted = (left + prev[i]) >> 1
+        else:
+            predicted = _paeth(left, prev[i], prev[i - bpp] if i >= bpp else 0)
+        out[i] = (row[i] - predicted) & 0xFF
+    return bytes(out)
+
+
+def refilter(rows: list[bytearray], bpp: int, adaptive: bool) -> bytes:
+    """Filtered image data: no filter, or the usual minimum-sum heuristic per row"""
+    out = bytearray()
+    prev = bytearray(len(rows[0]) if rows else 0)
+    for row in rows:
+        if adaptive:
+            candidates = [_filter_row(kind, row, prev, bpp) for kind in range(5)]
+            kind = min(range(5), key=lambda k: sum(b if b < 128 else 256 - b for b in candidates[k]))
+            filtered = candidates[kind]
+        else:
+            kind, filtered = 0, bytes(row)
+        out.append(kind)
+        out += filtered
+        prev = row
+    return bytes(out)
+
+
+def _deflate(data: bytes, strategy: int) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Smallest lossless re-encoding of a PNG, or the original if nothing is smaller"""
+    chunks = _chunks(data)
+    width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+    if color_type not in PNG_CHANNELS:
+        raise PNGError(f"unknown color type {color_type}")
+    try:
+        raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    except zlib.error as e:
+        raise PNGError(f"bad image data: {e}")
+
+    candidates = [raw]
+    if not interlace and height and len(raw) <= REFILTER_MAX_BYTES:
+        bits = PNG_CHANNELS[color_type] * depth
+        bpp = max(1, bits // 8)
+        rows = unfilter(raw, height, (width * bits + 7) // 8, bpp)
+        candidates += [refilter(rows, bpp, adaptive=False), refilter(rows, bpp, adaptive=True)]
+    idat = min(
+        (_deflate(candidate, strategy) for candidate in candidates
+         for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)),
+        key=len,
+    )
+
+    out = [PNG_SIGNATURE]
+    for kind, body in chunks:
+        if kind == b"IDAT":
+            if idat is not None:
+                out.append(_chunk(b"IDAT", idat))
+                idat = None
+        elif kind in PNG_KEEP:
+            out.append(_chunk(kind, body))
+    result = b"".join(out)
+    return result if len(result) < len(data) else data
+
+
+def minify_json(data: bytes) -> bytes:
+    """JSON without whitespace, comments or trailing junk; unparseable input is returned as is"""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data
+    decoder = json.JSONDecoder()
+    for candidate in (text, strip_comments(text)):
+        try:
+            value, _ = decoder.raw_decode(candidate.lstrip())
+        except ValueError:
+            continue
+        result = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+        return result if len(result) < len(data) else data
+    return data
+
+
+def optimizer_kind(name: str) -> Optional[str]:
+    """"png" or "json" for files optimize() can shrink, else None"""
+    lower = name.lower()
+    if lower.endswith(".png"):
+        return "png"
+    if lower.endswith(JSON_SUFFIXES):
+        return "json"
+    return None
+
+
+def optimize(name: str, data: bytes) -> bytes:
+    """Optimised contents of a pack file, chosen by its name"""
+    kind = optimizer_kind(name)
+    if kind == "png":
+        try:
+            return optimize_png(data)
+        except PNGError:
+            return data
+    if kind == "json":
+        return minify_json(data)
+    return data
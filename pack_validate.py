@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Validate the add-on packs before Bedrock loads them
+
+Bedrock skips broken pack files without saying much. This checks every
+JSON file under addons/behavior_packs and addons/resource_packs against
+the structural rules Bedrock applies (parseable JSON, format_version,
+identifiers, Molang syntax, manifest headers), then cross-references the
+packs: icons and atlas entries against textures, ammunition and
+projectiles against defined items and entities, behavior entities
+against client entities, and manifest UUIDs against each other.
+
+Per-file results are cached by content hash, so only new or changed
+files are validated again; those run in a process pool.
+
+Usage: python3 pack_validate.py [--addons DIR] [--cache FILE] [--jobs N] [--strict]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from pack_files import PACK_TYPES, TEXTURE_ATLASES, file_hash, strip_comments, write_json
+from pack_index import MODULE_TYPES
+
+CACHE_NAME = ".pack_validate_cache.json"
+
+# Bump when the rules change so cached results are discarded
+VALIDATOR_VERSION = 1
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+# File roles by pack type and pack-relative directory, with the top-level
+# object each must hold
+ROLES = {
+    ("behavior", "items"): ("item", "minecraft:item"),
+    ("behavior", "entities"): ("entity", "minecraft:entity"),
+    ("behavior", "blocks"): ("block", "minecraft:block"),
+    ("resource", "entity"): ("client_entity", "minecraft:client_entity"),
+}
+TEXTURE_SUFFIXES = (".png", ".tga", ".jpg", ".jpeg")
+
+FORMAT_VERSION_PATTERN = re.compile(r"^\d+\.\d+(\.\d+){0,2}$")
+IDENTIFIER_PATTERN = re.compile(r"^[a-z0-9_.\-]+:[a-z0-9_.\-/]+$")
+UUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+# Custom items need the data-driven item format
+CUSTOM_ITEM_FORMAT = (1, 16, 100)
+
+MOLANG_NAMESPACES = {
+    "q", "query", "v", "variable", "t", "temp", "c", "context",
+    "math", "geometry", "material", "texture", "array",
+}
+MOLANG_KEYWORDS = {"return", "loop", "for_each", "break", "continue", "this", "true", "false"}
+# Strings that look like Molang: they use one of the variable namespaces
+MOLANG_HINT = re.compile(r"(?<![\w.])(q|query|v|variable|t|temp|c|context|math)\.[a-z_]", re.IGNORECASE)
+MOLANG_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(\d+\.?\d*|\.\d+)f?)
+  | (?P<string>'[^']*')
+  | (?P<name>[A-Za-z_]\w*(\.[A-Za-z_]\w*)*)
+  | (?P<op>->|&&|\|\||==|!=|<=|>=|\?\?|[-+*/<>!?:=])
+  | (?P<punct>[()\[\]{},;])
+""", re.VERBOSE)
+CLOSING = {")": "(", "]": "[", "}": "{"}
+
+
+def molang_error(expression: str) -> Optional[str]:
+    """The first syntax problem in a Molang expression, or None"""
+    stack = []
+    expect_operand = True
+    previous = None
+    pos = 0
+    while pos < len(expression):
+        match = MOLANG_TOKEN.match(expression, pos)
+        if not match:
+            if expression[pos] == "'":
+                return "unterminated string"
+            return f"unexpected character {expression[pos]!r} at {pos}"
+        pos = match.end()
+        kind, token = match.lastgroup, match.group()
+        if kind == "space":
+            continue
+
+        if kind in ("number", "string", "name"):
+            if not expect_operand:
+                return f"missing operator before {token!r}"
+            if kind == "name":
+                namespace = token.split(".", 1)[0].lower()
+                if "." in token and namespace not in MOLANG_NAMESPACES:
+                    return f"unknown namespace in {token!r}"
+                if "." not in token and token.lower() not in MOLANG_KEYWORDS:
+                    return f"unknown name {token!r}"
+            # `return` is followed by the value it returns
+            expect_operand = token.lower() == "return"
+        elif token in "([{":
+            # Calls and indexing follow a name; anything else must start an operand
+            if not expect_operand and not (token in "([" and previous and previous[0] == "name"):
+                return f"missing operator before {token!r}"
+            stack.append(token)
+            expect_operand = True
+        elif token in CLOSING:
+            if not stack or stack[-1] != CLOSING[token]:
+                return f"unbalanced {token!r}"
+            if expect_operand and previous[1] not in ("(", "{", ";"):
+                return f"missing operand before {token!r}"
+            stack.pop()
+            expect_operand = False
+        elif token == ";":
+            if expect_operand and previous and previous[1] not in (";", "{"):
+                return "missing operand before ';'"
+            expect_operand = True
+        elif token in ("!", "-") and expect_operand:
+            pass
+        else:
+            if expect_operand:
+                return f"missing operand before {token!r}"
+            expect_operand = True
+        previous = (kind, token)
+
+    if stack:
+        return f"unclosed {stack[-1]!r}"
+    if previous is None:
+        return "empty expression"
+    if expect_operand and previous[1] != ";":
+        return f"expression ends with {previous[1]!r}"
+    return None
+
+
+def _version_tuple(version: str) -> tuple:
+    return tuple(int(part) for part in version.split("."))
+
+
+def parse_json(data: bytes) -> tuple[object, list[tuple[str, str]]]:
+    """Parsed JSON and any problems; the value is None if it cannot be parsed"""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return None, [("error", "not UTF-8 text")]
+    for candidate in (text, strip_comments(text)):
+        try:
+            return json.loads(candidate), []
+        except ValueError:
+            pass
+    try:
+        value, _ = json.JSONDecoder().raw_decode(strip_comments(text).lstrip())
+        return value, [("warning", "content after the end of the JSON value")]
+    except ValueError as e:
+        return None, [("error", f"invalid JSON: {e}")]
+
+
+def _walk_strings(value, path: str = ""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _walk_strings(item, f"{path}/{key}" if path else key)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _walk_strings(item, f"{path}[{i}]")
+    elif isinstance(value, str):
+        yield path, value
+
+
+def _custom(identifier) -> bool:
+    return isinstance(identifier, str) and ":" in identifier and not identifier.startswith("minecraft:")
+
+
+def _icon_texture(components: dict) -> Optional[str]:
+    icon = components.get("minecraft:icon")
+    if isinstance(icon, str):
+        return icon
+    if isinstance(icon, dict):
+        if isinstance(icon.get("texture"), str):
+            return icon["texture"]
+        textures = icon.get("textures")
+        if isinstance(textures, dict) and isinstance(textures.get("default"), str):
+            return textures["default"]
+    return None
+
+
+def _check_manifest(manifest: dict, pack_type: str, problems: list, facts: dict):
+    if manifest.get("format_version") not in (1, 2, 3):
+        problems.append(("error", f"manifest format_version {manifest.get('format_version')!r} is not 1, 2 or 3"))
+    header = manifest.get("header")
+    if not isinstance(header, dict):
+        problems.append(("error", "manifest has no header"))
+        return
+    for part, owner in [(header, "header")] + [(m, "module") for m in manifest.get("modules", []) if isinstance(m, dict)]:
+        if not isinstance(part.get("uuid"), str) or not UUID_PATTERN.match(part["uuid"]):
+            problems.append(("error", f"{owner} uuid {part.get('uuid')!r} is not a UUID"))
+        version = part.get("version")
+        if not (isinstance(version, list) and len(version) == 3 and all(isinstance(v, int) for v in version)):
+            problems.append(("error", f"{owner} version {version!r} is not [major, minor, patch]"))
+    for module in manifest.get("modules", []):
+        if isinstance(module, dict) and module.get("type") not in MODULE_TYPES[pack_type]:
+            problems.append(("error", f"module type {module.get('type')!r} does not belong in a {pack_type} pack"))
+    if isinstance(header.get("uuid"), str):
+        facts["uuid"] = header["uuid"]
+
+
+def _check_definition(value: dict, role: str, top_key: str, problems: list, facts: dict):
+    format_version = value.get("format_version")
+    if not isinstance(format_version, str) or not FORMAT_VERSION_PATTERN.match(format_version):
+        problems.append(("error", f"format_version {format_version!r} is not a version string like \"1.20.20\""))
+        format_version = None
+
+    body = value.get(top_key)
+    if not isinstance(body, dict):
+        problems.append(("error", f"no {top_key} object"))
+        return
+    description = body.get("description", {})
+    identifier = description.get("identifier") if isinstance(description, dict) else None
+    if not isinstance(identifier, str) or not IDENTIFIER_PATTERN.match(identifier):
+        problems.append(("error", f"identifier {identifier!r} is not namespace:name in lower case"))
+        return
+    facts["defines"] = [role, identifier]
+
+    components = body.get("components", {})
+    if not isinstance(components, dict):
+        problems.append(("error", "components is not an object"))
+        return
+    if role != "item":
+        return
+    if _custom(identifier) and format_version and _version_tuple(format_version) < CUSTOM_ITEM_FORMAT:
+        problems.append(("warning", f"custom item uses format_version {format_version}; custom items need 1.16.100 or later"))
+    icon = _icon_texture(components)
+    if icon:
+        facts["icon"] = icon
+    shooter = components.get("minecraft:shooter")
+    if isinstance(shooter, dict):
+        facts["items"] = [
+            ammo["item"] for ammo in shooter.get("ammunition", [])
+            if isinstance(ammo, dict) and isinstance(ammo.get("item"), str)
+        ]
+    projectile = components.get("minecraft:projectile")
+    if isinstance(projectile, dict) and isinstance(projectile.get("projectile_entity"), str):
+        facts["entities"] = [projectile["projectile_entity"]]
+
+
+def _check_atlas(value: dict, problems: list, facts: dict):
+    data = value.get("texture_data")
+    if not isinstance(data, dict):
+        problems.append(("error", "texture atlas has no texture_data object"))
+        return
+    textures = {}
+    for name, entry in data.items():
+        paths = entry.get("textures") if isinstance(entry, dict) else None
+        if isinstance(paths, (str, dict)):
+            paths = [paths]
+        if not isinstance(paths, list):
+            problems.append(("error", f"texture {name!r} has no textures"))
+            continue
+        textures[name] = [p["path"] if isinstance(p, dict) else p for p in paths
+                          if isinstance(p, str) or (isinstance(p, dict) and isinstance(p.get("path"), str))]
+    facts["textures"] = textures
+
+
+def validate_file(role: str, pack_type: str, data: bytes) -> dict:
+    """Problems in one file, plus the facts the cross-pack checks need"""
+    facts = {}
+    value, problems = parse_json(data)
+    if value is None:
+        return {"problems": problems, "facts": facts}
+    if role != "json" and not isinstance(value, dict):
+        problems.append(("error", "top level is not an object"))
+        return {"problems": problems, "facts": facts}
+
+    if role == "manifest":
+        _check_manifest(value, pack_type, problems, facts)
+    elif role == "atlas":
+        _check_atlas(value, problems, facts)
+    elif role != "json":
+        top_key = next(key for r, key in ROLES.values() if r == role)
+        _check_definition(value, role, top_key, problems, facts)
+
+    for path, text in _walk_strings(value):
+        if MOLANG_HINT.search(text):
+            error = molang_error(text)
+            if error:
+                problems.append(("error", f"{path}: invalid Molang ({error}): {text}"))
+    return {"problems": problems, "facts": facts}
+
+
+def _validate_job(job: tuple[str, str, str]) -> dict:
+    role, pack_type, path = job
+    return validate_file(role, pack_type, Path(path).read_bytes())
+
+
+def file_role(pack_type: str, rel: str) -> Optional[str]:
+    """How a pack file is validated, or None for files that are not checked"""
+    if not rel.lower().endswith(".json"):
+        return None
+    if rel == "manifest.json":
+        return "manifest"
+    if pack_type == "resource" and rel in TEXTURE_ATLASES:
+        return "atlas"
+    top = rel.split("/", 1)[0] if "/" in rel else ""
+    return ROLES.get((pack_type, top), ("json",))[0]
+
+
+class PackValidator:
+    """Validates every pack under an addons directory, caching per-file results by hash"""
+
+    def __init__(self, addons_dir: str | Path, cache_path: Optional[str | Path] = None,
+                 jobs: Optional[int] = None):
+        self.addons_dir = Path(addons_dir)
+        self.cache_path = Path(cache_path) if cache_path else self.addons_dir / CACHE_NAME
+        self.jobs = jobs or os.cpu_count() or 1
+
+    def _load_cache(self) -> dict:
+        try:
+            cache = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return {"files": {}, "results": {}}
+        if cache.get("version") != VALIDATOR_VERSION:
+            return {"files": {}, "results": {}}
+        return cache
+
+    def _save_cache(self, cache: dict):
+        try:
+            write_json(self.cache_path, {**cache, "version": VALIDATOR_VERSION})
+        except OSError:
+            pass
+
+    def scan(self) -> dict[str, dict]:
+        """Pack directories keyed by "<pack dir>/<pack>" with their type and file list"""
+        packs = {}
+        for directory, pack_type in PACK_TYPES.items():
+            root = self.addons_dir / directory
+            if not root.is_dir():
+                continue
+            for entry in sorted(os.scandir(root), key=lambda e: e.name):
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                files = []
+                for dirpath, dirs, names in os.walk(entry.path):
+                    dirs[:] = [d for d in dirs if not d.startswith(".")]
+                    files += [
+                        (Path(dirpath) / name).relative_to(entry.path).as_posix()
+                        for name in names if not name.startswith(".")
+                    ]
+                packs[f"{directory}/{entry.name}"] = {"type": pack_type, "files": sorted(files)}
+        return packs
+
+    def validate(self) -> dict:
+        started = time.perf_counter()
+        cache = self._load_cache()
+        packs = self.scan()
+        files_cache = {}
+        keys = {}
+        todo = {}
+
+        for pack, info in packs.items():
+            for rel in info["files"]:
+                role = file_role(info["type"], rel)
+                if role is None:
+                    continue
+                name = f"{pack}/{rel}"
+                path = self.addons_dir / name
+                st = path.stat()
+                entry = cache["files"].get(name)
+                if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": file_hash(path)}
+                files_cache[name] = entry
+                key = f"{info['type']}:{role}:{entry['hash']}"
+                keys[name] = key
+                if key not in cache["results"] and key not in todo:
+                    todo[key] = (role, info["type"], str(path))
+
+        results = {key: cache["results"][key] for key in set(keys.values()) if key in cache["results"]}
+        jobs = list(todo.items())
+        if self.jobs > 1 and len(jobs) >= PARALLEL_THRESHOLD:
+            # Spawned, not forked: the caller may be a threaded server
+            with ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+                validated = pool.map(_validate_job, [job for _, job in jobs], chunksize=16)
+                results.update(zip(todo, validated))
+        else:
+            results.update((key, _validate_job(job)) for key, job in jobs)
+
+        problems = [
+            {"severity": severity, "file": name, "message": message}
+            for name, key in keys.items()
+            for severity, message in results[key]["problems"]
+        ]
+        problems += cross_check(packs, {name: results[key]["facts"] for name, key in keys.items()})
+        self._save_cache({"files": files_cache, "results": results})
+
+        return {
+            "packs": len(packs),
+            "files": len(keys),
+            "validated": len(todo),
+            "errors": sum(1 for p in problems if p["severity"] == "error"),
+            "warnings": sum(1 for p in problems if p["severity"] == "warning"),
+            "problems": problems,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+
+
+def cross_check(packs: dict[str, dict], facts: dict[str, dict]) -> list[dict]:
+    """Problems between files: references to things no pack defines"""
+    problems = []
+
+    def report(severity, name, message):
+        problems.append({"severity": severity, "file": name, "message": message})
+
+    defined = {"item": {}, "entity": {}, "block": {}, "client_entity": {}}
+    textures = {}
+    uuids = {}
+    for name, fact in facts.items():
+        if "defines" in fact:
+            role, identifier = fact["defines"]
+            defined[role].setdefault(identifier, name)
+        textures.update(fact.get("textures", {}))
+        if "uuid" in fact:
+            if fact["uuid"] in uuids:
+                report("error", name, f"pack uuid {fact['uuid']} is also used by {uuids[fact['uuid']]}")
+            uuids.setdefault(fact["uuid"], name)
+
+    for name, fact in facts.items():
+        if "icon" in fact and fact["icon"] not in textures and _custom(fact["defines"][1]):
+            report("error", name, f"icon texture {fact['icon']!r} is not in any resource pack's item_texture.json")
+        for item in fact.get("items", []):
+            if _custom(item) and item not in defined["item"]:
+                report("error", name, f"ammunition {item} is not defined by any behavior pack")
+        for entity in fact.get("entities", []):
+            if _custom(entity) and entity not in defined["entity"]:
+                report("error", name, f"projectile entity {entity} is not defined by any behavior pack")
+
+        pack = name.split("/", 2)
+        pack_files = set(packs["/".join(pack[:2])]["files"]) if len(pack) == 3 else set()
+        for texture, paths in fact.get("textures", {}).items():
+            for path in paths:
+                if not any(f"{path}{suffix}" in pack_files for suffix in TEXTURE_SUFFIXES):
+                    report("warning", name, f"texture {texture!r}: {path} is not in this pack (fine only if it is a vanilla texture)")
+
+    for identifier, name in defined["entity"].items():
+        if _custom(identifier) and identifier not in defined["client_entity"]:
+            report("warning", name, f"entity {identifier} has no client entity in any resource pack and will be invisible")
+    for identifier, name in defined["client_entity"].items():
+        if _custom(identifier) and identifier not in defined["entity"]:
+            report("warning", name, f"client entity {identifier} has no behavior pack entity")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate add-on packs")
+    parser.add_argument("--addons", default=Path(__file__).parent / "addons", type=Path,
+                        help="directory holding behavior_packs/ and resource_packs/")
+    parser.add_argument("--cache", type=Path, help=f"result cache file (default: ADDONS/{CACHE_NAME})")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--strict", action="store_true", help="exit 1 on warnings as well as errors")
+    args = parser.parse_args(argv)
+
+    result = PackValidator(args.addons, args.cache, args.jobs).validate()
+    for problem in result["problems"]:
+        marker = "!" if problem["severity"] == "error" else "?"
+        print(f"  {marker} {problem['file']}: {problem['message']}")
+    print(
+        f"{result['packs']} packs, {result['files']} files ({result['validated']} validated): "
+        f"{result['errors']} errors, {result['warnings']} warnings in {result['seconds']:.3f}s"
+    )
+    if result["errors"] or (args.strict and result["warnings"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
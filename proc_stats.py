@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Optional
+
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid: int, proc: str) -> Optional[dict]:
+    try:
+        with open(f"{proc}/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # The command name may contain spaces, so split after its closing paren
+    fields = stat[stat.rfind(")") + 2:].split()
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+        "threads": int(fields[17]),
+        "rss_bytes": int(fields[21]) * PAGE_SIZE,
+    }
+
+
+def _read_keyed(path: str) -> dict:
+    """Parse a "key: value" /proc file such as status or io"""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                values[key] = value.split()
+    except OSError:
+        pass
+    return values
+
+
+def read_process_stats(pid: int, proc: str = "/proc") -> Optional[dict]:
+    """Resource usage of a process from /proc/<pid>/stat and its fd table
+
+    Returns None if the process is gone (or /proc is unavailable).
+    """
+    stats = _read_stat(pid, proc)
+    if stats is None:
+        return None
+
+    try:
+        stats["open_fds"] = len(os.listdir(f"{proc}/{pid}/fd"))
+    except OSError:
+        stats["open_fds"] = None
+    return stats
+
+
+def read_process_sample(pid: int, proc: str = "/proc") -> Optional[dict]:
+    """Point-in-time sample from /proc/<pid>/stat, status and io
+
+    Adds peak RSS from `status` and cumulative disk read/write bytes from
+    `io` to the stat fields. `io` needs ptrace access to the process, so its
+    fields are None when it cannot be read. Returns None if the process is
+    gone.
+    """
+    sample = _read_stat(pid, proc)
+    if sample is None:
+        return None
+
+    status = _read_keyed(f"{proc}/{pid}/status")
+    if "VmRSS" in status:
+        sample["rss_bytes"] = int(status["VmRSS"][0]) * 1024
+    sample["peak_rss_bytes"] = int(status["VmHWM"][0]) * 1024 if "VmHWM" in status else None
+
+    io = _read_keyed(f"{proc}/{pid}/io")
+    sample["read_bytes"] = int(io["read_bytes"][0]) if "read_bytes" in io else None
+    sample["write_bytes"] = int(io["write_bytes"][0]) if "write_bytes" in io else None
+    return sample
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Callable, Optional
+
+from proc_stats import read_process_sample
+
+logger = logging.getLogger(__name__)
+
+
+# Columns of the time series, in storage order
+SERIES = ("cpu_percent", "rss_bytes", "read_bytes_per_sec", "write_bytes_per_sec", "threads")
+
+
+class ResourceHistory:
+    """Fixed-size time series of process resource samples
+
+    Each column is a preallocated `array('d')` used as a ring indexed by
+    `n % capacity`, so appending never allocates and memory stays constant
+    however long the server runs. Missing values are stored as NaN and read
+    back as None.
+    """
+
+    def __init__(self, capacity: int = 720):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._timestamps = array("d", [0.0]) * capacity
+        self._columns = {name: array("d", [0.0]) * capacity for name in SERIES}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, **values: Optional[float]):
+        """Store one sample taken at `timestamp` (seconds since the epoch)"""
+        with self._lock:
+            slot = self._count % self.capacity
+            self._timestamps[slot] = timestamp
+            for name, column in self._columns.items():
+                value = values.get(name)
+                column[slot] = math.nan if value is None else value
+            self._count += 1
+
+    def window(self, seconds: Optional[float] = None, now: Optional[float] = None) -> list[dict]:
+        """Samples from the last `seconds` (all held samples if None), oldest first"""
+        cutoff = (now or time.time()) - seconds if seconds is not None else -math.inf
+        samples = []
+        with self._lock:
+            # Walk back from the newest sample until we leave the window
+            for n in range(self._count - 1, self._count - len(self) - 1, -1):
+                slot = n % self.capacity
+                timestamp = self._timestamps[slot]
+                if timestamp < cutoff:
+                    break
+                sample = {"timestamp": datetime.fromtimestamp(timestamp).isoformat()}
+                for name, column in self._columns.items():
+                    value = column[slot]
+                    sample[name] = None if math.isnan(value) else value
+                samples.append(sample)
+        samples.reverse()
+        return samples
+
+
+class ResourceSampler:
+    """Background task that samples a process into a ResourceHistory
+
+    Reads `/proc/<pid>/stat`, `status` and `io` every `interval` seconds and
+    turns the cumulative CPU time and I/O byte counters into rates. The reads
+    are a few small procfs files, cheap enough to do on the event loop.
+    Sampling ends by itself once the process is gone; `start` again for a new
+    pid.
+    """
+
+    def __init__(self, history: ResourceHistory, interval: float = 5.0,
+                 reader: Callable[[int], Optional[dict]] = read_process_sample):
+        self.history = history
+        self.interval = interval
+        self._reader = reader
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, pid: int):
+        self.stop()
+        self._task = asyncio.get_running_loop().create_task(self._run(pid))
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self, pid: int):
+        previous = self._reader(pid)
+        previous_time = time.time()
+        while previous is not None:
+            await asyncio.sleep(self.interval)
+            current = self._reader(pid)
+            now = time.time()
+            if current is None:
+                break
+            self.history.append(now, **self._rates(previous, current, now - previous_time))
+            previous, previous_time = current, now
+        logger.debug(f"Resource sampling ended for pid {pid}")
+
+    @staticmethod
+    def _rates(previous: dict, current: dict, elapsed: float) -> dict:
+        def per_second(key: str) -> Optional[float]:
+            if current.get(key) is None or previous.get(key) is None or elapsed <= 0:
+                return None
+            return max(0, current[key] - previous[key]) / elapsed
+
+        cpu = per_second("cpu_seconds")
+        return {
+            "cpu_percent": None if cpu is None else round(cpu * 100, 2),
+            "rss_bytes": current["rss_bytes"],
+            "read_bytes_per_sec": per_second("read_bytes"),
+            "write_bytes_per_sec": per_second("write_bytes"),
+            "threads": current["threads"],
+        }
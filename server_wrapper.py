@@ -1,113 +1,682 @@
 #!/usr/bin/env python3
 
 import asyncio
+import json
 import logging
 import os
+import re
+import queue
 import subprocess
+import sys
+import tarfile
 import threading
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 import uvicorn
 
+from addon_watcher import AddonWatcher
+from backup_store import (
+    EXPORT_FORMATS, BackupStore, ChunkReader, SAVE_FILES_PATTERN, parse_save_query, scan_world
+)
+from command_history import CommandHistory
+from command_queue import CommandRejected, CommandScheduler, classify
+from console_filter import ConsoleFilter
+from console_events import ConsoleEvent, EventParser, PlayerIndex
+from log_stream import LogBroadcaster
+from log_writer import BatchLogHandler, RotatingLogFile
+from metrics import MetricsRegistry
+from output_buffer import OutputBuffer
+from pack_index import PackIndex, find_conflicts, pack_priority, who_defines
+from pack_validate import PackValidator
+from proc_stats import read_process_stats
+from resource_history import ResourceHistory, ResourceSampler
+
 
 # Configure logging
 def setup_logging():
-    handlers = [logging.StreamHandler()]
+    """Route all logging through one batching writer thread
     
-    # Only add file handler if directory exists (for production)
-    log_path = Path('/app/server.log')
+    Server output is logged line by line from the output reader, so console
+    and file writes happen off that thread. The file rotates by size and age
+    and old segments are gzip-compressed in the background.
+    """
+    targets = [sys.stderr]
+    
+    # Only add the log file if its directory exists (for production)
+    log_path = Path(os.environ.get('SERVER_LOG', '/app/server.log'))
     if log_path.parent.exists():
-        handlers.append(logging.FileHandler(log_path))
+        max_age = float(os.environ.get('LOG_ROTATE_SECONDS', '86400'))
+        targets.append(RotatingLogFile(
+            log_path,
+            max_bytes=int(os.environ.get('LOG_MAX_BYTES', str(50 * 1024 * 1024))),
+            max_age=max_age or None,
+            backups=int(os.environ.get('LOG_BACKUPS', '10')),
+            compress=os.environ.get('LOG_COMPRESS', '1') != '0'
+        ))
     
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
+        handlers=[BatchLogHandler(targets)]
     )
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
+# Metrics exposed on /metrics, labelled by server instance
+METRICS = MetricsRegistry()
+COMMAND_SUBMIT_SECONDS = METRICS.histogram(
+    "mcs_command_submit_seconds", "Time from command submission until it reaches stdin", ("instance",))
+STDIN_WRITE_SECONDS = METRICS.histogram(
+    "mcs_stdin_write_seconds", "Time spent writing and flushing the server's stdin", ("instance",))
+COMMANDS_SENT = METRICS.counter(
+    "mcs_commands_sent_total", "Commands written to the server", ("instance",))
+COMMANDS_REJECTED = METRICS.counter(
+    "mcs_commands_rejected_total", "Commands refused by the scheduler", ("instance", "reason"))
+COMMAND_QUEUE_DEPTH = METRICS.gauge(
+    "mcs_command_queue_depth", "Writes waiting in the command scheduler", ("instance",))
+OUTPUT_LINES = METRICS.counter(
+    "mcs_output_lines_total", "Lines of server output read", ("instance",))
+OUTPUT_LINES_SUPPRESSED = METRICS.counter(
+    "mcs_output_lines_suppressed_total", "Server output lines kept out of the log", ("instance", "reason"))
+STREAM_SUBSCRIBERS = METRICS.gauge(
+    "mcs_log_stream_subscribers", "Active log stream subscribers", ("instance",))
+STREAM_DISCONNECTS = METRICS.counter(
+    "mcs_log_stream_slow_disconnects_total", "Log stream subscribers dropped for falling behind", ("instance",))
+SERVER_STARTS = METRICS.counter(
+    "mcs_server_starts_total", "Server process starts", ("instance",))
+SERVER_EXITS = METRICS.counter(
+    "mcs_server_exits_total", "Server process exits by exit code", ("instance", "code"))
+SERVER_READY = METRICS.gauge(
+    "mcs_server_ready", "1 when the server is accepting players", ("instance",))
+PLAYERS_ONLINE = METRICS.gauge(
+    "mcs_players_online", "Players currently connected", ("instance",))
+PROCESS_CPU = METRICS.counter(
+    "mcs_process_cpu_seconds_total", "CPU time used by the Bedrock process", ("instance",))
+PROCESS_RSS = METRICS.gauge(
+    "mcs_process_resident_memory_bytes", "Resident memory of the Bedrock process", ("instance",))
+PROCESS_THREADS = METRICS.gauge(
+    "mcs_process_threads", "Threads in the Bedrock process", ("instance",))
+PROCESS_FDS = METRICS.gauge(
+    "mcs_process_open_fds", "Open file descriptors of the Bedrock process", ("instance",))
+
+
 class Command(BaseModel):
     command: str
+    wait: bool = False
+    timeout: Optional[float] = Field(default=None, gt=0, le=60)
+    match: Optional[str] = None
+
+
+class CommandBatch(BaseModel):
+    commands: list[str] = Field(min_length=1, max_length=1000)
+
+
+# Subprocess engines: "thread" uses Popen with a monitor thread, "asyncio" uses
+# asyncio.create_subprocess_exec with reader/writer tasks on the event loop
+SERVER_ENGINES = ("thread", "asyncio")
+
+# Longest output line the asyncio engine reads whole; `save query` on a big
+# world prints every file on one line. Longer lines are skipped.
+OUTPUT_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class AsyncProcess:
+    """Popen-like facade over an asyncio subprocess"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self._process = process
+        self.pid = process.pid
+        self.stdin = process.stdin
+        self.stdout = process.stdout
+
+    def poll(self) -> Optional[int]:
+        return self._process.returncode
+
+    def terminate(self):
+        if self._process.returncode is None:
+            self._process.terminate()
+
+    def kill(self):
+        if self._process.returncode is None:
+            self._process.kill()
+
+    async def wait(self, timeout: Optional[float] = None) -> int:
+        try:
+            return await asyncio.wait_for(self._process.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired("bedrock_server", timeout)
+
+
+# Lifecycle states, and the console events that move the server between them
+LIFECYCLE_STATES = ("stopped", "starting", "loading", "ready", "stopping")
+LIFECYCLE_EVENTS = {
+    "level_loading": "loading",
+    "server_started": "ready",
+    "server_stopping": "stopping",
+}
+READY_TIMEOUT = 120.0  # Seconds to wait for "Server started." after a start
+
+# Shutdown: Bedrock prints this once the world has been saved
+SHUTDOWN_PATTERN = r"Quit correctly"
+SHUTDOWN_TIMEOUT = 30.0  # Seconds to wait for stop before terminating
+SHUTDOWN_GRACE = 5.0     # Seconds to wait for exit after the quit message
+
+# Response capture window for send_command(wait=True)
+RESPONSE_TIMEOUT = 5.0  # Max seconds to wait for a reply
+RESPONSE_IDLE = 0.25    # Without a match pattern, stop once output goes quiet
+
+
+class ResponseCapture:
+    """Collects the output lines that follow a command
+    
+    Lines may be fed from any thread. Collection ends when a line matches
+    the pattern, or, without a pattern, once output has been quiet for
+    RESPONSE_IDLE seconds after the first line.
+    """
+
+    def __init__(self, match: Optional[str] = None):
+        self.pattern = re.compile(match) if match else None
+        self.lines: list[str] = []
+        self.matched = False
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def feed(self, line: str):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, line)
+
+    async def collect(self, timeout: float) -> list[str]:
+        deadline = self._loop.time() + timeout
+        while True:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            if self.lines and not self.pattern:
+                remaining = min(remaining, RESPONSE_IDLE)
+            try:
+                line = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            self.lines.append(line)
+            if self.pattern and self.pattern.search(line):
+                self.matched = True
+                break
+        return self.lines
+
+    @property
+    def completed(self) -> bool:
+        return self.matched if self.pattern else bool(self.lines)
+
+
+def update_properties(path: Path, values: dict):
+    """Set keys in a server.properties file, keeping everything else as is"""
+    lines = path.read_text().splitlines() if path.exists() else []
+    remaining = {key: str(value) for key, value in values.items()}
+    for index, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if not line.lstrip().startswith("#") and key in remaining:
+            lines[index] = f"{key}={remaining.pop(key)}"
+    lines.extend(f"{key}={value}" for key, value in remaining.items())
+    path.write_text("\n".join(lines) + "\n")
+
+
+DEFAULT_INSTANCE = "default"
+
+# Online backups: how long to keep polling `save query` for the file list
+SAVE_QUERY_TIMEOUT = 60
+SAVE_QUERY_PATTERN = rf"{SAVE_FILES_PATTERN.pattern}|not been completed|not ready"
 
 
 class ServerManager:
-    def __init__(self):
-        self.process: Optional[subprocess.Popen] = None
+    def __init__(self, engine: Optional[str] = None, instance_id: str = DEFAULT_INSTANCE,
+                 directory: str = '/app', executable: str = './bedrock_server',
+                 properties: Optional[dict] = None):
+        self.instance_id = instance_id
+        self.directory = directory
+        self.executable = executable
+        # server.properties overrides (port, level name) applied before each start
+        self.properties = properties or {}
+        self.process: Optional[subprocess.Popen | AsyncProcess] = None
         self.running = False
-        self.command_history = []
+        self.command_history = CommandHistory(
+            self._history_path(),
+            tail_size=int(os.environ.get('COMMAND_HISTORY_TAIL', '1000'))
+        )
+        self.engine = engine or os.environ.get('SERVER_ENGINE', 'thread')
+        if self.engine not in SERVER_ENGINES:
+            raise ValueError(f"Unknown server engine: {self.engine}")
+        self._reader_task: Optional[asyncio.Task] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._stdin_queue: Optional[asyncio.Queue] = None
+        self._captures: list[ResponseCapture] = []
+        self._response_lock = asyncio.Lock()
+        self._stop_task: Optional[asyncio.Future] = None
+        self.state = "stopped"
+        self.state_changed = datetime.now().isoformat()
+        self._state_waiters: list[tuple[set, asyncio.Future]] = []
+        # Guards state and waiters, which the monitor thread also updates
+        self._state_lock = threading.Lock()
+        self.event_parser = EventParser()
+        self.console_filter = ConsoleFilter.from_config()
+        self.players = PlayerIndex()
+        self._exit_lock = threading.Lock()
+        self._exit_recorded = None
+        # Hot-path metric children, bound once per instance
+        self._submit_seconds = COMMAND_SUBMIT_SECONDS.labels(instance=instance_id)
+        self._write_seconds = STDIN_WRITE_SECONDS.labels(instance=instance_id)
+        self._commands_sent = COMMANDS_SENT.labels(instance=instance_id)
+        self._output_lines = OUTPUT_LINES.labels(instance=instance_id)
+        self.scheduler = CommandScheduler(
+            self._write_stdin,
+            max_depth=int(os.environ.get('COMMAND_QUEUE_DEPTH', '1000')),
+            rate=float(os.environ.get('COMMAND_RATE', '20')),
+            burst=float(os.environ.get('COMMAND_BURST', '40')),
+            control_reserve=int(os.environ.get('COMMAND_CONTROL_RESERVE', '10')),
+            control_rate=float(os.environ.get('COMMAND_CONTROL_RATE', '1')),
+            control_burst=float(os.environ.get('COMMAND_CONTROL_BURST', '5'))
+        )
+        self.output_buffer = OutputBuffer(int(os.environ.get('OUTPUT_BUFFER_LINES', '10000')))
+        self.log_stream = LogBroadcaster(
+            queue_size=int(os.environ.get('LOG_STREAM_QUEUE', '1000')),
+            policy=os.environ.get('LOG_STREAM_POLICY', 'drop'),
+            max_subscribers=int(os.environ.get('LOG_STREAM_MAX_SUBSCRIBERS', '500'))
+        )
+        self.backups = BackupStore(self._backup_path())
+        # Staged add-on packs and definitions, kept current by the AddonWatcher
+        self.addon_index: Optional[PackIndex] = None
+        self._backup_lock = asyncio.Lock()
+        self.sampler = ResourceSampler(
+            ResourceHistory(int(os.environ.get('RESOURCE_HISTORY_SAMPLES', '720'))),
+            interval=float(os.environ.get('RESOURCE_SAMPLE_INTERVAL', '5'))
+        )
         
+    def _history_path(self) -> Optional[Path]:
+        """On-disk history store, only if its directory exists (production)"""
+        path = Path(os.environ.get('COMMAND_HISTORY_DB', '/app/logs/command_history.db'))
+        if self.instance_id != DEFAULT_INSTANCE:
+            path = path.with_name(f"{path.stem}.{self.instance_id}{path.suffix}")
+        return path if path.parent.exists() else None
+    
+    def _backup_path(self) -> Path:
+        """Snapshot store; each non-default instance gets its own subdirectory"""
+        path = Path(os.environ.get('BACKUP_DIR', '/app/backups'))
+        return path if self.instance_id == DEFAULT_INSTANCE else path / self.instance_id
+    
+    @property
+    def worlds_dir(self) -> Path:
+        return Path(self.directory) / 'worlds'
+    
+    @property
+    def log_tag(self) -> str:
+        """Log prefix for server output, tagged with the instance when not default"""
+        if self.instance_id == DEFAULT_INSTANCE:
+            return "[SERVER]"
+        return f"[SERVER:{self.instance_id}]"
+    
     async def start_server(self):
         if self.running:
             return {"status": "already_running"}
             
-        logger.info("Starting Minecraft Bedrock server...")
+        logger.info(f"Starting Minecraft Bedrock server ({self.instance_id})...")
         
         try:
+            if self.properties:
+                update_properties(Path(self.directory) / 'server.properties', self.properties)
+            
             # Set the library path for the server
             env = os.environ.copy()
-            env['LD_LIBRARY_PATH'] = '.'
-            
-            # Start the bedrock server process
-            self.process = subprocess.Popen(
-                ['./bedrock_server'],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                cwd='/app',
-                env=env
-            )
-            
-            self.running = True
+            executable_dir = os.path.dirname(self.executable)
+            env['LD_LIBRARY_PATH'] = executable_dir if os.path.isabs(executable_dir) else '.'
             
-            # Start output monitoring in a separate thread
-            self.output_thread = threading.Thread(target=self._monitor_output, daemon=True)
-            self.output_thread.start()
+            self._set_state("starting")
+            if self.engine == "asyncio":
+                await self._start_asyncio(env)
+            else:
+                self._start_thread(env)
             
-            logger.info("Minecraft server started successfully")
+            SERVER_STARTS.inc(instance=self.instance_id)
+            self.sampler.start(self.process.pid)
+            logger.info(f"Minecraft server started successfully ({self.engine} engine)")
             return {"status": "started", "pid": self.process.pid}
             
         except Exception as e:
             logger.error(f"Failed to start server: {e}")
+            self._set_state("stopped")
             return {"status": "error", "message": str(e)}
     
+    def _start_thread(self, env: dict):
+        """Start the server with Popen and a blocking monitor thread"""
+        self.process = subprocess.Popen(
+            [self.executable],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            universal_newlines=True,
+            cwd=self.directory,
+            env=env
+        )
+        
+        self.running = True
+        
+        # Start output monitoring in a separate thread
+        self.output_thread = threading.Thread(target=self._monitor_output, daemon=True)
+        self.output_thread.start()
+    
+    async def _start_asyncio(self, env: dict):
+        """Start the server as an asyncio subprocess with reader/writer tasks"""
+        process = await asyncio.create_subprocess_exec(
+            self.executable,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=self.directory,
+            env=env,
+            limit=OUTPUT_LINE_LIMIT
+        )
+        self.process = AsyncProcess(process)
+        self.running = True
+        
+        self._stdin_queue = asyncio.Queue()
+        self._reader_task = asyncio.create_task(self._read_output())
+        self._writer_task = asyncio.create_task(self._write_input())
+    
     def _monitor_output(self):
         """Monitor server output and log it"""
-        if not self.process or not self.process.stdout:
+        process = self.process
+        if not process or not process.stdout:
             return
             
         try:
-            for line in iter(self.process.stdout.readline, ''):
+            for line in iter(process.stdout.readline, ''):
                 if line:
-                    # Log server output with timestamp
-                    logger.info(f"[SERVER] {line.strip()}")
+                    self._handle_output_line(line)
                     
         except Exception as e:
             logger.error(f"Error monitoring server output: {e}")
+        
+        # End of output means the process has gone away
+        try:
+            code = process.wait(timeout=5)
+        except Exception:
+            code = None
+        self._output_ended(process, code)
+    
+    def _output_ended(self, process, code: Optional[int]):
+        """Record the end of a process's output, unless a restart has replaced it"""
+        if self.process is not process:
+            return
+        self._flush_console_filter()
+        if code is not None:
+            self._record_exit(code)
+        self._set_state("stopped")
+    
+    async def _read_output(self):
+        """Read server output on the event loop (asyncio engine)"""
+        process = self.process
+        stdout = process.stdout
+        oversized = 0
+        try:
+            while True:
+                try:
+                    raw = await stdout.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    raw = e.partial
+                except asyncio.LimitOverrunError as e:
+                    # Consume what is buffered and drop the rest of the line
+                    oversized += len(await stdout.readexactly(e.consumed))
+                    continue
+                if not raw:
+                    break
+                if oversized:
+                    logger.warning(f"Skipped a {oversized + len(raw)} byte line of server output")
+                    oversized = 0
+                    continue
+                self._handle_output_line(raw.decode(errors='replace'))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error monitoring server output: {e}")
+        
+        # End of output means the process has gone away
+        try:
+            code = await process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            code = None
+        self._output_ended(process, code)
+    
+    async def _write_input(self):
+        """Single stdin writer (asyncio engine)
+        
+        Everything already queued is written before one drain, so bursts of
+        commands share a single flush.
+        """
+        stdin = self.process.stdin
+        while True:
+            batch = [await self._stdin_queue.get()]
+            while not self._stdin_queue.empty():
+                batch.append(self._stdin_queue.get_nowait())
+            started = time.perf_counter()
+            try:
+                for data, _ in batch:
+                    stdin.write(data.encode())
+                await stdin.drain()
+                self._write_seconds.observe(time.perf_counter() - started)
+            except asyncio.CancelledError:
+                # Writers waiting on this batch must not wait forever
+                self._fail_writes(batch, BrokenPipeError("Server stopped before the write completed"))
+                raise
+            except Exception as e:
+                self._fail_writes(batch, e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+    
+    @staticmethod
+    def _fail_writes(items: list[tuple[str, asyncio.Future]], error: Exception):
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+    
+    def _handle_output_line(self, line: str):
+        """Process a single line of server output"""
+        line = line.strip()
+        self._output_lines.inc()
+        # Log server output at its own level, minus filtered noise and repeats
+        for level, text in self.console_filter.process(line):
+            logger.log(level, f"{self.log_tag} {text}")
+        seq = self.output_buffer.append(line)
+        self.log_stream.publish(seq, line)
+        
+        for capture in list(self._captures):
+            capture.feed(line)
+        
+        event = self.event_parser.parse(line)
+        if event:
+            self._handle_event(event)
+    
+    def _flush_console_filter(self):
+        """Report a run of repeated lines still pending at end of output"""
+        for level, text in self.console_filter.flush():
+            logger.log(level, f"{self.log_tag} {text}")
+    
+    def _handle_event(self, event: ConsoleEvent):
+        """Apply a parsed console event to server and player state"""
+        self.players.apply(event)
+        state = LIFECYCLE_EVENTS.get(event.type)
+        if state:
+            self._set_state(state)
+    
+    def _set_state(self, state: str):
+        """Move to a lifecycle state and wake anyone waiting for it
+        
+        May be called from the output monitor thread.
+        """
+        with self._state_lock:
+            if state == self.state:
+                return
+            if state == "stopped":
+                self.players.clear()
+            logger.info(f"Server state: {self.state} -> {state}")
+            self.state = state
+            self.state_changed = datetime.now().isoformat()
+            waiters = [future for states, future in self._state_waiters if state in states]
+        for future in waiters:
+            future.get_loop().call_soon_threadsafe(self._resolve_waiter, future, state)
+    
+    @staticmethod
+    def _resolve_waiter(future: asyncio.Future, state: str):
+        if not future.done():
+            future.set_result(state)
+    
+    async def wait_for_state(self, states: set, timeout: float) -> str:
+        """Wait until the server reaches one of `states`, returning it
+        
+        Raises asyncio.TimeoutError if none is reached within `timeout`.
+        The state is checked and the waiter registered under the lock
+        `_set_state` takes, so a change on the monitor thread is never missed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        waiter = (states, future)
+        with self._state_lock:
+            if self.state in states:
+                return self.state
+            self._state_waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            with self._state_lock:
+                self._state_waiters.remove(waiter)
+    
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready" and self.running and self.process.poll() is None
+    
+    async def wait_until_ready(self, timeout: float = READY_TIMEOUT) -> dict:
+        """Wait for the server to accept players after a start"""
+        if not self.running:
+            return {"ready": False, "state": self.state}
+        try:
+            state = await self.wait_for_state({"ready", "stopped"}, timeout)
+        except asyncio.TimeoutError:
+            state = self.state
+        return {"ready": state == "ready", "state": state}
+    
+    async def _write_stdin(self, data: str):
+        """Write raw data to the server's stdin using the active engine"""
+        if self.engine == "asyncio":
+            if self._writer_task is None or self._writer_task.done():
+                raise BrokenPipeError("Server stdin writer is not running")
+            future = asyncio.get_running_loop().create_future()
+            self._stdin_queue.put_nowait((data, future))
+            await future
+        else:
+            started = time.perf_counter()
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+            self._write_seconds.observe(time.perf_counter() - started)
+    
+    def _record_exit(self, code: Optional[int]):
+        """Count a process exit once, whichever path notices it first"""
+        with self._exit_lock:
+            if self.process is None or self._exit_recorded is self.process:
+                return
+            self._exit_recorded = self.process
+        SERVER_EXITS.inc(instance=self.instance_id, code=str(code))
     
-    async def send_command(self, command: str) -> dict:
+    async def _wait_for_exit(self, timeout: float) -> int:
+        """Wait for the server process to exit, raising TimeoutExpired"""
+        if self.engine == "asyncio":
+            return await self.process.wait(timeout=timeout)
+        return await asyncio.to_thread(self.process.wait, timeout=timeout)
+    
+    def _cancel_tasks(self):
+        """Cancel asyncio engine reader/writer tasks, failing any queued writes"""
+        if self._stdin_queue is not None:
+            pending = []
+            while not self._stdin_queue.empty():
+                pending.append(self._stdin_queue.get_nowait())
+            self._fail_writes(pending, BrokenPipeError("Server stopped before the write completed"))
+        for task in (self._reader_task, self._writer_task):
+            if task and not task.done():
+                task.cancel()
+        self._reader_task = None
+        self._writer_task = None
+    
+    async def send_command(self, command: str, wait: bool = False,
+                           timeout: Optional[float] = None,
+                           match: Optional[str] = None,
+                           client: Optional[str] = None) -> dict:
+        """Send a command, optionally waiting for the server's reply
+        
+        With wait=True the output lines that follow the command are captured
+        until `match` (a regex) is seen or the `timeout` window closes. Waited
+        commands are serialized so their capture windows never overlap.
+        
+        Commands go through the scheduler: `client` is rate limited and a
+        full queue is rejected with a 429.
+        """
         if not self.running or not self.process or not self.process.stdin:
             raise HTTPException(status_code=400, detail="Server is not running")
         
+        if not wait:
+            return await self._send_line(command, client)
+        
+        try:
+            capture = ResponseCapture(match)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid match pattern: {e}")
+        
+        async with self._response_lock:
+            self._captures.append(capture)
+            try:
+                result = await self._send_line(command, client)
+                await capture.collect(timeout or RESPONSE_TIMEOUT)
+            finally:
+                self._captures.remove(capture)
+        
+        result["status"] = "completed" if capture.completed else "timed_out"
+        result["output"] = capture.lines
+        return result
+    
+    def _schedule(self, data: str, priority: str, client: Optional[str], cost: float = 1):
+        """Admit a write through the scheduler, mapping rejections to 429"""
+        try:
+            return self.scheduler.submit(data, priority=priority, client=client, cost=cost)
+        except CommandRejected as e:
+            logger.warning(f"[COMMAND] Rejected: {e}")
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(max(1, round(e.retry_after)))}
+            )
+    
+    async def _send_line(self, command: str, client: Optional[str] = None) -> dict:
+        """Record a command in history and write it to the server"""
+        started = time.perf_counter()
+        written = self._schedule(f"{command}\n", classify(command), client)
         try:
             # Log the command
             timestamp = datetime.now().isoformat()
-            self.command_history.append({"timestamp": timestamp, "command": command})
+            self.command_history.append(command, timestamp)
             logger.info(f"[COMMAND] Sending: {command}")
             
-            # Send command to server
-            self.process.stdin.write(f"{command}\n")
-            self.process.stdin.flush()
+            # Wait for the scheduler to write it to the server
+            await written
+            self._submit_seconds.observe(time.perf_counter() - started)
+            self._commands_sent.inc()
             
             return {
                 "status": "sent",
@@ -119,32 +688,217 @@ class ServerManager:
             logger.error(f"Failed to send command '{command}': {e}")
             raise HTTPException(status_code=500, detail=f"Failed to send command: {e}")
     
+    async def send_commands(self, commands: list[str], client: Optional[str] = None) -> dict:
+        """Send an ordered batch of commands with a single write and flush
+        
+        The batch is recorded in history as one entry. It is scheduled at
+        bulk priority and costs one rate-limit token per command; a batch
+        larger than the burst size waits for a full bucket and leaves it in
+        debt, which paces the client's following commands.
+        """
+        if not self.running or not self.process or not self.process.stdin:
+            raise HTTPException(status_code=400, detail="Server is not running")
+        
+        for index, command in enumerate(commands):
+            if "\n" in command or "\r" in command:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Command {index} contains a line break"
+                )
+        
+        started = time.perf_counter()
+        written = self._schedule(
+            "".join(f"{command}\n" for command in commands),
+            "bulk",
+            client,
+            cost=len(commands)
+        )
+        try:
+            timestamp = datetime.now().isoformat()
+            entry = self.command_history.append_batch(commands, timestamp)
+            logger.info(f"[COMMAND] Sending batch of {len(commands)} commands")
+            
+            await written
+            self._submit_seconds.observe(time.perf_counter() - started)
+            self._commands_sent.inc(len(commands))
+            
+            return {
+                "status": "sent",
+                "count": len(commands),
+                "history_id": entry["id"],
+                "timestamp": timestamp,
+                "results": [
+                    {"index": index, "command": command, "status": "sent"}
+                    for index, command in enumerate(commands)
+                ]
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to send batch of {len(commands)} commands: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to send commands: {e}")
+    
     async def stop_server(self) -> dict:
+        """Stop the server without blocking the event loop
+        
+        Concurrent callers share a single shutdown.
+        """
         if not self.running or not self.process:
             return {"status": "not_running"}
         
+        if self._stop_task is None or self._stop_task.done():
+            self._stop_task = asyncio.ensure_future(self._shutdown())
+        # Shielded so a caller going away never aborts the shutdown itself
+        return await asyncio.shield(self._stop_task)
+    
+    async def _shutdown(self) -> dict:
+        """Send stop and follow the server's shutdown output
+        
+        Bedrock prints "Quit correctly" once the world is saved. After that
+        the process only gets SHUTDOWN_GRACE seconds to exit; without it the
+        full SHUTDOWN_TIMEOUT applies before the process is terminated.
+        """
         try:
-            logger.info("Stopping Minecraft server...")
+            logger.info(f"Stopping Minecraft server ({self.instance_id})...")
+            self._set_state("stopping")
             
-            # Send stop command first
-            await self.send_command("stop")
+            capture = ResponseCapture(SHUTDOWN_PATTERN)
+            self._captures.append(capture)
+            try:
+                # Send stop command first
+                await self.send_command("stop")
+                
+                exit_task = asyncio.ensure_future(self._wait_for_exit(timeout=SHUTDOWN_TIMEOUT))
+                quit_task = asyncio.ensure_future(capture.collect(SHUTDOWN_TIMEOUT))
+                try:
+                    await asyncio.wait({exit_task, quit_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if capture.matched and not exit_task.done():
+                        logger.info("Server reported a clean shutdown, waiting for exit...")
+                        await asyncio.wait({exit_task}, timeout=SHUTDOWN_GRACE)
+                finally:
+                    quit_task.cancel()
+            finally:
+                self._captures.remove(capture)
             
             # Wait for graceful shutdown
-            try:
-                self.process.wait(timeout=30)
-            except subprocess.TimeoutExpired:
+            if not exit_task.done() or exit_task.exception():
                 logger.warning("Server didn't stop gracefully, terminating...")
                 self.process.terminate()
-                self.process.wait(timeout=10)
+                await self._wait_for_exit(timeout=10)
+            self._record_exit(self.process.poll())
             
+            self._cancel_tasks()
+            self.sampler.stop()
             self.running = False
-            logger.info("Minecraft server stopped")
+            self._set_state("stopped")
+            logger.info(f"Minecraft server stopped ({self.instance_id})")
             return {"status": "stopped"}
             
         except Exception as e:
             logger.error(f"Error stopping server: {e}")
             return {"status": "error", "message": str(e)}
     
+    async def backup(self, label: Optional[str] = None) -> dict:
+        """Snapshot the worlds into the backup store
+        
+        While the server runs this follows Bedrock's online backup protocol:
+        `save hold`, poll `save query` until it lists the files (and the
+        lengths to copy), copy them, then always `save resume`. A stopped
+        server's worlds are copied as they are.
+        """
+        async with self._backup_lock:
+            if not self.running:
+                files = await asyncio.to_thread(scan_world, self.worlds_dir)
+                return await asyncio.to_thread(self.backups.create, self.worlds_dir, files,
+                                               online=False, label=label)
+            
+            await self.send_command("save hold", wait=True, timeout=5)
+            try:
+                files = await self._query_save()
+                return await asyncio.to_thread(self.backups.create, self.worlds_dir, files,
+                                               online=True, label=label)
+            finally:
+                await self.send_command("save resume", wait=True, timeout=5)
+    
+    async def _query_save(self) -> list[tuple[str, int]]:
+        """Poll `save query` until Bedrock reports the files to copy"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SAVE_QUERY_TIMEOUT
+        while loop.time() < deadline:
+            result = await self.send_command("save query", wait=True,
+                                             match=SAVE_QUERY_PATTERN, timeout=5)
+            for line in result["output"]:
+                files = parse_save_query(line)
+                if files:
+                    return files
+            await asyncio.sleep(1)
+        raise HTTPException(status_code=504, detail="Timed out waiting for save query to complete")
+    
+    async def restore(self, snapshot_id: str) -> dict:
+        """Restore a snapshot, stopping the server first and restarting it after"""
+        async with self._backup_lock:
+            try:
+                missing = await asyncio.to_thread(self.backups.missing_objects, snapshot_id)
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f"Unknown backup: {snapshot_id}")
+            if missing:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Backup {snapshot_id} is missing stored files: {', '.join(missing[:5])}"
+                )
+            
+            was_running = self.running
+            if was_running:
+                await self.stop_server()
+            # A failed restore must not leave the server down
+            try:
+                result = await asyncio.to_thread(self.backups.restore, snapshot_id, self.worlds_dir)
+            finally:
+                if was_running:
+                    server = await self.start_server()
+            if was_running:
+                result["server"] = server
+            return result
+    
+    async def import_world(self, chunks: AsyncIterator[bytes], label: Optional[str] = None) -> dict:
+        """Store an uploaded tar stream as a snapshot, chunk by chunk
+        
+        The body is handed to a worker thread through a small bounded queue,
+        so a slow disk pushes back on the upload instead of buffering it.
+        """
+        reader = ChunkReader()
+        task = asyncio.ensure_future(asyncio.to_thread(self.backups.import_tar, reader, label))
+        
+        async def feed(chunk: Optional[bytes]) -> bool:
+            while not task.done():
+                try:
+                    reader.chunks.put_nowait(chunk)
+                    return True
+                except queue.Full:
+                    await asyncio.wait({task}, timeout=0.01)
+            return False
+        
+        # Always end the stream, so the worker never waits on a dead upload
+        # while holding the store lock; a broken upload aborts the import
+        end = ConnectionError("Upload ended before the archive was complete")
+        try:
+            async for chunk in chunks:
+                if chunk and not await feed(chunk):
+                    break
+            end = None
+        finally:
+            await feed(end)
+            if end is not None:
+                # The caller sees the upload's own error; mark the worker's as seen
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        try:
+            return await task
+        except (tarfile.TarError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid archive: {e}")
+    
+    @property
+    def stopping(self) -> bool:
+        return self._stop_task is not None and not self._stop_task.done()
+    
     def get_status(self) -> dict:
         if not self.running or not self.process:
             return {"status": "stopped", "running": False}
@@ -153,28 +907,145 @@ class ServerManager:
         poll = self.process.poll()
         if poll is not None:
             self.running = False
+            self._record_exit(poll)
+            self._set_state("stopped")
             return {"status": "stopped", "running": False, "exit_code": poll}
         
         return {
-            "status": "running",
+            "status": "stopping" if self.stopping else "running",
             "running": True,
             "pid": self.process.pid,
             "command_count": len(self.command_history)
         }
 
 
-# Initialize server manager
-server_manager = ServerManager()
+class ServerSupervisor:
+    """Supervises one or more Bedrock server instances in a single wrapper
+    
+    Instances are read from the JSON file named by SERVER_INSTANCES, a list
+    of objects with `id`, `directory` and optionally `port`, `port_v6`,
+    `level_name`, `executable`, `engine` and `autostart`. Without it there is
+    a single default instance in /app.
+    """
+    
+    def __init__(self, managers: list[ServerManager], autostart: Optional[set] = None):
+        if not managers:
+            raise ValueError("At least one server instance is required")
+        self.managers = {manager.instance_id: manager for manager in managers}
+        if len(self.managers) != len(managers):
+            raise ValueError("Server instance ids must be unique")
+        self.default = self.managers.get(DEFAULT_INSTANCE, managers[0])
+        self.autostart = autostart if autostart is not None else set(self.managers)
+    
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> "ServerSupervisor":
+        path = path or os.environ.get('SERVER_INSTANCES')
+        if not path:
+            return cls([ServerManager()])
+        
+        with open(path) as f:
+            instances = json.load(f)
+        
+        managers, autostart = [], set()
+        for instance in instances:
+            properties = {}
+            if "port" in instance:
+                properties["server-port"] = instance["port"]
+                properties["server-portv6"] = instance.get("port_v6", instance["port"] + 1)
+            if "level_name" in instance:
+                properties["level-name"] = instance["level_name"]
+            manager = ServerManager(
+                engine=instance.get("engine"),
+                instance_id=instance["id"],
+                directory=instance["directory"],
+                executable=instance.get("executable", './bedrock_server'),
+                properties=properties
+            )
+            managers.append(manager)
+            if instance.get("autostart", True):
+                autostart.add(manager.instance_id)
+        return cls(managers, autostart)
+    
+    def get(self, instance_id: str) -> ServerManager:
+        manager = self.managers.get(instance_id)
+        if manager is None:
+            raise HTTPException(status_code=404, detail=f"Unknown server: {instance_id}")
+        return manager
+    
+    async def start_all(self) -> dict:
+        ids = [i for i in self.managers if i in self.autostart]
+        results = await asyncio.gather(*(self.managers[i].start_server() for i in ids))
+        return dict(zip(ids, results))
+    
+    async def stop_all(self) -> dict:
+        ids = list(self.managers)
+        results = await asyncio.gather(*(self.managers[i].stop_server() for i in ids))
+        return dict(zip(ids, results))
+    
+    def list(self) -> list[dict]:
+        return [
+            {
+                "id": manager.instance_id,
+                "directory": manager.directory,
+                "default": manager is self.default,
+                "state": manager.state,
+                **manager.get_status()
+            }
+            for manager in self.managers.values()
+        ]
+
+
+# Initialize server instances; server_manager is the default instance
+supervisor = ServerSupervisor.from_config()
+server_manager = supervisor.default
+
+# Hot reload of staged add-ons into the default instance (None when disabled)
+addon_watcher = AddonWatcher.from_environment(server_manager)
+
+
+def _collect_metrics():
+    """Scrape-time metrics: queue depths, subscribers and process stats"""
+    for metric in (PROCESS_CPU, PROCESS_RSS, PROCESS_THREADS, PROCESS_FDS):
+        metric.clear()
+    for instance_id, manager in supervisor.managers.items():
+        stats = manager.scheduler.stats()
+        COMMAND_QUEUE_DEPTH.set(stats["depth"], instance=instance_id)
+        for reason, count in stats["rejected"].items():
+            COMMANDS_REJECTED.labels(instance=instance_id, reason=reason).set(count)
+        for reason, count in manager.console_filter.suppressed.items():
+            OUTPUT_LINES_SUPPRESSED.labels(instance=instance_id, reason=reason).set(count)
+        STREAM_SUBSCRIBERS.set(manager.log_stream.subscriber_count, instance=instance_id)
+        STREAM_DISCONNECTS.labels(instance=instance_id).set(manager.log_stream.disconnected)
+        SERVER_READY.set(1 if manager.ready else 0, instance=instance_id)
+        PLAYERS_ONLINE.set(manager.players.count, instance=instance_id)
+        
+        process = manager.process
+        stats = read_process_stats(process.pid) if manager.running and process else None
+        if stats:
+            PROCESS_CPU.labels(instance=instance_id).set(stats["cpu_seconds"])
+            PROCESS_RSS.set(stats["rss_bytes"], instance=instance_id)
+            PROCESS_THREADS.set(stats["threads"], instance=instance_id)
+            if stats["open_fds"] is not None:
+                PROCESS_FDS.set(stats["open_fds"], instance=instance_id)
+
+
+METRICS.on_collect(_collect_metrics)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application startup and shutdown"""
     # Startup
-    await server_manager.start_server()
+    await supervisor.start_all()
+    if addon_watcher:
+        addon_watcher.start()
     yield
     # Shutdown
-    await server_manager.stop_server()
+    if addon_watcher:
+        addon_watcher.stop()
+    await supervisor.stop_all()
+    for manager in supervisor.managers.values():
+        manager.log_stream.close_all("shutdown")
 
 
 # FastAPI app
@@ -184,46 +1055,449 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-instance routes, mounted under /servers/{server_id} and, for the
+# default instance, at the top level
+router = APIRouter()
+
+
+def _manager(request: Request) -> ServerManager:
+    """Resolve the instance a request is for"""
+    server_id = request.path_params.get("server_id")
+    return supervisor.get(server_id) if server_id else supervisor.default
+
 
 @app.get("/")
 async def root():
     return {"message": "Minecraft Bedrock Server Manager", "status": "running"}
 
 
-@app.get("/status")
-async def get_status():
-    return server_manager.get_status()
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition for the wrapper and all instances"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/addons/watch")
+async def addon_watch_status():
+    """Add-on hot reload: watcher settings and the last change it applied"""
+    if addon_watcher is None:
+        return {"watching": False}
+    return addon_watcher.status()
+
+
+def _staging_dir() -> str:
+    staging = os.environ.get('ADDON_STAGING_DIR', '/app/custom_addons')
+    if not os.path.isdir(staging):
+        raise HTTPException(status_code=404, detail=f"Add-on directory {staging} not found")
+    return staging
+
+
+@app.get("/addons/validate")
+async def validate_addons():
+    """Check the staged add-on packs; results are cached per file, so repeat calls are cheap
+    
+    Validation runs in a worker thread rather than a process pool, which
+    would have to start interpreters from this threaded server.
+    """
+    return await asyncio.to_thread(PackValidator(_staging_dir(), jobs=1).validate)
+
+
+def _addon_index() -> PackIndex:
+    """The default instance's index of staged packs, rescanned unless the watcher keeps it current
+
+    The index is kept in memory only; nothing is written into the staging
+    directory, which is usually a bind mount.
+    """
+    staging = Path(_staging_dir())
+    index = server_manager.addon_index
+    if index is None or index.addons_dir != staging:
+        index = server_manager.addon_index = PackIndex(staging, persist=False)
+    if index.packs is None or not (addon_watcher and addon_watcher.running):
+        index.scan()
+    return index
+
+
+def _scan_definitions() -> tuple[list[dict], list[str]]:
+    """Definitions in the staged packs, and pack priority from the default instance's worlds"""
+    index = _addon_index()
+    packs, definitions = index.packs, index.definitions
+    world_lists = []
+    for path in sorted(server_manager.worlds_dir.glob("*/world_*_packs.json")):
+        try:
+            world_lists.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return definitions, pack_priority(packs, world_lists)
+
+
+@app.get("/addons/definitions/{identifier}")
+async def addon_definitions(identifier: str):
+    """Which packs define an identifier, highest priority first"""
+    definitions, priority = await asyncio.to_thread(_scan_definitions)
+    groups = who_defines(definitions, identifier, priority)
+    if not groups:
+        raise HTTPException(status_code=404, detail=f"{identifier} is not defined by any pack")
+    return {"identifier": identifier, "definitions": groups}
+
+
+@app.get("/addons/conflicts")
+async def addon_conflicts():
+    """Identifiers defined by several packs or overriding vanilla ones"""
+    definitions, priority = await asyncio.to_thread(_scan_definitions)
+    return {"conflicts": find_conflicts(definitions, priority)}
+
+
+@app.get("/servers")
+async def list_servers():
+    return {"servers": supervisor.list()}
+
+
+@router.get("/status")
+async def get_status(manager: ServerManager = Depends(_manager)):
+    return manager.get_status()
+
+
+@router.get("/status/history")
+async def get_status_history(window: Optional[float] = Query(default=None, gt=0),
+                             manager: ServerManager = Depends(_manager)):
+    """Resource samples (CPU%, RSS, disk I/O rates, threads) for the last `window` seconds"""
+    return {
+        "interval": manager.sampler.interval,
+        "capacity": manager.sampler.history.capacity,
+        "window": window,
+        "samples": manager.sampler.history.window(window)
+    }
+
+
+def _client_id(request: Request) -> str:
+    """Identify the caller for rate limiting
+    
+    Callers are keyed by remote address. Only hosts listed in
+    TRUSTED_CLIENT_HOSTS (e.g. a gateway acting for several users) may name
+    the client with X-Client-Id; anyone else could rotate it to dodge the
+    limit.
+    """
+    host = request.client.host if request.client else "unknown"
+    client_id = request.headers.get("x-client-id")
+    trusted = {h.strip() for h in os.environ.get('TRUSTED_CLIENT_HOSTS', '').split(',') if h.strip()}
+    if client_id and host in trusted:
+        return client_id
+    return host
+
+
+@router.post("/command")
+async def send_command(cmd: Command, request: Request,
+                       manager: ServerManager = Depends(_manager)):
+    if cmd.wait:
+        return await manager.send_command(
+            cmd.command, wait=True, timeout=cmd.timeout, match=cmd.match,
+            client=_client_id(request)
+        )
+    return await manager.send_command(cmd.command, client=_client_id(request))
+
+
+@router.post("/commands")
+async def send_commands(batch: CommandBatch, request: Request,
+                        manager: ServerManager = Depends(_manager)):
+    return await manager.send_commands(batch.commands, client=_client_id(request))
+
+
+@router.get("/command/queue")
+async def get_command_queue(manager: ServerManager = Depends(_manager)):
+    return manager.scheduler.stats()
+
+
+def _local_isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Normalize a query timestamp to the naive local time history is stored in"""
+    if value is None:
+        return None
+    if value.tzinfo:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+
+@router.get("/command/history")
+async def get_command_history(
+    manager: ServerManager = Depends(_manager),
+    limit: int = Query(default=100, ge=1, le=1000),
+    before: Optional[int] = Query(default=None, ge=1),
+    after: Optional[int] = Query(default=None, ge=0),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    commands = manager.command_history.query(
+        limit=limit, before=before, after=after,
+        start=_local_isoformat(start), end=_local_isoformat(end)
+    )
+    return {
+        "commands": commands,
+        "total": len(manager.command_history),
+        "first_id": commands[0]["id"] if commands else None,
+        "last_id": commands[-1]["id"] if commands else None
+    }
+
+
+@router.get("/logs")
+async def get_logs(
+    manager: ServerManager = Depends(_manager),
+    since: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000)
+):
+    return manager.output_buffer.read(since=since, limit=limit)
+
+
+# Seconds between SSE keepalive comments on an idle log stream
+LOG_STREAM_KEEPALIVE = 15.0
+
 
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Format a server-sent event"""
+    message = f"event: {event}\n" if event else f"id: {data['seq']}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
 
-@app.post("/command")
-async def send_command(cmd: Command):
-    return await server_manager.send_command(cmd.command)
+
+async def _log_events(manager: ServerManager, subscriber, since: Optional[int]):
+    """Server-sent events for one log stream subscriber
+    
+    When `since` is given, buffered lines after it are replayed first. Lines
+    lost to the slow-consumer policy are reported with a `dropped` event.
+    """
+    try:
+        cursor = 0
+        if since is not None:
+            cursor = since
+            while True:
+                page = manager.output_buffer.read(since=cursor, limit=1000)
+                if not page["lines"]:
+                    break
+                for entry in page["lines"]:
+                    yield _sse(entry)
+                cursor = page["next"]
+        
+        reported = 0
+        while True:
+            try:
+                entry = await subscriber.get(timeout=LOG_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if entry is None:
+                yield _sse({"reason": subscriber.close_reason}, event="close")
+                break
+            if subscriber.dropped > reported:
+                yield _sse({"dropped": subscriber.dropped - reported}, event="dropped")
+                reported = subscriber.dropped
+            if entry["seq"] > cursor:
+                yield _sse(entry)
+    finally:
+        manager.log_stream.unsubscribe(subscriber)
+
+
+@router.get("/logs/stream")
+async def stream_logs(request: Request, since: Optional[int] = Query(default=None, ge=0),
+                      manager: ServerManager = Depends(_manager)):
+    try:
+        subscriber = manager.log_stream.subscribe()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    # Resume from the last event an EventSource client saw
+    last_event_id = request.headers.get("last-event-id", "")
+    if since is None and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    return StreamingResponse(_log_events(manager, subscriber, since), media_type="text/event-stream")
 
 
-@app.get("/command/history")
-async def get_command_history():
-    return {"commands": server_manager.command_history}
+@router.get("/ready")
+async def ready(manager: ServerManager = Depends(_manager)):
+    """Readiness probe: 200 once the server accepts players, 503 otherwise"""
+    content = {
+        "ready": manager.ready,
+        "state": manager.state,
+        "since": manager.state_changed
+    }
+    return JSONResponse(content, status_code=200 if content["ready"] else 503)
 
 
-@app.post("/server/start")
-async def start_server():
-    return await server_manager.start_server()
+@router.get("/players")
+async def get_players(manager: ServerManager = Depends(_manager)):
+    """Online players, answered from the event-driven index"""
+    return {"count": manager.players.count, "players": manager.players.online()}
 
 
-@app.post("/server/stop")
-async def stop_server():
-    return await server_manager.stop_server()
+@router.get("/players/{name}")
+async def get_player(name: str, manager: ServerManager = Depends(_manager)):
+    player = manager.players.get(name)
+    if player is None:
+        raise HTTPException(status_code=404, detail=f"Unknown player: {name}")
+    return player
 
 
-@app.post("/server/restart")
-async def restart_server():
-    stop_result = await server_manager.stop_server()
+async def _start_and_wait(manager: ServerManager) -> dict:
+    """Start the server and wait until it is ready for players"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    result = await manager.start_server()
+    if result["status"] == "started":
+        result.update(await manager.wait_until_ready())
+        result["startup_seconds"] = round(loop.time() - started, 3)
+    return result
+
+
+@router.post("/server/start")
+async def start_server(wait: bool = False, manager: ServerManager = Depends(_manager)):
+    if wait:
+        return await _start_and_wait(manager)
+    return await manager.start_server()
+
+
+async def _stop_events(manager: ServerManager, subscriber):
+    """Server-sent events for a streamed shutdown: output lines, then the result"""
+    stop_task = asyncio.ensure_future(manager.stop_server())
+    try:
+        while not stop_task.done():
+            next_line = asyncio.ensure_future(subscriber.get())
+            await asyncio.wait({next_line, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_line.done():
+                next_line.cancel()
+                break
+            entry = next_line.result()
+            if entry is None:
+                break
+            yield _sse(entry)
+        # Flush output that arrived alongside the final exit
+        while not subscriber.queue.empty():
+            entry = subscriber.queue.get_nowait()
+            if entry is not None:
+                yield _sse(entry)
+        yield _sse(await stop_task, event="result")
+    finally:
+        manager.log_stream.unsubscribe(subscriber)
+
+
+@router.post("/server/stop")
+async def stop_server(stream: bool = False, manager: ServerManager = Depends(_manager)):
+    if not stream:
+        return await manager.stop_server()
+    
+    try:
+        subscriber = manager.log_stream.subscribe()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(_stop_events(manager, subscriber), media_type="text/event-stream")
+
+
+@router.post("/server/restart")
+async def restart_server(manager: ServerManager = Depends(_manager)):
+    stop_result = await manager.stop_server()
     if stop_result["status"] in ["stopped", "not_running"]:
-        await asyncio.sleep(2)  # Give it a moment
-        return await server_manager.start_server()
+        # Returns once the level is loaded and players can join
+        return await _start_and_wait(manager)
     return stop_result
 
 
+@router.get("/backups")
+async def list_backups(manager: ServerManager = Depends(_manager)):
+    return {"backups": await asyncio.to_thread(manager.backups.list)}
+
+
+@router.post("/backups")
+async def create_backup(label: Optional[str] = None, manager: ServerManager = Depends(_manager)):
+    """Incremental snapshot of the worlds; only changed files are copied"""
+    return await manager.backup(label)
+
+
+@router.post("/backups/{backup_id}/restore")
+async def restore_backup(backup_id: str, manager: ServerManager = Depends(_manager)):
+    return await manager.restore(backup_id)
+
+
+@router.delete("/backups/{backup_id}")
+async def delete_backup(backup_id: str, manager: ServerManager = Depends(_manager)):
+    try:
+        return await asyncio.to_thread(manager.backups.delete, backup_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown backup: {backup_id}")
+
+
+def _delete_export(store: BackupStore, snapshot_id: str):
+    """Delete an export's temporary snapshot; safe to call more than once"""
+    try:
+        store.delete(snapshot_id)
+    except KeyError:
+        pass
+
+
+class _CleanupStreamingResponse(StreamingResponse):
+    """A StreamingResponse whose `cleanup` runs once it ends, however it ends
+    
+    Starlette runs background tasks only after a complete response, so if
+    the client goes away (even before the first chunk) `cleanup` is started
+    on its own thread instead. It must be safe to run twice.
+    """
+    
+    def __init__(self, content, cleanup: Callable[[], None], **kwargs):
+        super().__init__(content, background=BackgroundTask(cleanup), **kwargs)
+        self.cleanup = cleanup
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException:
+            threading.Thread(target=self.cleanup, daemon=True).start()
+            raise
+
+
+def _export_response(manager: ServerManager, backup_id: str, format: str,
+                     temporary: bool = False) -> StreamingResponse:
+    """Stream a snapshot as an archive built on the fly, deleting it after if `temporary`"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    try:
+        chunks = manager.backups.export(backup_id, format)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown backup: {backup_id}")
+    media_type = "application/zip" if format == "zip" else "application/x-tar"
+    headers = {"Content-Disposition": f'attachment; filename="{manager.instance_id}-{backup_id}.{format}"'}
+    if temporary:
+        return _CleanupStreamingResponse(chunks, partial(_delete_export, manager.backups, backup_id),
+                                         media_type=media_type, headers=headers)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+@router.get("/backups/{backup_id}/export")
+async def export_backup(backup_id: str, format: str = "tar",
+                        manager: ServerManager = Depends(_manager)):
+    return _export_response(manager, backup_id, format)
+
+
+@router.get("/world/export")
+async def export_world(format: str = "tar", manager: ServerManager = Depends(_manager)):
+    """Take a consistent snapshot and stream it as a tar or zip archive
+    
+    The snapshot only exists for the download and is deleted once it ends.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    snapshot = await manager.backup(label="export")
+    return _export_response(manager, snapshot["id"], format, temporary=True)
+
+
+@router.post("/world/import")
+async def import_world(request: Request, label: Optional[str] = None, restore: bool = False,
+                       manager: ServerManager = Depends(_manager)):
+    """Store an uploaded world tar (optionally gzipped) as a snapshot, and restore it if asked"""
+    snapshot = await manager.import_world(request.stream(), label or "import")
+    if restore:
+        snapshot["restore"] = await manager.restore(snapshot["id"])
+    return snapshot
+
+
+app.include_router(router)
+app.include_router(router, prefix="/servers/{server_id}")
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "server_wrapper:app",
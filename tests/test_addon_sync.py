@@ -0,0 +1,103 @@
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import addon_sync
+from addon_sync import MANIFEST_NAME, main, sync
+
+
+@pytest.fixture
+def staging(tmp_path):
+    source = tmp_path / "custom_addons" / "behavior_packs"
+    (source / "blaster" / "items").mkdir(parents=True)
+    (source / "blaster" / "manifest.json").write_text('{"format_version": 2}')
+    (source / "blaster" / "items" / "blaster.json").write_text('{"item": 1}')
+    (source / "tools").mkdir()
+    (source / "tools" / "manifest.json").write_text('{"format_version": 2}')
+    return source
+
+
+@pytest.fixture
+def target(tmp_path):
+    target = tmp_path / "behavior_packs"
+    (target / "vanilla").mkdir(parents=True)
+    (target / "vanilla" / "manifest.json").write_text("{}")
+    return target
+
+
+class TestAddonSync:
+    
+    def test_first_sync_installs_everything(self, staging, target):
+        stats = sync(staging, target)
+        
+        assert stats["files"] == 3
+        assert stats["link"] + stats["reflink"] + stats["copy"] == 3
+        assert (target / "blaster" / "items" / "blaster.json").read_text() == '{"item": 1}'
+        assert (target / MANIFEST_NAME).exists()
+    
+    def test_unchanged_restart_does_not_read_files(self, staging, target, monkeypatch):
+        sync(staging, target)
+        monkeypatch.setattr(addon_sync, "file_hash", lambda path: pytest.fail(f"re-hashed {path}"))
+        monkeypatch.setattr(addon_sync, "install", lambda *args: pytest.fail("re-installed"))
+        
+        stats = sync(staging, target)
+        
+        assert stats["unchanged"] == 3
+    
+    def test_only_changed_files_are_updated(self, staging, target):
+        sync(staging, target)
+        (staging / "blaster" / "items" / "blaster.json").unlink()
+        (staging / "blaster" / "items" / "blaster.json").write_text('{"item": 2}')
+        
+        stats = sync(staging, target)
+        
+        assert stats["unchanged"] == 2
+        assert stats["link"] + stats["reflink"] + stats["copy"] == 1
+        assert (target / "blaster" / "items" / "blaster.json").read_text() == '{"item": 2}'
+    
+    def test_prunes_removed_packs_but_not_server_packs(self, staging, target):
+        sync(staging, target)
+        (staging / "tools" / "manifest.json").unlink()
+        (staging / "tools").rmdir()
+        
+        stats = sync(staging, target)
+        
+        assert stats["removed"] == 1
+        assert not (target / "tools").exists()
+        assert (target / "vanilla" / "manifest.json").exists()
+    
+    def test_reinstalls_file_deleted_from_target(self, staging, target):
+        sync(staging, target)
+        (target / "tools" / "manifest.json").unlink()
+        
+        sync(staging, target)
+        
+        assert (target / "tools" / "manifest.json").exists()
+    
+    def test_falls_back_to_copy_across_filesystems(self, staging, target, monkeypatch):
+        def cross_device(src, dst):
+            raise OSError(18, "Invalid cross-device link")
+        monkeypatch.setattr(addon_sync.os, "link", cross_device)
+        monkeypatch.setattr(addon_sync, "_reflink", lambda src, dst: False)
+        
+        stats = sync(staging, target)
+        
+        assert stats["copy"] == 3
+        assert (target / "tools" / "manifest.json").stat().st_ino != \
+            (staging / "tools" / "manifest.json").stat().st_ino
+    
+    def test_missing_source_is_a_no_op(self, tmp_path, target):
+        stats = sync(tmp_path / "missing", target)
+        
+        assert stats["files"] == 0
+        assert not (target / MANIFEST_NAME).exists()
+    
+    def test_main_prints_timing(self, staging, target, capsys):
+        assert main([str(staging), str(target)]) == 0
+        
+        out = capsys.readouterr().out
+        assert "3 files, 3 updated" in out
+        assert out.rstrip().endswith("s")
+        assert main([str(staging)]) == 1
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from addon_sync import sync
+from addon_watcher import AddonWatcher
+from pack_index import CACHE_NAME
+
+
+def write_manifest(pack, version=(1, 0, 0), description="Tools"):
+    pack.mkdir(parents=True, exist_ok=True)
+    (pack / "manifest.json").write_text(json.dumps({
+        "format_version": 2,
+        "header": {"description": description, "uuid": "aaaa", "version": list(version)},
+        "modules": [{"type": "data", "uuid": "bbbb", "version": list(version)}],
+    }))
+
+
+@pytest.fixture
+def manager():
+    manager = Mock()
+    manager.running = True
+    manager.directory = None
+    manager.send_command = AsyncMock()
+    manager.stop_server = AsyncMock()
+    manager.start_server = AsyncMock()
+    manager.wait_until_ready = AsyncMock()
+    return manager
+
+
+@pytest.fixture
+def watcher(tmp_path, manager):
+    staging, live = tmp_path / "custom_addons", tmp_path / "app"
+    pack = staging / "behavior_packs" / "tools"
+    write_manifest(pack)
+    (pack / "functions").mkdir()
+    (pack / "functions" / "hello.mcfunction").write_text("say hello")
+    (pack / "items").mkdir()
+    (pack / "items" / "pickaxe.json").write_text("{}")
+    write_manifest(staging / "resource_packs" / "textures")
+    for pack_type in ("behavior_packs", "resource_packs"):
+        sync(staging / pack_type, live / pack_type)
+    return AddonWatcher(manager, staging=staging, live=live, interval=0.01, debounce=0.05)
+
+
+def edit(path, text):
+    path.write_text(text)
+    # Make sure the change is visible even on coarse mtime filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestPlan:
+    
+    def test_function_change_only_needs_reload(self, watcher):
+        before = watcher.snapshot()
+        edit(watcher.staging / "behavior_packs/tools/functions/hello.mcfunction", "say hi")
+        
+        plan = watcher.plan(before, watcher.snapshot())
+        
+        assert plan == {"packs": ["behavior_packs/tools"], "restart": False, "reasons": []}
+    
+    def test_item_change_needs_restart(self, watcher):
+        before = watcher.snapshot()
+        edit(watcher.staging / "behavior_packs/tools/items/pickaxe.json", '{"damage": 9}')
+        
+        plan = watcher.plan(before, watcher.snapshot())
+        
+        assert plan["restart"] is True
+        assert plan["reasons"] == ["behavior_packs/tools changed items/pickaxe.json"]
+    
+    def test_manifest_version_bump_needs_restart(self, watcher):
+        before = watcher.snapshot()
+        write_manifest(watcher.staging / "behavior_packs/tools", version=(1, 0, 1))
+        edit(watcher.staging / "behavior_packs/tools/manifest.json",
+             (watcher.staging / "behavior_packs/tools/manifest.json").read_text())
+        
+        plan = watcher.plan(before, watcher.snapshot())
+        
+        assert plan["reasons"] == ["behavior_packs/tools manifest changed"]
+    
+    def test_manifest_description_edit_does_not(self, watcher):
+        before = watcher.snapshot()
+        write_manifest(watcher.staging / "behavior_packs/tools", description="Better tools")
+        edit(watcher.staging / "behavior_packs/tools/manifest.json",
+             (watcher.staging / "behavior_packs/tools/manifest.json").read_text())
+        
+        assert watcher.plan(before, watcher.snapshot())["restart"] is False
+    
+    def test_new_and_resource_packs_need_restart(self, watcher):
+        before = watcher.snapshot()
+        write_manifest(watcher.staging / "behavior_packs/blasters")
+        edit(watcher.staging / "resource_packs/textures/manifest.json", "{}")
+        
+        plan = watcher.plan(before, watcher.snapshot())
+        
+        assert plan["packs"] == ["behavior_packs/blasters", "resource_packs/textures"]
+        assert plan["reasons"] == [
+            "behavior_packs/blasters added", "resource_packs/textures is a resource pack"
+        ]
+
+
+class TestApply:
+    
+    @pytest.mark.asyncio
+    async def test_reload(self, watcher, manager):
+        before = watcher.snapshot()
+        edit(watcher.staging / "behavior_packs/tools/functions/hello.mcfunction", "say hi")
+        
+        result = await watcher.apply(before, watcher.snapshot())
+        
+        assert result["action"] == "reload"
+        manager.send_command.assert_awaited_once_with("reload")
+        manager.stop_server.assert_not_awaited()
+        assert (watcher.live / "behavior_packs/tools/functions/hello.mcfunction").read_text() == "say hi"
+    
+    @pytest.mark.asyncio
+    async def test_restart(self, watcher, manager):
+        before = watcher.snapshot()
+        edit(watcher.staging / "behavior_packs/tools/items/pickaxe.json", '{"damage": 9}')
+        
+        result = await watcher.apply(before, watcher.snapshot())
+        
+        assert result["action"] == "restart"
+        manager.stop_server.assert_awaited_once()
+        manager.start_server.assert_awaited_once()
+        manager.send_command.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_stopped_server_is_only_synced(self, watcher, manager):
+        manager.running = False
+        before = watcher.snapshot()
+        write_manifest(watcher.staging / "behavior_packs/blasters")
+        
+        result = await watcher.apply(before, watcher.snapshot())
+        
+        assert result["action"] == "none"
+        assert (watcher.live / "behavior_packs/blasters/manifest.json").exists()
+    
+    @pytest.mark.asyncio
+    async def test_apply_refreshes_addon_index(self, watcher, manager):
+        before = watcher.snapshot()
+        (watcher.staging / "behavior_packs/tools/items/laser.json").write_text(
+            '{"minecraft:item": {"description": {"identifier": "dane:laser"}}}'
+        )
+        
+        await watcher.apply(before, watcher.snapshot())
+        
+        assert manager.addon_index is watcher.index
+        assert [d["identifier"] for d in watcher.index.definitions] == ["dane:laser"]
+        assert not (watcher.staging / CACHE_NAME).exists()
+    
+    @pytest.mark.asyncio
+    async def test_run_debounces_bursts_of_changes(self, watcher, manager):
+        watcher.start()
+        await asyncio.sleep(0.05)
+        for i in range(5):
+            edit(watcher.staging / "behavior_packs/tools/functions/hello.mcfunction", f"say {i}")
+            await asyncio.sleep(0.02)
+        
+        for _ in range(100):
+            if watcher.last_result:
+                break
+            await asyncio.sleep(0.02)
+        watcher.stop()
+        
+        manager.send_command.assert_awaited_once_with("reload")
+        assert watcher.status()["last_change"]["action"] == "reload"
+    
+    def test_disabled_without_staging_dir(self, tmp_path, monkeypatch, manager):
+        monkeypatch.setenv('ADDON_STAGING_DIR', str(tmp_path / "missing"))
+        assert AddonWatcher.from_environment(manager) is None
+        
+        monkeypatch.setenv('ADDON_STAGING_DIR', str(tmp_path))
+        monkeypatch.setenv('ADDON_WATCH', '0')
+        assert AddonWatcher.from_environment(manager) is None
@@ -1,3 +1,5 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi.testclient import TestClient
@@ -6,7 +8,13 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from server_wrapper import app, server_manager
+from backup_store import BackupStore
+from command_history import CommandHistory
+import pack_validate
+from pack_index import CACHE_NAME
+from server_wrapper import (
+    ServerManager, app, export_world, server_manager, supervisor, _log_events, _stop_events
+)
 
 
 class TestAPI:
@@ -20,12 +28,14 @@ class TestAPI:
         """Reset server manager state before each test"""
         server_manager.process = None
         server_manager.running = False
-        server_manager.command_history = []
+        server_manager.state = "stopped"
+        server_manager.command_history = CommandHistory()
+        server_manager.players.clear()
         yield
         # Cleanup after test
         server_manager.process = None
         server_manager.running = False
-        server_manager.command_history = []
+        server_manager.command_history = CommandHistory()
     
     def test_root_endpoint(self, client):
         response = client.get("/")
@@ -75,7 +85,82 @@ class TestAPI:
         assert data["command"] == "say Hello"
         assert "timestamp" in data
         
-        mock_send_command.assert_called_once_with("say Hello")
+        mock_send_command.assert_called_once_with("say Hello", client="testclient")
+    
+    @patch.object(server_manager, 'send_command')
+    def test_send_command_wait(self, mock_send_command, client):
+        mock_send_command.return_value = {
+            "status": "completed",
+            "command": "list",
+            "timestamp": "2025-08-09T10:30:15",
+            "output": ["There are 0/10 players online:"]
+        }
+        
+        response = client.post("/command", json={
+            "command": "list", "wait": True, "timeout": 2, "match": "players online"
+        })
+        assert response.status_code == 200
+        assert response.json()["output"] == ["There are 0/10 players online:"]
+        
+        mock_send_command.assert_called_once_with(
+            "list", wait=True, timeout=2, match="players online", client="testclient"
+        )
+    
+    def test_send_command_wait_timeout_out_of_range(self, client):
+        response = client.post("/command", json={"command": "list", "wait": True, "timeout": 600})
+        assert response.status_code == 422
+    
+    @patch.object(server_manager, 'send_commands')
+    def test_send_commands_batch(self, mock_send_commands, client):
+        mock_send_commands.return_value = {"status": "sent", "count": 2, "results": []}
+        
+        response = client.post("/commands", json={"commands": ["say a", "say b"]})
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+        
+        mock_send_commands.assert_called_once_with(["say a", "say b"], client="testclient")
+    
+    @patch.object(server_manager, 'send_command')
+    def test_send_command_client_header(self, mock_send_command, client, monkeypatch):
+        mock_send_command.return_value = {"status": "sent"}
+        
+        client.post("/command", json={"command": "list"}, headers={"X-Client-Id": "event-bot"})
+        # Only trusted hosts may name the client
+        mock_send_command.assert_called_with("list", client="testclient")
+        
+        monkeypatch.setenv("TRUSTED_CLIENT_HOSTS", "10.0.0.1, testclient")
+        client.post("/command", json={"command": "list"}, headers={"X-Client-Id": "event-bot"})
+        mock_send_command.assert_called_with("list", client="event-bot")
+    
+    def test_send_command_rate_limited(self, client):
+        server_manager.process = Mock()
+        server_manager.running = True
+        
+        with patch.object(server_manager.scheduler, 'burst', 2), \
+             patch.object(server_manager.scheduler, 'rate', 0.01), \
+             patch.object(server_manager.scheduler, '_buckets', {}):
+            statuses = [
+                client.post("/command", json={"command": "say hi"}).status_code
+                for _ in range(3)
+            ]
+            response = client.post("/command", json={"command": "say hi"})
+            stop = client.post("/command", json={"command": "stop"})
+        
+        assert statuses == [200, 200, 429]
+        assert "Rate limit exceeded" in response.json()["detail"]
+        assert "retry-after" in response.headers
+        # Control commands still get through
+        assert stop.status_code == 200
+        assert len(server_manager.command_history) == 3
+    
+    def test_get_command_queue(self, client):
+        response = client.get("/command/queue")
+        assert response.status_code == 200
+        assert set(response.json()) == {"depth", "max_depth", "clients", "rejected"}
+    
+    def test_send_commands_empty_batch(self, client):
+        response = client.post("/commands", json={"commands": []})
+        assert response.status_code == 422
     
     def test_send_command_invalid_json(self, client):
         response = client.post("/command", json={})
@@ -104,13 +189,12 @@ class TestAPI:
         assert response.status_code == 200
         data = response.json()
         assert data["commands"] == []
+        assert data["total"] == 0
     
     def test_get_command_history_with_commands(self, client):
         # Add some command history
-        server_manager.command_history = [
-            {"timestamp": "2025-08-09T10:30:15", "command": "say Hello"},
-            {"timestamp": "2025-08-09T10:30:20", "command": "list"}
-        ]
+        server_manager.command_history.append("say Hello", "2025-08-09T10:30:15")
+        server_manager.command_history.append("list", "2025-08-09T10:30:20")
         
         response = client.get("/command/history")
         assert response.status_code == 200
@@ -119,6 +203,272 @@ class TestAPI:
         assert data["commands"][0]["command"] == "say Hello"
         assert data["commands"][1]["command"] == "list"
     
+    def test_get_command_history_pagination(self, client):
+        for i in range(10):
+            server_manager.command_history.append(f"say {i}", f"2025-08-09T10:30:{i:02d}")
+        
+        response = client.get("/command/history", params={"limit": 3})
+        data = response.json()
+        assert [c["command"] for c in data["commands"]] == ["say 7", "say 8", "say 9"]
+        assert data["total"] == 10
+        
+        response = client.get("/command/history", params={"limit": 3, "before": data["first_id"]})
+        assert [c["command"] for c in response.json()["commands"]] == ["say 4", "say 5", "say 6"]
+        
+        response = client.get("/command/history", params={"limit": 2, "after": 2})
+        assert [c["command"] for c in response.json()["commands"]] == ["say 2", "say 3"]
+        
+        response = client.get("/command/history", params={
+            "start": "2025-08-09T10:30:03", "end": "2025-08-09T10:30:05"
+        })
+        assert [c["command"] for c in response.json()["commands"]] == ["say 3", "say 4", "say 5"]
+    
+    def test_get_command_history_invalid_limit(self, client):
+        response = client.get("/command/history", params={"limit": 5000})
+        assert response.status_code == 422
+    
+    def test_get_logs(self, client):
+        start = server_manager.output_buffer.last_seq
+        server_manager._handle_output_line("Server started.\n")
+        server_manager._handle_output_line("Player connected: Steve\n")
+        
+        response = client.get("/logs", params={"since": start})
+        assert response.status_code == 200
+        data = response.json()
+        assert [l["line"] for l in data["lines"]] == ["Server started.", "Player connected: Steve"]
+        
+        response = client.get("/logs", params={"since": data["next"]})
+        assert response.json()["lines"] == []
+    
+    def test_get_logs_invalid_limit(self, client):
+        response = client.get("/logs", params={"limit": 0})
+        assert response.status_code == 422
+    
+    @pytest.mark.asyncio
+    async def test_log_events_replay_then_live(self):
+        start = server_manager.output_buffer.last_seq
+        server_manager._handle_output_line("buffered line")
+        subscriber = server_manager.log_stream.subscribe()
+        
+        events = _log_events(server_manager, subscriber, since=start)
+        assert '"line": "buffered line"' in await events.__anext__()
+        
+        server_manager._handle_output_line("live line")
+        live = await events.__anext__()
+        assert live.startswith(f"id: {start + 2}\n")
+        assert '"line": "live line"' in live
+        
+        server_manager.log_stream.close_all("shutdown")
+        assert (await events.__anext__()).startswith("event: close")
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+        assert server_manager.log_stream.subscriber_count == 0
+    
+    def test_log_stream_too_many_subscribers(self, client):
+        with patch.object(server_manager.log_stream, 'max_subscribers', 0):
+            response = client.get("/logs/stream")
+        assert response.status_code == 503
+    
+    def test_get_players(self, client):
+        server_manager._handle_output_line(
+            "[2025-08-09 10:30:15:123 INFO] Player connected: Steve, xuid: 2535412345678901"
+        )
+        server_manager._handle_output_line(
+            "[2025-08-09 10:30:16:123 INFO] Player connected: Alex, xuid: 2535400000000002"
+        )
+        server_manager._handle_output_line(
+            "[2025-08-09 10:35:00:000 INFO] Player disconnected: Alex, xuid: 2535400000000002"
+        )
+        
+        response = client.get("/players")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 1
+        assert data["players"][0]["name"] == "Steve"
+        assert data["players"][0]["xuid"] == "2535412345678901"
+        
+        response = client.get("/players/Alex")
+        assert response.json()["online"] is False
+        assert client.get("/players/Nobody").status_code == 404
+    
+    def test_metrics(self, client):
+        server_manager.players.connect("Steve", "2535412345678901")
+        
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE mcs_command_submit_seconds histogram" in response.text
+        assert 'mcs_players_online{instance="default"} 1' in response.text
+        assert 'mcs_command_queue_depth{instance="default"} 0' in response.text
+    
+    def test_status_history(self, client):
+        history = server_manager.sampler.history
+        history.append(time.time(), cpu_percent=12.5, rss_bytes=1024, threads=8)
+        
+        response = client.get("/status/history?window=60")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["window"] == 60
+        assert data["samples"][-1]["cpu_percent"] == 12.5
+        assert data["samples"][-1]["threads"] == 8
+        assert client.get("/status/history?window=0").status_code == 422
+    
+    def test_validate_addons(self, client, tmp_path, monkeypatch):
+        monkeypatch.setenv('ADDON_STAGING_DIR', str(tmp_path / "missing"))
+        assert client.get("/addons/validate").status_code == 404
+        
+        items = tmp_path / "behavior_packs" / "tools" / "items"
+        items.mkdir(parents=True)
+        (items / "pick.json").write_text('{"format_version": "1.20.20", "minecraft:item": {}}')
+        monkeypatch.setenv('ADDON_STAGING_DIR', str(tmp_path))
+        # The API never starts worker processes from the threaded server
+        monkeypatch.setattr(pack_validate, "PARALLEL_THRESHOLD", 1)
+        monkeypatch.setattr(pack_validate, "ProcessPoolExecutor", None)
+        
+        response = client.get("/addons/validate")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["files"] == 1
+        assert data["errors"] == 1
+        assert data["problems"][0]["file"] == "behavior_packs/tools/items/pick.json"
+    
+    def test_addon_definitions_and_conflicts(self, client, tmp_path, monkeypatch):
+        for pack, uuid in [("tools", "11111111-1111-1111-1111-111111111111"),
+                           ("blasters", "22222222-2222-2222-2222-222222222222")]:
+            pack_dir = tmp_path / "addons" / "behavior_packs" / pack
+            (pack_dir / "items").mkdir(parents=True)
+            (pack_dir / "manifest.json").write_text(
+                f'{{"format_version": 2, "header": {{"uuid": "{uuid}", "version": [1, 0, 0]}}}}'
+            )
+            (pack_dir / "items" / "bow.json").write_text(
+                '{"minecraft:item": {"description": {"identifier": "minecraft:bow"}}}'
+            )
+        world = tmp_path / "worlds" / "Bedrock level"
+        world.mkdir(parents=True)
+        (world / "world_behavior_packs.json").write_text(
+            '[{"pack_id": "22222222-2222-2222-2222-222222222222", "version": [1, 0, 0]}]'
+        )
+        monkeypatch.setenv('ADDON_STAGING_DIR', str(tmp_path / "addons"))
+        monkeypatch.setattr(server_manager, "directory", str(tmp_path))
+        monkeypatch.setattr(server_manager, "addon_index", None)
+        
+        response = client.get("/addons/definitions/minecraft:bow")
+        assert response.status_code == 200
+        assert response.json()["definitions"][0]["packs"] == ["behavior_packs/blasters", "behavior_packs/tools"]
+        assert client.get("/addons/definitions/dane:nothing").status_code == 404
+        
+        conflicts = client.get("/addons/conflicts").json()["conflicts"]
+        assert [(c["identifier"], c["overrides_vanilla"]) for c in conflicts] == [("minecraft:bow", True)]
+        assert server_manager.addon_index.parsed == 0
+        assert not (tmp_path / "addons" / CACHE_NAME).exists()
+    
+    def test_backups(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(server_manager, "backups", BackupStore(tmp_path / "backups"))
+        monkeypatch.setattr(server_manager, "directory", str(tmp_path))
+        (tmp_path / "worlds" / "Bedrock level").mkdir(parents=True)
+        (tmp_path / "worlds" / "Bedrock level" / "level.dat").write_bytes(b"level")
+        
+        created = client.post("/backups?label=test").json()
+        assert created["label"] == "test"
+        assert created["file_count"] == 1
+        
+        backups = client.get("/backups").json()["backups"]
+        assert [b["id"] for b in backups] == [created["id"]]
+        
+        response = client.post(f"/backups/{created['id']}/restore")
+        assert response.json()["levels"] == ["Bedrock level"]
+        assert client.post("/backups/missing/restore").status_code == 404
+        
+        assert client.delete(f"/backups/{created['id']}").json()["deleted"] is True
+        assert client.delete(f"/backups/{created['id']}").status_code == 404
+    
+    def test_world_export_and_import(self, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(server_manager, "backups", BackupStore(tmp_path / "backups"))
+        monkeypatch.setattr(server_manager, "directory", str(tmp_path))
+        level = tmp_path / "worlds" / "Bedrock level"
+        level.mkdir(parents=True)
+        (level / "level.dat").write_bytes(b"level")
+        
+        response = client.get("/world/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-tar"
+        archive = response.content
+        # The export's snapshot is removed once the download ends
+        deadline = time.monotonic() + 5
+        while server_manager.backups.list() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server_manager.backups.list() == []
+        
+        (level / "level.dat").write_bytes(b"changed")
+        response = client.post("/world/import?restore=true", content=archive)
+        assert response.status_code == 200
+        assert response.json()["restore"]["levels"] == ["Bedrock level"]
+        assert (level / "level.dat").read_bytes() == b"level"
+        
+        assert client.post("/world/import", content=b"not a tar").status_code == 400
+        assert client.get("/world/export?format=rar").status_code == 400
+        assert client.get("/backups/missing/export").status_code == 404
+    
+    @pytest.mark.asyncio
+    async def test_world_export_deleted_when_client_leaves_early(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(server_manager, "backups", BackupStore(tmp_path / "backups"))
+        monkeypatch.setattr(server_manager, "directory", str(tmp_path))
+        (tmp_path / "worlds" / "Bedrock level").mkdir(parents=True)
+        (tmp_path / "worlds" / "Bedrock level" / "level.dat").write_bytes(b"level")
+        response = await export_world(manager=server_manager)
+        
+        async def send(message):
+            raise OSError("client went away")
+        
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, send)
+        
+        deadline = time.monotonic() + 5
+        while server_manager.backups.list() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert server_manager.backups.list() == []
+        # Running the cleanup again is harmless
+        response.cleanup()
+    
+    def test_list_servers(self, client):
+        response = client.get("/servers")
+        assert response.status_code == 200
+        servers = response.json()["servers"]
+        assert servers[0]["id"] == "default"
+        assert servers[0]["default"] is True
+        assert servers[0]["running"] is False
+    
+    def test_instance_routes(self, client, tmp_path):
+        lobby = ServerManager(instance_id="lobby", directory=str(tmp_path))
+        lobby.process = Mock()
+        lobby.process.poll.return_value = None
+        lobby.process.pid = 4242
+        lobby.running = True
+        
+        with patch.dict(supervisor.managers, {"lobby": lobby}):
+            response = client.get("/servers/lobby/status")
+            assert response.json()["pid"] == 4242
+            
+            response = client.post("/servers/lobby/command", json={"command": "say hi"})
+            assert response.status_code == 200
+            lobby.process.stdin.write.assert_called_once_with("say hi\n")
+            
+            # Top-level routes still address the default instance
+            assert client.get("/status").json()["running"] is False
+            assert client.get("/servers/default/status").json()["running"] is False
+            assert len(client.get("/servers").json()["servers"]) == 2
+        
+        assert len(lobby.command_history) == 1
+        assert len(server_manager.command_history) == 0
+    
+    def test_unknown_instance(self, client):
+        response = client.get("/servers/missing/status")
+        assert response.status_code == 404
+        assert "Unknown server" in response.json()["detail"]
+    
     @patch.object(server_manager, 'start_server')
     def test_start_server_success(self, mock_start_server, client):
         mock_start_server.return_value = {"status": "started", "pid": 12345}
@@ -154,6 +504,24 @@ class TestAPI:
         
         mock_stop_server.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_stop_server_streams_progress(self):
+        async def fake_stop():
+            server_manager._handle_output_line("Stopping server...")
+            await asyncio.sleep(0)
+            server_manager._handle_output_line("Quit correctly")
+            return {"status": "stopped"}
+        
+        subscriber = server_manager.log_stream.subscribe()
+        with patch.object(server_manager, 'stop_server', side_effect=fake_stop):
+            events = [event async for event in _stop_events(server_manager, subscriber)]
+        
+        assert '"line": "Stopping server..."' in events[0]
+        assert '"line": "Quit correctly"' in events[1]
+        assert events[-1].startswith("event: result")
+        assert '"status": "stopped"' in events[-1]
+        assert server_manager.log_stream.subscriber_count == 0
+    
     @patch.object(server_manager, 'stop_server')
     def test_stop_server_not_running(self, mock_stop_server, client):
         mock_stop_server.return_value = {"status": "not_running"}
@@ -181,6 +549,45 @@ class TestAPI:
         mock_stop_server.assert_called_once()
         mock_start_server.assert_called_once()
     
+    def test_ready_probe(self, client):
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["state"] == "stopped"
+        
+        server_manager.process = Mock()
+        server_manager.process.poll.return_value = None
+        server_manager.running = True
+        server_manager._handle_output_line("Server started.")
+        
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+    
+    @patch.object(server_manager, 'stop_server')
+    @patch.object(server_manager, 'start_server')
+    def test_restart_waits_until_ready(self, mock_start_server, mock_stop_server, client):
+        import threading
+        
+        mock_stop_server.return_value = {"status": "stopped"}
+        
+        async def start():
+            server_manager.process = Mock()
+            server_manager.process.poll.return_value = None
+            server_manager.running = True
+            server_manager.state = "starting"
+            # Bedrock finishes loading a little later, on the monitor thread
+            threading.Timer(0.05, server_manager._handle_output_line, args=("Server started.",)).start()
+            return {"status": "started", "pid": 12345}
+        mock_start_server.side_effect = start
+        
+        response = client.post("/server/restart")
+        
+        data = response.json()
+        assert data["status"] == "started"
+        assert data["ready"] is True
+        assert data["state"] == "ready"
+        assert data["startup_seconds"] >= 0.05
+    
     @patch.object(server_manager, 'stop_server')
     @patch.object(server_manager, 'start_server')
     def test_restart_server_stop_failure(self, mock_start_server, mock_stop_server, client):
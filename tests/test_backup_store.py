@@ -0,0 +1,275 @@
+import io
+import tarfile
+import threading
+import zipfile
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import backup_store
+from backup_store import BackupStore, ChunkReader, parse_save_query, safe_path, scan_world
+
+
+@pytest.fixture
+def world(tmp_path):
+    worlds = tmp_path / "worlds"
+    db = worlds / "Bedrock level" / "db"
+    db.mkdir(parents=True)
+    (db / "000005.ldb").write_bytes(b"table" * 1000)
+    (db / "000006.log").write_bytes(b"journal-entries")
+    (db / "CURRENT").write_text("MANIFEST-000004\n")
+    (worlds / "Bedrock level" / "levelname.txt").write_text("Bedrock level")
+    return worlds
+
+
+class TestSaveQuery:
+    
+    def test_parse_file_list(self):
+        line = "Bedrock level/db/000005.ldb:5000, Bedrock level/db/CURRENT:16, Bedrock level/level.dat:2431"
+        
+        assert parse_save_query(line) == [
+            ("Bedrock level/db/000005.ldb", 5000),
+            ("Bedrock level/db/CURRENT", 16),
+            ("Bedrock level/level.dat", 2431),
+        ]
+    
+    def test_parse_with_header(self):
+        line = "[2025-08-09 10:30:15:123 INFO] Bedrock level/db/CURRENT:16"
+        
+        assert parse_save_query(line) == [("Bedrock level/db/CURRENT", 16)]
+    
+    def test_other_lines_are_not_file_lists(self):
+        assert parse_save_query("Data saved. Files are now ready to be copied.") is None
+        assert parse_save_query("[2025-08-09 10:30:15:123 INFO] Player connected: Steve, xuid: 1") is None
+        assert parse_save_query("A previous save has not been completed.") is None
+    
+    def test_safe_path(self):
+        assert safe_path("Bedrock level/./db/CURRENT") == "Bedrock level/db/CURRENT"
+        for bad in ("/etc/passwd", "../escape", "level/../../escape", ""):
+            with pytest.raises(ValueError):
+                safe_path(bad)
+
+
+class TestBackupStore:
+    
+    def test_snapshot_copies_only_reported_lengths(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        
+        snapshot = store.create(world, [("Bedrock level/db/000006.log", 7)], online=True)
+        
+        manifest = store.load(snapshot["id"])
+        entry = manifest["files"]["Bedrock level/db/000006.log"]
+        assert entry["size"] == 7
+        assert store.object_path(entry["hash"]).read_bytes() == b"journal"
+        assert snapshot["online"] is True
+        assert "files" not in snapshot
+    
+    def test_unchanged_files_are_stored_once(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        first = store.create(world, scan_world(world))
+        
+        (world / "Bedrock level" / "db" / "000006.log").write_bytes(b"journal-entries-and-more")
+        second = store.create(world, scan_world(world))
+        
+        assert first["new_files"] == 4
+        assert second["new_files"] == 1
+        assert second["new_bytes"] == len(b"journal-entries-and-more")
+        assert len(list(store.objects.glob("*/*"))) == 5
+        assert [s["id"] for s in store.list()] == [second["id"], first["id"]]
+    
+    def test_cached_files_are_not_reread(self, tmp_path, world, monkeypatch):
+        store = BackupStore(tmp_path / "backups")
+        store.create(world, scan_world(world))
+        
+        reads = []
+        original = BackupStore._read
+        monkeypatch.setattr(BackupStore, "_read", staticmethod(
+            lambda path, length: reads.append(path.name) or original(path, length)
+        ))
+        (world / "Bedrock level" / "db" / "CURRENT").write_text("MANIFEST-000007\n")
+        store.create(world, scan_world(world))
+        
+        assert reads == ["CURRENT"]
+    
+    def test_restore_replaces_level(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        snapshot = store.create(world, scan_world(world))
+        level = world / "Bedrock level"
+        (level / "db" / "000005.ldb").write_bytes(b"corrupted")
+        (level / "db" / "000099.ldb").write_bytes(b"new since backup")
+        
+        result = store.restore(snapshot["id"], world)
+        
+        assert result["levels"] == ["Bedrock level"]
+        assert (level / "db" / "000005.ldb").read_bytes() == b"table" * 1000
+        assert not (level / "db" / "000099.ldb").exists()
+        assert sorted(p.name for p in world.iterdir()) == ["Bedrock level"]
+    
+    def test_restore_leaves_mounted_files_alone(self, tmp_path, world, monkeypatch):
+        store = BackupStore(tmp_path / "backups")
+        level = world / "Bedrock level"
+        (level / "world_behavior_packs.json").write_text("[]")
+        snapshot = store.create(world, scan_world(world))
+        mounted = level / "world_behavior_packs.json"
+        mounted.write_text('[{"pack_id": "mounted"}]')
+        (level / "extra").mkdir()
+        (level / "extra" / "stale.txt").write_text("stale")
+        monkeypatch.setattr(backup_store, "mount_points", lambda: {str(mounted.resolve())})
+        
+        for _ in range(2):
+            store.restore(snapshot["id"], world)
+        
+        assert mounted.read_text() == '[{"pack_id": "mounted"}]'
+        assert not (level / "extra").exists()
+        assert sorted(p.name for p in world.iterdir()) == ["Bedrock level"]
+    
+    def test_restore_refuses_missing_objects(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        snapshot = store.create(world, scan_world(world))
+        manifest = store.load(snapshot["id"])
+        store.object_path(manifest["files"]["Bedrock level/db/CURRENT"]["hash"]).unlink()
+        (world / "Bedrock level" / "db" / "CURRENT").write_text("MANIFEST-000009\n")
+        
+        assert store.missing_objects(snapshot["id"]) == ["Bedrock level/db/CURRENT"]
+        with pytest.raises(FileNotFoundError):
+            store.restore(snapshot["id"], world)
+        assert (world / "Bedrock level" / "db" / "CURRENT").read_text() == "MANIFEST-000009\n"
+    
+    def test_delete_collects_unreferenced_objects(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        first = store.create(world, scan_world(world))
+        (world / "Bedrock level" / "db" / "CURRENT").write_text("MANIFEST-000007\n")
+        second = store.create(world, scan_world(world))
+        
+        result = store.delete(first["id"])
+        
+        assert result["objects_removed"] == 1
+        assert len(list(store.objects.glob("*/*"))) == 4
+        store.restore(second["id"], world)
+        with pytest.raises(KeyError):
+            store.load(first["id"])
+        with pytest.raises(KeyError):
+            store.delete(first["id"])
+    
+    def test_delete_only_checks_its_own_objects(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        snapshot = store.create(world, scan_world(world))
+        stray = store.object_path("0" * 64)
+        stray.parent.mkdir(parents=True, exist_ok=True)
+        stray.write_bytes(b"not ours")
+        
+        result = store.delete(snapshot["id"])
+        
+        assert result["objects_removed"] == 4
+        assert [p.name for p in store.objects.glob("*/*")] == [stray.name]
+    
+    def test_unknown_snapshot(self, tmp_path):
+        store = BackupStore(tmp_path / "backups")
+        
+        assert store.list() == []
+        with pytest.raises(KeyError):
+            store.load("../../etc/passwd")
+
+
+class TestExportImport:
+    
+    @pytest.fixture
+    def store(self, tmp_path, world):
+        store = BackupStore(tmp_path / "backups")
+        store.snapshot = store.create(world, scan_world(world))
+        return store
+    
+    def test_tar_export_round_trip(self, store, world):
+        data = b"".join(store.export(store.snapshot["id"], "tar"))
+        
+        with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+            assert sorted(archive.getnames()) == [path for path, _ in scan_world(world)]
+            ldb = archive.extractfile("Bedrock level/db/000005.ldb").read()
+        assert ldb == b"table" * 1000
+    
+    def test_zip_export_round_trip(self, store):
+        data = b"".join(store.export(store.snapshot["id"], "zip"))
+        
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.testzip() is None
+            assert archive.read("Bedrock level/db/CURRENT") == b"MANIFEST-000004\n"
+    
+    def test_export_streams_bounded_chunks(self, store, world, monkeypatch):
+        monkeypatch.setattr(backup_store, "CHUNK_SIZE", 256)
+        
+        for format in ("tar", "zip"):
+            chunks = list(store.export(store.snapshot["id"], format))
+            # Headers aside, no chunk is bigger than CHUNK_SIZE
+            assert max(len(chunk) for chunk in chunks) <= 4096
+    
+    def test_export_unknown_snapshot_or_format(self, store):
+        with pytest.raises(KeyError):
+            store.export("missing")
+        with pytest.raises(ValueError):
+            store.export(store.snapshot["id"], "rar")
+    
+    def test_import_gzipped_tar_dedupes_objects(self, store):
+        exported = b"".join(store.export(store.snapshot["id"]))
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive, \
+                tarfile.open(fileobj=io.BytesIO(exported)) as source:
+            for member in source:
+                archive.addfile(member, source.extractfile(member))
+        
+        snapshot = store.import_tar(io.BytesIO(buffer.getvalue()), label="upload")
+        
+        assert snapshot["imported"] is True
+        assert snapshot["file_count"] == store.snapshot["file_count"]
+        assert snapshot["new_files"] == 0
+    
+    def test_import_rejects_escaping_paths(self, store):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            info = tarfile.TarInfo("../../etc/cron.d/evil")
+            info.size = 4
+            archive.addfile(info, io.BytesIO(b"evil"))
+        
+        with pytest.raises(ValueError):
+            store.import_tar(io.BytesIO(buffer.getvalue()))
+    
+    def test_chunk_reader(self):
+        reader = ChunkReader(maxsize=2)
+        
+        def produce():
+            for chunk in (b"abc", b"defg", b"h"):
+                reader.chunks.put(chunk)
+            reader.chunks.put(None)
+        
+        threading.Thread(target=produce).start()
+        
+        assert reader.read(5) == b"abcde"
+        assert reader.read() == b"fgh"
+        assert reader.read(10) == b""
+    
+    def test_chunk_reader_aborted_by_producer(self):
+        reader = ChunkReader()
+        reader.chunks.put(b"abc")
+        reader.chunks.put(ConnectionError("client went away"))
+        
+        with pytest.raises(ConnectionError):
+            reader.read(10)
+    
+    def test_chunk_reader_times_out(self):
+        reader = ChunkReader(timeout=0.01)
+        reader.chunks.put(b"abc")
+        
+        with pytest.raises(TimeoutError):
+            reader.read()
+    
+    def test_interrupted_import_writes_nothing(self, store):
+        exported = b"".join(store.export(store.snapshot["id"]))
+        reader = ChunkReader()
+        reader.chunks.put(exported[:1024])
+        reader.chunks.put(ConnectionError("client went away"))
+        
+        with pytest.raises(ConnectionError):
+            store.import_tar(reader)
+        
+        assert len(store.list()) == 1
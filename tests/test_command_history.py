@@ -0,0 +1,93 @@
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from command_history import CommandHistory
+
+
+class TestCommandHistory:
+    
+    @pytest.fixture
+    def history(self):
+        history = CommandHistory(tail_size=3)
+        for i in range(1, 8):
+            history.append(f"say {i}", f"2025-08-09T10:30:{i:02d}")
+        yield history
+        history.close()
+    
+    def test_append(self):
+        history = CommandHistory()
+        
+        entry = history.append("list")
+        
+        assert entry["id"] == 1
+        assert entry["command"] == "list"
+        assert "timestamp" in entry
+        assert len(history) == 1
+    
+    def test_tail_is_bounded(self, history):
+        assert len(history) == 7
+        assert [e["command"] for e in history.recent(10)] == ["say 5", "say 6", "say 7"]
+    
+    def test_query_latest(self, history):
+        assert [e["id"] for e in history.query(limit=2)] == [6, 7]
+        # Larger than the tail falls through to the store
+        assert [e["id"] for e in history.query(limit=5)] == [3, 4, 5, 6, 7]
+    
+    def test_query_before_cursor(self, history):
+        assert [e["id"] for e in history.query(limit=2, before=3)] == [1, 2]
+    
+    def test_query_after_cursor(self, history):
+        assert [e["id"] for e in history.query(limit=2, after=4)] == [5, 6]
+    
+    def test_query_between_cursors(self, history):
+        assert [e["id"] for e in history.query(limit=10, after=2, before=5)] == [3, 4]
+    
+    def test_query_time_range(self, history):
+        entries = history.query(start="2025-08-09T10:30:02", end="2025-08-09T10:30:04")
+        assert [e["command"] for e in entries] == ["say 2", "say 3", "say 4"]
+        entries = history.query(limit=2, start="2025-08-09T10:30:02", end="2025-08-09T10:30:04")
+        assert [e["command"] for e in entries] == ["say 3", "say 4"]
+        entries = history.query(limit=2, after=1, start="2025-08-09T10:30:02")
+        assert [e["command"] for e in entries] == ["say 2", "say 3"]
+        assert history.query(start="2025-08-09T10:31:00") == []
+        assert history.query(end="2025-08-09T10:29:00") == []
+    
+    def test_query_time_range_pages_on_primary_key(self, history):
+        plans = []
+        history._db.set_trace_callback(plans.append)
+        history.query(limit=2, start="2025-08-09T10:30:02", end="2025-08-09T10:30:06")
+        history._db.set_trace_callback(None)
+        
+        page = plans[-1]
+        assert "timestamp" not in page
+        plan = history._db.execute(f"EXPLAIN QUERY PLAN {page}").fetchall()
+        assert not any("TEMP B-TREE" in row["detail"] for row in plan)
+    
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "command_history.db"
+        history = CommandHistory(path, tail_size=2)
+        for i in range(5):
+            history.append(f"say {i}")
+        history.close()
+        
+        reopened = CommandHistory(path, tail_size=2)
+        
+        assert len(reopened) == 5
+        assert [e["command"] for e in reopened.recent()] == ["say 3", "say 4"]
+        assert reopened.append("list")["id"] == 6
+        assert [e["command"] for e in reopened.query(limit=2, before=3)] == ["say 0", "say 1"]
+        reopened.close()
+    
+    def test_append_batch(self):
+        history = CommandHistory()
+        history.append("list")
+        
+        entry = history.append_batch(["tp Steve 0 64 0", "give Steve diamond 1"])
+        
+        assert len(history) == 2
+        assert entry["commands"] == ["tp Steve 0 64 0", "give Steve diamond 1"]
+        assert history.query(limit=1, after=1)[0]["commands"] == entry["commands"]
+        assert "commands" not in history.query(limit=1, before=2)[0]
@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from command_queue import (
+    CommandScheduler, QueueFullError, RateLimitedError, TokenBucket, classify
+)
+
+
+class TestClassify:
+    
+    @pytest.mark.parametrize("command,priority", [
+        ("stop", "control"),
+        ("kick Griefer spamming", "control"),
+        ("/ban Griefer", "control"),
+        ("say hello", "normal"),
+        ("tp Steve 0 64 0", "normal"),
+    ])
+    def test_classify(self, command, priority):
+        assert classify(command) == priority
+
+
+class TestTokenBucket:
+    
+    def test_burst_then_refill(self):
+        with patch('command_queue.time.monotonic', return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=3)
+            assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+            assert bucket.take() == pytest.approx(0.5)
+        
+        with patch('command_queue.time.monotonic', return_value=101.0):
+            assert bucket.take(2) == 0
+            assert bucket.take() == pytest.approx(0.5)
+    
+    def test_cost_above_burst_goes_into_debt(self):
+        with patch('command_queue.time.monotonic', return_value=100.0):
+            bucket = TokenBucket(rate=1, burst=2)
+            bucket.take()
+            # Waits for a full bucket, not for more than the burst
+            assert bucket.take(5) == pytest.approx(1)
+        
+        with patch('command_queue.time.monotonic', return_value=101.0):
+            assert bucket.take(5) == 0
+            assert bucket.take() == pytest.approx(4)
+
+
+class TestCommandScheduler:
+    
+    @pytest.fixture
+    def written(self):
+        return []
+    
+    @pytest.fixture
+    def scheduler(self, written):
+        async def writer(data):
+            written.append(data)
+        return CommandScheduler(writer, max_depth=3, rate=1, burst=2)
+    
+    @pytest.mark.asyncio
+    async def test_submit_writes(self, scheduler, written):
+        await scheduler.submit("say hi\n")
+        assert written == ["say hi\n"]
+    
+    @pytest.mark.asyncio
+    async def test_priority_order_and_coalescing(self, scheduler, written):
+        futures = [
+            scheduler.submit("bulk\n", priority="bulk"),
+            scheduler.submit("normal\n"),
+            scheduler.submit("stop\n", priority="control"),
+        ]
+        await asyncio.gather(*futures)
+        
+        assert written == ["stop\nnormal\nbulk\n"]
+    
+    @pytest.mark.asyncio
+    async def test_queue_full(self, scheduler):
+        futures = [scheduler.submit(f"say {i}\n") for i in range(3)]
+        
+        with pytest.raises(QueueFullError):
+            scheduler.submit("say overflow\n")
+        # Control commands are admitted regardless of depth
+        futures.append(scheduler.submit("stop\n", priority="control"))
+        
+        await asyncio.gather(*futures)
+        assert scheduler.stats()["rejected"]["queue_full"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_rate_limit_per_client(self, scheduler):
+        await scheduler.submit("a\n", client="bot")
+        await scheduler.submit("b\n", client="bot")
+        
+        with pytest.raises(RateLimitedError) as exc_info:
+            scheduler.submit("c\n", client="bot")
+        assert exc_info.value.retry_after > 0
+        
+        # Other clients and internal callers are unaffected
+        await scheduler.submit("d\n", client="admin")
+        await scheduler.submit("e\n")
+        # Control commands have a bucket of their own
+        await scheduler.submit("stop\n", priority="control", client="bot")
+    
+    @pytest.mark.asyncio
+    async def test_control_commands_limited_for_clients(self, written):
+        async def writer(data):
+            written.append(data)
+        scheduler = CommandScheduler(writer, max_depth=2, control_reserve=1,
+                                     control_rate=0.01, control_burst=2)
+        
+        await scheduler.submit("reload\n", priority="control", client="bot")
+        await scheduler.submit("reload\n", priority="control", client="bot")
+        with pytest.raises(RateLimitedError):
+            scheduler.submit("reload\n", priority="control", client="bot")
+        
+        # A full queue leaves only the reserve to clients' control commands
+        futures = [scheduler.submit(f"say {i}\n") for i in range(2)]
+        futures.append(scheduler.submit("kick Steve\n", priority="control", client="admin"))
+        with pytest.raises(QueueFullError):
+            scheduler.submit("kick Alex\n", priority="control", client="admin")
+        futures.append(scheduler.submit("stop\n", priority="control"))
+        await asyncio.gather(*futures)
+    
+    @pytest.mark.asyncio
+    async def test_batch_charged_per_command(self, scheduler):
+        await scheduler.submit("a\nb\n", priority="bulk", client="bot", cost=2)
+        
+        with pytest.raises(RateLimitedError):
+            scheduler.submit("c\n", client="bot")
+    
+    @pytest.mark.asyncio
+    async def test_writer_error_propagates(self):
+        async def writer(data):
+            raise BrokenPipeError("Broken pipe")
+        scheduler = CommandScheduler(writer)
+        
+        with pytest.raises(BrokenPipeError):
+            await scheduler.submit("say hi\n")
+    
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self, scheduler):
+        with pytest.raises(ValueError):
+            scheduler.submit("say hi\n", priority="urgent")
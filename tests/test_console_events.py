@@ -0,0 +1,90 @@
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from console_events import ConsoleEvent, EventParser, PlayerIndex
+
+
+class TestEventParser:
+    
+    @pytest.fixture
+    def parser(self):
+        return EventParser()
+    
+    def test_player_connected(self, parser):
+        event = parser.parse(
+            "[2025-08-09 10:30:15:123 INFO] Player connected: Steve Jobs, xuid: 2535412345678901"
+        )
+        
+        assert event.type == "player_connected"
+        assert event.level == "INFO"
+        assert event.data == {"name": "Steve Jobs", "xuid": "2535412345678901"}
+    
+    def test_player_disconnected_with_pfid(self, parser):
+        event = parser.parse(
+            "[2025-08-09 10:31:00:001 INFO] Player disconnected: Alex, xuid: 42, pfid: abc123"
+        )
+        
+        assert event.type == "player_disconnected"
+        assert event.data == {"name": "Alex", "xuid": "42"}
+    
+    @pytest.mark.parametrize("line,event_type", [
+        ("[2025-08-09 10:30:00:000 INFO] Opening level 'worlds/Bedrock level/db'", "level_loading"),
+        ("[2025-08-09 10:30:05:000 INFO] Server started.", "server_started"),
+        ("Server started.", "server_started"),
+        ("[2025-08-09 11:00:00:000 INFO] Server stop requested.", "server_stopping"),
+        ("Quit correctly", "server_quit"),
+        ("Data saved. Files are now ready to be copied.", "world_saved"),
+        ("[2025-08-09 10:30:00:000 ERROR] Failed to load pack", "error"),
+    ])
+    def test_event_types(self, parser, line, event_type):
+        assert parser.parse(line).type == event_type
+    
+    def test_unrecognised_line(self, parser):
+        assert parser.parse("[2025-08-09 10:30:00:000 INFO] Version: 1.21.100.7") is None
+
+
+class TestPlayerIndex:
+    
+    @pytest.fixture
+    def index(self):
+        return PlayerIndex()
+    
+    def test_connect_and_disconnect(self, index):
+        index.apply(ConsoleEvent("player_connected", "", data={"name": "Steve", "xuid": "1"}))
+        index.apply(ConsoleEvent("player_connected", "", data={"name": "Alex", "xuid": "2"}))
+        assert index.count == 2
+        
+        index.apply(ConsoleEvent("player_disconnected", "", data={"name": "Steve", "xuid": "1"}))
+        
+        assert [p["name"] for p in index.online()] == ["Alex"]
+        assert index.get("Steve")["online"] is False
+        assert index.get("Alex")["online"] is True
+    
+    def test_sessions_counted(self, index):
+        for _ in range(3):
+            index.connect("Steve", "1")
+            index.disconnect("Steve", "1")
+        
+        assert index.get("Steve")["sessions"] == 3
+        assert index.count == 0
+    
+    def test_name_change_keeps_xuid(self, index):
+        index.connect("OldName", "1")
+        index.disconnect("OldName", "1")
+        index.connect("NewName", "1")
+        
+        assert index.get("NewName")["sessions"] == 2
+    
+    def test_server_restart_clears_online(self, index):
+        index.connect("Steve", "1")
+        
+        index.apply(ConsoleEvent("server_started", "Server started."))
+        
+        assert index.online() == []
+        assert index.get("Steve")["sessions"] == 1
+    
+    def test_unknown_player(self, index):
+        assert index.get("Nobody") is None
@@ -0,0 +1,103 @@
+import json
+import logging
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from console_filter import ConsoleFilter, FilterRule
+
+
+def lines(records):
+    return [text for _, text in records]
+
+
+class TestConsoleFilter:
+    
+    def test_level_from_bedrock_header(self):
+        console_filter = ConsoleFilter()
+        
+        assert console_filter.process("[2025-08-09 10:30:15:123 WARN] Low memory") == [
+            (logging.WARNING, "[2025-08-09 10:30:15:123 WARN] Low memory")
+        ]
+        assert console_filter.process("[2025-08-09 10:30:15:123 ERROR] Boom")[0][0] == logging.ERROR
+        assert console_filter.process("NO LOG FILE! - setting up server logging...")[0][0] == logging.INFO
+    
+    def test_collapses_repeated_messages(self):
+        console_filter = ConsoleFilter()
+        
+        records = []
+        for second in range(5):
+            records += console_filter.process(f"[2025-08-09 10:30:{second:02d}:000 WARN] Chunk lag")
+        records += console_filter.process("[2025-08-09 10:31:00:000 INFO] Player connected: Steve, xuid: 1")
+        
+        assert lines(records) == [
+            "[2025-08-09 10:30:00:000 WARN] Chunk lag",
+            "Previous line repeated 4 times",
+            "[2025-08-09 10:31:00:000 INFO] Player connected: Steve, xuid: 1",
+        ]
+        assert records[1][0] == logging.WARNING
+        assert console_filter.suppressed["repeat"] == 4
+    
+    def test_long_runs_report_periodically_and_on_flush(self):
+        console_filter = ConsoleFilter(max_repeats=10)
+        
+        records = []
+        for _ in range(26):
+            records += console_filter.process("spam")
+        records += console_filter.flush()
+        
+        assert lines(records) == [
+            "spam",
+            "Previous line repeated 10 times",
+            "Previous line repeated 10 times",
+            "Previous line repeated 5 times",
+        ]
+    
+    def test_drop_and_level_rules(self):
+        console_filter = ConsoleFilter([
+            FilterRule.from_dict({"pattern": r"^Running AutoCompaction", "action": "drop"}),
+            FilterRule.from_dict({"pattern": r"^\[Scripting\]", "level": "debug"}),
+        ])
+        
+        assert console_filter.process("[2025-08-09 10:30:15:123 INFO] Running AutoCompaction...") == []
+        assert console_filter.process("[Scripting] tick") == [(logging.DEBUG, "[Scripting] tick")]
+        assert console_filter.suppressed["drop"] == 1
+    
+    def test_repeats_of_dropped_lines_are_not_reported(self):
+        console_filter = ConsoleFilter([FilterRule.from_dict({"pattern": "noise", "action": "drop"})])
+        
+        for _ in range(3):
+            assert console_filter.process("noise") == []
+        assert lines(console_filter.process("signal")) == ["signal"]
+    
+    def test_sample_rule(self):
+        console_filter = ConsoleFilter(
+            [FilterRule.from_dict({"pattern": r"^tick \d+", "action": "sample", "every": 3})]
+        )
+        
+        records = []
+        for i in range(7):
+            records += console_filter.process(f"tick {i}")
+        
+        assert lines(records) == ["tick 0", "tick 3", "tick 6"]
+        assert console_filter.suppressed["sample"] == 4
+    
+    def test_from_config(self, tmp_path):
+        config = tmp_path / "filters.json"
+        config.write_text(json.dumps({
+            "rules": [{"pattern": "spam", "action": "drop"}],
+            "collapse_repeats": False
+        }))
+        
+        console_filter = ConsoleFilter.from_config(str(config))
+        
+        assert console_filter.process("spam") == []
+        assert lines(console_filter.process("ok") + console_filter.process("ok")) == ["ok", "ok"]
+    
+    def test_invalid_rules(self):
+        with pytest.raises(ValueError):
+            FilterRule.from_dict({"pattern": "x", "action": "explode"})
+        with pytest.raises(ValueError):
+            FilterRule.from_dict({"pattern": "x", "level": "LOUD"})
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from log_stream import LogBroadcaster
+
+
+class TestLogBroadcaster:
+    
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            LogBroadcaster(policy="block")
+    
+    def test_publish_without_subscribers_is_noop(self):
+        broadcaster = LogBroadcaster()
+        broadcaster.publish(1, "nobody listening")
+        assert broadcaster.published == 0
+    
+    @pytest.mark.asyncio
+    async def test_fan_out(self):
+        broadcaster = LogBroadcaster()
+        subscribers = [broadcaster.subscribe() for _ in range(3)]
+        
+        broadcaster.publish(1, "Server started.")
+        
+        for subscriber in subscribers:
+            entry = await subscriber.get(timeout=1)
+            assert entry["seq"] == 1
+            assert entry["line"] == "Server started."
+    
+    @pytest.mark.asyncio
+    async def test_publish_from_monitor_thread(self):
+        broadcaster = LogBroadcaster()
+        subscriber = broadcaster.subscribe()
+        
+        thread = threading.Thread(target=broadcaster.publish, args=(7, "from thread"))
+        thread.start()
+        thread.join()
+        
+        entry = await subscriber.get(timeout=1)
+        assert entry["line"] == "from thread"
+    
+    @pytest.mark.asyncio
+    async def test_drop_policy_keeps_newest(self):
+        broadcaster = LogBroadcaster(queue_size=2, policy="drop")
+        slow = broadcaster.subscribe()
+        
+        for seq in range(1, 6):
+            broadcaster.publish(seq, f"line {seq}")
+        
+        assert slow.dropped == 3
+        assert (await slow.get(timeout=1))["seq"] == 4
+        assert (await slow.get(timeout=1))["seq"] == 5
+        assert broadcaster.subscriber_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_policy(self):
+        broadcaster = LogBroadcaster(queue_size=2, policy="disconnect")
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        
+        broadcaster.publish(1, "a")
+        broadcaster.publish(2, "b")
+        await fast.get(timeout=1)
+        await fast.get(timeout=1)
+        broadcaster.publish(3, "c")
+        
+        assert await slow.get(timeout=1) is None
+        assert slow.close_reason == "slow_consumer"
+        assert (await fast.get(timeout=1))["seq"] == 3
+        assert broadcaster.subscriber_count == 1
+        assert broadcaster.disconnected == 1
+    
+    @pytest.mark.asyncio
+    async def test_max_subscribers(self):
+        broadcaster = LogBroadcaster(max_subscribers=1)
+        broadcaster.subscribe()
+        
+        with pytest.raises(RuntimeError):
+            broadcaster.subscribe()
+    
+    @pytest.mark.asyncio
+    async def test_close_all(self):
+        broadcaster = LogBroadcaster()
+        subscriber = broadcaster.subscribe()
+        broadcaster.publish(1, "pending")
+        
+        broadcaster.close_all("shutdown")
+        
+        assert await subscriber.get(timeout=1) is None
+        assert subscriber.close_reason == "shutdown"
+        assert broadcaster.subscriber_count == 0
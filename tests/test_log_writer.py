@@ -0,0 +1,118 @@
+import gzip
+import io
+import logging
+import threading
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from log_writer import BatchLogHandler, RotatingLogFile
+
+
+class TestRotatingLogFile:
+    
+    def test_rotates_by_size_and_compresses(self, tmp_path):
+        log = RotatingLogFile(tmp_path / "server.log", max_bytes=100, max_age=None, backups=5)
+        for i in range(10):
+            log.write(f"line {i:02d} " + "x" * 30 + "\n")
+        log.close()
+        
+        segments = log.segments()
+        assert segments and all(p.name.endswith(".gz") for p in segments)
+        restored = "".join(gzip.decompress(p.read_bytes()).decode() for p in segments)
+        restored += (tmp_path / "server.log").read_text()
+        assert restored.splitlines() == [f"line {i:02d} " + "x" * 30 for i in range(10)]
+        assert (tmp_path / "server.log").stat().st_size <= 100
+    
+    def test_prunes_old_segments(self, tmp_path):
+        log = RotatingLogFile(tmp_path / "server.log", max_bytes=10, max_age=None,
+                              backups=2, compress=False)
+        for i in range(6):
+            log.write(f"line {i:04d}\n")
+        log.close()
+        
+        segments = log.segments()
+        assert len(segments) == 2
+        assert segments[-1].read_text() == "line 0004\n"
+    
+    def test_rotates_by_age(self, tmp_path, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr("log_writer.time.monotonic", lambda: clock[0])
+        log = RotatingLogFile(tmp_path / "server.log", max_bytes=0, max_age=60, compress=False)
+        log.write("old\n")
+        clock[0] += 61
+        log.write("new\n")
+        log.close()
+        
+        assert [p.read_text() for p in log.segments()] == ["old\n"]
+        assert (tmp_path / "server.log").read_text() == "new\n"
+    
+    def test_appends_to_existing_file(self, tmp_path):
+        (tmp_path / "server.log").write_text("before\n")
+        log = RotatingLogFile(tmp_path / "server.log", max_bytes=1000)
+        log.write("after\n")
+        log.close()
+        
+        assert (tmp_path / "server.log").read_text() == "before\nafter\n"
+
+
+class TestBatchLogHandler:
+    
+    @pytest.fixture
+    def logger(self):
+        logger = logging.getLogger("test_log_writer")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        yield logger
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+    
+    def test_writes_records_in_order(self, logger):
+        stream = io.StringIO()
+        handler = BatchLogHandler([stream])
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        
+        for i in range(500):
+            logger.info(f"line {i}")
+        handler.flush()
+        
+        assert stream.getvalue().splitlines() == [f"INFO line {i}" for i in range(500)]
+    
+    def test_drops_instead_of_blocking_when_full(self, logger):
+        release = threading.Event()
+        
+        class SlowStream(io.StringIO):
+            def write(self, text):
+                release.wait(5)
+                return super().write(text)
+        
+        stream = SlowStream()
+        handler = BatchLogHandler([stream], queue_size=5)
+        logger.addHandler(handler)
+        
+        logger.info("first")
+        for i in range(50):
+            logger.info(f"burst {i}")
+        release.set()
+        handler.flush()
+        logger.info("after")
+        handler.flush()
+        
+        assert handler.dropped > 0
+        assert f"dropped {handler.dropped} log records" in stream.getvalue()
+        assert stream.getvalue().endswith("after\n")
+    
+    def test_close_flushes_pending_records(self, tmp_path, logger):
+        log = RotatingLogFile(tmp_path / "server.log")
+        handler = BatchLogHandler([log])
+        logger.addHandler(handler)
+        
+        logger.info("last words")
+        logger.removeHandler(handler)
+        handler.close()
+        
+        assert (tmp_path / "server.log").read_text() == "last words\n"
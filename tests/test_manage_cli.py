@@ -1,4 +1,6 @@
+import io
 import pytest
+import requests
 from unittest.mock import Mock, patch, call
 import sys
 from pathlib import Path
@@ -151,6 +153,35 @@ class TestManageCLI:
         assert "Usage: python3 manage.py cmd <command>" in captured.out
         mock_send_request.assert_not_called()
     
+    @patch('manage.send_request')
+    def test_main_batch_command(self, mock_send_request, tmp_path, capsys):
+        script = tmp_path / "event.txt"
+        script.write_text("tp Steve 0 64 0\n\ngive Steve diamond 1\n")
+        mock_send_request.return_value = {"status": "sent", "count": 2}
+        
+        with patch('sys.argv', ['manage.py', 'batch', str(script)]):
+            manage.main()
+        
+        mock_send_request.assert_called_once_with(
+            "POST", "/commands", {"commands": ["tp Steve 0 64 0", "give Steve diamond 1"]}
+        )
+        captured = capsys.readouterr()
+        assert '"count": 2' in captured.out
+    
+    @patch('manage.send_request')
+    def test_main_backup_and_restore(self, mock_send_request, capsys):
+        mock_send_request.return_value = {"id": "20250809-103015-000000"}
+        
+        with patch('sys.argv', ['manage.py', 'backup', 'before', 'update']):
+            manage.main()
+        with patch('sys.argv', ['manage.py', 'restore', '20250809-103015-000000']):
+            manage.main()
+        
+        assert mock_send_request.call_args_list == [
+            call("POST", "/backups?label=before+update"),
+            call("POST", "/backups/20250809-103015-000000/restore"),
+        ]
+    
     @patch('manage.send_request')
     @patch('sys.argv', ['manage.py', 'history'])
     def test_main_history_command(self, mock_send_request, capsys):
@@ -177,4 +208,123 @@ class TestManageCLI:
         assert exc_info.value.code == 1
         captured = capsys.readouterr()
         assert "Unknown command: unknown" in captured.out
-        mock_send_request.assert_not_called()
\ No newline at end of file
+        mock_send_request.assert_not_called()
+
+class FakeResponse:
+    
+    def __init__(self, status_code=200, body=None, lines=(), headers=None):
+        self.status_code = status_code
+        self.body = body if body is not None else {}
+        self.lines = lines
+        self.headers = headers or {}
+        self.reason = "Error"
+        self.closed = False
+    
+    def json(self):
+        return self.body
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+    
+    def close(self):
+        self.closed = True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
+class TestConsole:
+    
+    @pytest.fixture
+    def session(self):
+        players = {"count": 1, "players": [{"name": "Steve"}]}
+        session = Mock()
+        session.request.side_effect = lambda method, url, **kwargs: FakeResponse(
+            body=players if url.endswith("/players") else {"status": "sent"}
+        )
+        session.get.return_value = FakeResponse(body=players)
+        return session
+    
+    @pytest.fixture
+    def console(self, session, tmp_path, monkeypatch):
+        monkeypatch.setattr(manage, "CONSOLE_HISTORY", str(tmp_path / "history"))
+        return manage.Console(session=session, stream_session=Mock(), output=io.StringIO())
+    
+    def test_iter_sse(self):
+        lines = [
+            ": keepalive", "",
+            "id: 4", 'data: {"seq": 4, "line": "hello"}', "",
+            "event: dropped", "data: {\"dropped\": 3}", "",
+            "data: one", "data: two", "",
+        ]
+        
+        assert list(manage.iter_sse(lines)) == [
+            {"event": "message", "id": "4", "data": '{"seq": 4, "line": "hello"}'},
+            {"event": "dropped", "id": None, "data": '{"dropped": 3}'},
+            {"event": "message", "id": None, "data": "one\ntwo"},
+        ]
+    
+    def test_completion(self, console, session):
+        assert console.candidates("ga", "ga") == ["gamemode", "gamerule"]
+        assert console.candidates(".st", ".st") == [".status"]
+        assert console.candidates("gamemode c", "c") == ["creative"]
+        assert console.candidates("gamemode creative ", "") == ["@a", "@e", "@p", "@r", "@s", "Steve"]
+        assert console.candidates("tp S", "S") == ["Steve"]
+        # The player list is cached between completions
+        console.candidates("kick ", "")
+        session.get.assert_called_once_with("http://localhost:8000/players", timeout=2)
+    
+    def test_run_sends_over_one_session(self, console, session):
+        lines = iter(["say hi", "", "/list", ".players", ".exit", "never sent"])
+        
+        console.run(read_line=lambda prompt: next(lines), follow=False)
+        
+        sent = [c.kwargs["json"]["command"] for c in session.request.call_args_list if c.args[0] == "POST"]
+        assert sent == ["say hi", "list"]
+        session.request.assert_any_call("POST", "http://localhost:8000/command", timeout=30,
+                                        json={"command": "say hi"})
+        assert "1 online: Steve" in console.output.getvalue()
+    
+    def test_errors_are_printed(self, console, session):
+        session.request.side_effect = [
+            FakeResponse(429, headers={"Retry-After": "2"}),
+            FakeResponse(400, body={"detail": "Server is not running"}),
+            requests.exceptions.ConnectionError(),
+        ]
+        console.send("say hi")
+        console.send("say hi")
+        console.send("say hi")
+        
+        assert console.output.getvalue().splitlines()[-3:] == [
+            "Rate limited; try again in 2s",
+            "Error: Server is not running",
+            "Error: Could not connect to server API. Is the container running?",
+        ]
+    
+    def test_follow_prints_output_and_resumes(self, console):
+        first = FakeResponse(lines=[
+            "id: 7", 'data: {"seq": 7, "timestamp": "t", "line": "Player connected: Steve"}', "",
+            "event: dropped", 'data: {"dropped": 2}', "",
+        ])
+        console.stream_session.get.side_effect = [first, FakeResponse()]
+        with patch.object(console._stop, "wait", side_effect=[False, True]):
+            console.follow()
+        
+        calls = console.stream_session.get.call_args_list
+        assert calls[0].kwargs["params"] == {}
+        assert calls[1].kwargs["params"] == {"since": 7}
+        assert console.output.getvalue().splitlines() == ["Player connected: Steve", "[2 lines skipped]"]
+        assert console.last_seq == 7
+    
+    @patch('sys.argv', ['manage.py', 'console'])
+    def test_main_console_command(self):
+        with patch('manage.Console') as console_class:
+            manage.main()
+        
+        console_class.return_value.run.assert_called_once_with()
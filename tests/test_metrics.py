@@ -0,0 +1,91 @@
+import pytest
+
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from metrics import MetricsRegistry
+from proc_stats import read_process_stats
+
+
+class TestMetricsRegistry:
+    
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+    
+    def test_counter_with_labels(self, registry):
+        counter = registry.counter("requests_total", "Requests served", ("instance",))
+        counter.inc(instance="a")
+        counter.labels(instance="a").inc(2)
+        counter.inc(instance="b")
+        
+        text = registry.render()
+        
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{instance="a"} 3.0' in text
+        assert 'requests_total{instance="b"} 1.0' in text
+    
+    def test_gauge_set_and_clear(self, registry):
+        gauge = registry.gauge("depth", "Queue depth")
+        gauge.set(7)
+        assert "depth 7" in registry.render()
+        
+        gauge.clear()
+        assert "depth 7" not in registry.render()
+    
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+        
+        lines = registry.render().splitlines()
+        
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_count 4" in lines
+        assert "latency_seconds_sum 6.05" in lines
+    
+    def test_label_values_are_escaped(self, registry):
+        counter = registry.counter("events_total", "Events", ("name",))
+        counter.inc(name='say "hi"\n')
+        
+        assert 'events_total{name="say \\"hi\\"\\n"} 1.0' in registry.render()
+    
+    def test_collectors_run_on_render(self, registry):
+        gauge = registry.gauge("players", "Players online")
+        registry.on_collect(lambda: gauge.set(3))
+        
+        assert "players 3" in registry.render()
+
+
+class TestProcStats:
+    
+    @pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="requires /proc")
+    def test_current_process(self):
+        stats = read_process_stats(os.getpid())
+        
+        assert stats["threads"] >= 1
+        assert stats["rss_bytes"] > 0
+        assert stats["cpu_seconds"] >= 0
+        assert stats["open_fds"] > 0
+    
+    def test_missing_process(self, tmp_path):
+        assert read_process_stats(12345, proc=str(tmp_path)) is None
+    
+    def test_command_name_with_spaces(self, tmp_path):
+        (tmp_path / "42").mkdir()
+        fields = ["S"] + ["0"] * 50
+        fields[11], fields[12] = "150", "50"   # utime, stime
+        fields[17] = "8"                        # num_threads
+        fields[21] = "10"                       # rss pages
+        (tmp_path / "42" / "stat").write_text(f"42 (bedrock server) {' '.join(fields)}\n")
+        
+        stats = read_process_stats(42, proc=str(tmp_path))
+        
+        assert stats["threads"] == 8
+        assert stats["cpu_seconds"] == pytest.approx(200 / os.sysconf("SC_CLK_TCK"))
+        assert stats["rss_bytes"] == 10 * os.sysconf("SC_PAGE_SIZE")
+        assert stats["open_fds"] is None
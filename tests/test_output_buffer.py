@@ -0,0 +1,81 @@
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from output_buffer import OutputBuffer
+
+
+class TestOutputBuffer:
+    
+    @pytest.fixture
+    def buffer(self):
+        return OutputBuffer(capacity=5)
+    
+    def test_empty(self, buffer):
+        result = buffer.read()
+        
+        assert result == {
+            "lines": [], "next": 0, "first_seq": 1, "last_seq": 0, "truncated": False
+        }
+    
+    def test_append_returns_sequence(self, buffer):
+        assert buffer.append("first") == 1
+        assert buffer.append("second") == 2
+        assert buffer.last_seq == 2
+    
+    def test_read_tail_without_cursor(self, buffer):
+        for i in range(4):
+            buffer.append(f"line {i}")
+        
+        result = buffer.read(limit=2)
+        
+        assert [l["line"] for l in result["lines"]] == ["line 2", "line 3"]
+        assert result["next"] == 4
+    
+    def test_incremental_reads(self, buffer):
+        buffer.append("a")
+        buffer.append("b")
+        first = buffer.read(since=0)
+        assert [l["seq"] for l in first["lines"]] == [1, 2]
+        
+        buffer.append("c")
+        second = buffer.read(since=first["next"])
+        assert [l["line"] for l in second["lines"]] == ["c"]
+        
+        third = buffer.read(since=second["next"])
+        assert third["lines"] == []
+        assert third["next"] == 3
+    
+    def test_limit_pages_forward(self, buffer):
+        for i in range(5):
+            buffer.append(str(i))
+        
+        page = buffer.read(since=0, limit=2)
+        assert [l["line"] for l in page["lines"]] == ["0", "1"]
+        page = buffer.read(since=page["next"], limit=2)
+        assert [l["line"] for l in page["lines"]] == ["2", "3"]
+    
+    def test_capacity_is_bounded(self, buffer):
+        for i in range(12):
+            buffer.append(str(i))
+        
+        result = buffer.read(since=0, limit=100)
+        
+        assert len(buffer._slots) == 5
+        assert [l["line"] for l in result["lines"]] == ["7", "8", "9", "10", "11"]
+        assert result["first_seq"] == 8
+        assert result["truncated"] is True
+    
+    def test_cursor_ahead_of_buffer_restarts(self, buffer):
+        buffer.append("only")
+        
+        result = buffer.read(since=500)
+        
+        assert [l["line"] for l in result["lines"]] == ["only"]
+        assert result["truncated"] is False
+    
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            OutputBuffer(capacity=0)
@@ -0,0 +1,165 @@
+import shutil
+import zipfile
+from concurrent.futures import Future
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pack_build
+from pack_build import CACHE_NAME, OPTIMIZED_DIR, PackBuilder, main
+
+
+@pytest.fixture
+def addons(tmp_path):
+    addons = tmp_path / "addons"
+    for pack_type, name in [("behavior_packs", "tools"), ("behavior_packs", "blasters"),
+                            ("resource_packs", "blaster_resources")]:
+        pack = addons / pack_type / name
+        (pack / "items").mkdir(parents=True)
+        (pack / "manifest.json").write_text(f'{{"header": {{"name": "{name}"}}}}')
+        (pack / "items" / "item.json").write_text('{"damage": 1}')
+        (pack / ".DS_Store").write_text("junk")
+    return addons
+
+
+class TestPackBuild:
+    
+    def test_builds_packs_and_bundle(self, addons, tmp_path):
+        out = tmp_path / "dist"
+        result = PackBuilder(addons, out, jobs=1).build()
+        
+        assert result["built"] == 3
+        assert result["bundle"] is True
+        with zipfile.ZipFile(out / "tools.bp.mcpack") as archive:
+            assert archive.namelist() == ["items/item.json", "manifest.json"]
+            assert archive.read("items/item.json") == b'{"damage":1}'
+        with zipfile.ZipFile(out / "addons.mcaddon") as archive:
+            assert archive.namelist() == ["blaster_resources.rp.mcpack", "blasters.bp.mcpack", "tools.bp.mcpack"]
+    
+    def test_archives_are_deterministic(self, addons, tmp_path):
+        PackBuilder(addons, tmp_path / "a", jobs=1).build()
+        for path in addons.rglob("*.json"):
+            path.touch()
+        PackBuilder(addons, tmp_path / "b", jobs=2).build()
+        
+        for name in ["tools.bp.mcpack", "blasters.bp.mcpack", "blaster_resources.rp.mcpack", "addons.mcaddon"]:
+            assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+    
+    def test_only_changed_packs_are_rebuilt(self, addons, tmp_path, monkeypatch):
+        out = tmp_path / "dist"
+        builder = PackBuilder(addons, out, jobs=1)
+        builder.build()
+        
+        hashed = []
+        original = pack_build.file_hash
+        monkeypatch.setattr(pack_build, "file_hash", lambda path: hashed.append(path.name) or original(path))
+        
+        result = builder.build()
+        assert result["built"] == 0
+        assert result["bundle"] is False
+        assert hashed == []
+        
+        (addons / "behavior_packs" / "tools" / "items" / "item.json").write_text('{"damage": 20}')
+        result = builder.build()
+        
+        assert result["built"] == 1
+        assert result["packs"]["behavior_packs/tools"]["built"] is True
+        assert result["packs"]["behavior_packs/blasters"]["built"] is False
+        assert result["bundle"] is True
+        assert hashed == ["item.json"]
+    
+    def test_touch_without_change_is_not_rebuilt(self, addons, tmp_path):
+        builder = PackBuilder(addons, tmp_path / "dist", jobs=1)
+        builder.build()
+        (addons / "behavior_packs" / "tools" / "manifest.json").touch()
+        
+        assert builder.build()["built"] == 0
+    
+    def test_missing_archive_and_removed_pack(self, addons, tmp_path):
+        out = tmp_path / "dist"
+        builder = PackBuilder(addons, out, jobs=1)
+        builder.build()
+        (out / "blasters.bp.mcpack").unlink()
+        
+        assert builder.build()["packs"]["behavior_packs/blasters"]["built"] is True
+        
+        shutil.rmtree(addons / "behavior_packs" / "tools")
+        builder.build()
+        
+        assert not (out / "tools.bp.mcpack").exists()
+        with zipfile.ZipFile(out / "addons.mcaddon") as archive:
+            assert "tools.bp.mcpack" not in archive.namelist()
+    
+    def test_same_named_behavior_and_resource_packs(self, addons, tmp_path):
+        shutil.copytree(addons / "behavior_packs" / "blasters", addons / "resource_packs" / "blasters")
+        out = tmp_path / "dist"
+        # An archive named by an older build is cleaned up
+        out.mkdir()
+        (out / "blasters.mcpack").write_bytes(b"old")
+        
+        result = PackBuilder(addons, out, jobs=1).build()
+        
+        assert result["built"] == 4
+        assert sorted(path.name for path in out.glob("*.mcpack")) == [
+            "blaster_resources.rp.mcpack", "blasters.bp.mcpack", "blasters.rp.mcpack", "tools.bp.mcpack"
+        ]
+    
+    def test_cli(self, addons, tmp_path, capsys):
+        out = tmp_path / "dist"
+        assert main(["--addons", str(addons), "--out", str(out), "--jobs", "2"]) == 0
+        assert "3 packs, 3 rebuilt, 9 bytes saved, bundle rebuilt" in capsys.readouterr().out
+        assert (out / CACHE_NAME).exists()
+        
+        assert main(["--addons", str(addons), "--out", str(out)]) == 0
+        assert "3 packs, 0 rebuilt, 9 bytes saved in" in capsys.readouterr().out
+        
+        assert main(["--addons", str(addons), "--out", str(out), "--no-optimize"]) == 0
+        assert "3 packs, 3 rebuilt, 0 bytes saved, bundle rebuilt" in capsys.readouterr().out
+    
+    def test_optimized_files_are_cached_by_content(self, addons, tmp_path, monkeypatch):
+        out = tmp_path / "dist"
+        PackBuilder(addons, out, jobs=1).build()
+        
+        optimized = []
+        original = pack_build.optimize
+        monkeypatch.setattr(pack_build, "optimize", lambda name, data: optimized.append(name) or original(name, data))
+        
+        result = PackBuilder(addons, out, jobs=1).build(force=True)
+        assert result["built"] == 3
+        assert optimized == []
+        
+        (addons / "behavior_packs" / "tools" / "items" / "item.json").write_text('{"damage": 5}')
+        PackBuilder(addons, out, jobs=1).build()
+        assert optimized == ["items/item.json"]
+        cached = list((out / OPTIMIZED_DIR).rglob("*.json"))
+        assert len(cached) == 5
+    
+    def test_files_are_optimized_one_job_each(self, addons, tmp_path, monkeypatch):
+        submitted = []
+        
+        class RecordingPool:
+            def __init__(self, max_workers):
+                self.max_workers = max_workers
+            
+            def submit(self, func, *args):
+                submitted.append((func.__name__, args[1]))
+                future = Future()
+                future.set_result(func(*args))
+                return future
+            
+            def shutdown(self):
+                pass
+        
+        monkeypatch.setattr(pack_build, "ProcessPoolExecutor", RecordingPool)
+        pack = addons / "resource_packs" / "blaster_resources" / "items"
+        for i in range(3):
+            (pack / f"extra{i}.json").write_text(f'{{"id": {i}}}')
+        shutil.rmtree(addons / "behavior_packs")
+        
+        PackBuilder(addons, tmp_path / "dist", jobs=4).build()
+        
+        optimized = sorted(rel for func, rel in submitted if func == "optimize_file")
+        assert optimized == ["items/extra0.json", "items/extra1.json", "items/extra2.json",
+                             "items/item.json", "manifest.json"]
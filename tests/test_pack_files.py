@@ -0,0 +1,43 @@
+import json
+import threading
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pack_files import file_hash, strip_comments, write_json
+
+
+class TestPackFiles:
+    
+    def test_strip_comments_keeps_strings(self):
+        text = '{"url": "http://example.com", // note\n "a": /* inline */ 1}'
+        
+        assert json.loads(strip_comments(text)) == {"url": "http://example.com", "a": 1}
+    
+    def test_file_hash(self, tmp_path):
+        path = tmp_path / "data.bin"
+        path.write_bytes(b"abc")
+        
+        assert file_hash(path) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    
+    def test_concurrent_writes_do_not_collide(self, tmp_path):
+        path = tmp_path / "cache.json"
+        errors = []
+        
+        def write(n):
+            try:
+                for i in range(50):
+                    write_json(path, {"writer": n, "i": i})
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert json.loads(path.read_text())["i"] == 49
+        assert [p.name for p in tmp_path.iterdir()] == ["cache.json"]
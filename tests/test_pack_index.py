@@ -0,0 +1,295 @@
+import json
+import threading
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pack_index
+from pack_index import (
+    ManifestError, PackIndex, check_packs, find_conflicts, main, order_by_dependencies,
+    read_manifest, registration_files, who_defines
+)
+
+
+def write_pack(addons, directory, name, uuid, version=(1, 0, 0), module_type="data", suffix="",
+               dependencies=()):
+    pack = addons / directory / name
+    pack.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "format_version": 2,
+        "header": {"name": name, "uuid": uuid, "version": list(version)},
+        "modules": [{"type": module_type, "uuid": f"{uuid}-module", "version": list(version)}],
+        "dependencies": [{"uuid": dep, "version": [1, 0, 0]} for dep in dependencies],
+    }
+    (pack / "manifest.json").write_text(json.dumps(manifest, indent=2) + suffix)
+    return pack
+
+
+@pytest.fixture
+def root(tmp_path):
+    addons = tmp_path / "addons"
+    write_pack(addons, "behavior_packs", "tools", "aaaa", (1, 0, 0), suffix="\nEOF < /dev/null")
+    write_pack(addons, "behavior_packs", "blasters", "bbbb", (1, 2, 0))
+    write_pack(addons, "resource_packs", "blaster_resources", "cccc", (1, 2, 0), "resources")
+    return tmp_path
+
+
+class TestManifest:
+    
+    def test_tolerates_trailing_junk_and_bom(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text('﻿{"header": {"uuid": "x", "version": [1, 0, 0]}}\nEOF < /dev/null',
+                        encoding="utf-8")
+        
+        assert read_manifest(path)["header"]["uuid"] == "x"
+    
+    def test_rejects_invalid_manifests(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text("{not json")
+        with pytest.raises(ManifestError):
+            read_manifest(path)
+        
+        path.write_text('{"header": {"name": "no uuid"}}')
+        with pytest.raises(ManifestError):
+            read_manifest(path)
+
+
+class TestPackIndex:
+    
+    def test_scan(self, root):
+        packs = PackIndex(root / "addons").scan()
+        
+        assert [(p["path"], p["uuid"], p["version"]) for p in packs] == [
+            ("behavior_packs/blasters", "bbbb", [1, 2, 0]),
+            ("behavior_packs/tools", "aaaa", [1, 0, 0]),
+            ("resource_packs/blaster_resources", "cccc", [1, 2, 0]),
+        ]
+    
+    def test_rescan_only_parses_changed_manifests(self, root, monkeypatch):
+        PackIndex(root / "addons").scan()
+        write_pack(root / "addons", "behavior_packs", "tools", "aaaa", (1, 1, 0))
+        parsed = []
+        original = pack_index.read_manifest
+        monkeypatch.setattr(pack_index, "read_manifest", lambda path: parsed.append(path) or original(path))
+        
+        index = PackIndex(root / "addons")
+        packs = index.scan()
+        
+        assert parsed == [root / "addons" / "behavior_packs" / "tools" / "manifest.json"]
+        assert index.parsed == 1
+        assert packs[1]["version"] == [1, 1, 0]
+    
+    def test_reports_broken_packs(self, root):
+        (root / "addons" / "behavior_packs" / "empty").mkdir()
+        
+        index = PackIndex(root / "addons")
+        packs = index.scan()
+        
+        assert len(packs) == 3
+        assert index.errors == ["behavior_packs/empty: no manifest.json"]
+    
+    def test_check_packs(self, root):
+        write_pack(root / "addons", "resource_packs", "wrong", "aaaa", module_type="data")
+        
+        problems = check_packs(PackIndex(root / "addons").scan())
+        
+        assert "resource_packs/wrong: uuid aaaa is also used by behavior_packs/tools" in problems
+        assert "resource_packs/wrong: module type 'data' in a resource pack" in problems
+    
+    def test_registration_files(self, root):
+        files = registration_files(PackIndex(root / "addons").scan())
+        
+        assert files["valid_known_packs.json"][0] == {
+            "file_system": "RawPath", "path": "behavior_packs/blasters",
+            "uuid": "bbbb", "version": "1.2.0"
+        }
+        assert files["world_configs/world_resource_packs.json"] == [
+            {"pack_id": "cccc", "version": [1, 2, 0]}
+        ]
+
+    
+    def test_missing_dependency(self, root):
+        write_pack(root / "addons", "behavior_packs", "addon", "dddd", dependencies=["eeee"])
+        
+        assert check_packs(PackIndex(root / "addons").scan()) == [
+            "behavior_packs/addon: depends on eeee, which no pack in addons/ provides"
+        ]
+
+
+def define(pack, rel, key, identifier):
+    path = pack / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "format_version": "1.20.20",
+        key: {"description": {"identifier": identifier}, "components": {}},
+    }, indent=2))
+
+
+@pytest.fixture
+def defined(root):
+    addons = root / "addons"
+    define(addons / "behavior_packs" / "tools", "items/iron_pickaxe.json", "minecraft:item", "minecraft:iron_pickaxe")
+    define(addons / "behavior_packs" / "tools", "items/laser.json", "minecraft:item", "dane:laser")
+    define(addons / "behavior_packs" / "blasters", "items/laser.json", "minecraft:item", "dane:laser")
+    define(addons / "behavior_packs" / "blasters", "entities/bolt.json", "minecraft:entity", "dane:bolt")
+    define(addons / "resource_packs" / "blaster_resources", "entity/bolt.json", "minecraft:client_entity", "dane:bolt")
+    (addons / "resource_packs" / "blaster_resources" / "textures").mkdir()
+    (addons / "resource_packs" / "blaster_resources" / "textures" / "item_texture.json").write_text(
+        '{"texture_data": {"laser": {"textures": "textures/items/laser"}}}'
+    )
+    return root
+
+
+class TestDefinitions:
+    
+    def test_index(self, defined):
+        index = PackIndex(defined / "addons")
+        index.scan()
+        
+        assert sorted((d["identifier"], d["kind"], d["pack"], d["file"]) for d in index.definitions) == [
+            ("dane:bolt", "client_entity", "resource_packs/blaster_resources", "entity/bolt.json"),
+            ("dane:bolt", "entity", "behavior_packs/blasters", "entities/bolt.json"),
+            ("dane:laser", "item", "behavior_packs/blasters", "items/laser.json"),
+            ("dane:laser", "item", "behavior_packs/tools", "items/laser.json"),
+            ("laser", "item_texture", "resource_packs/blaster_resources", "textures/item_texture.json"),
+            ("minecraft:iron_pickaxe", "item", "behavior_packs/tools", "items/iron_pickaxe.json"),
+        ]
+    
+    def test_rescan_only_parses_changed_files(self, defined):
+        PackIndex(defined / "addons").scan()
+        define(defined / "addons" / "behavior_packs" / "tools", "items/laser.json", "minecraft:item", "dane:tool_laser")
+        
+        index = PackIndex(defined / "addons")
+        index.scan()
+        
+        assert index.parsed == 1
+        assert [d["pack"] for d in index.definitions if d["identifier"] == "dane:laser"] == ["behavior_packs/blasters"]
+    
+    def test_in_memory_index_writes_nothing(self, defined):
+        index = PackIndex(defined / "addons", persist=False)
+        index.scan()
+        define(defined / "addons" / "behavior_packs" / "tools", "items/laser.json", "minecraft:item", "dane:tool_laser")
+        index.scan()
+        
+        assert index.parsed == 1
+        assert not (defined / "addons" / pack_index.CACHE_NAME).exists()
+    
+    def test_concurrent_scans_see_whole_results(self, defined):
+        index = PackIndex(defined / "addons")
+        results = []
+        
+        def scan():
+            for _ in range(20):
+                index.scan()
+                results.append(len(index.definitions))
+        
+        threads = [threading.Thread(target=scan) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results == [6] * 80
+        assert not list((defined / "addons").glob(".*.tmp"))
+    
+    def test_conflicts_and_who(self, defined):
+        index = PackIndex(defined / "addons")
+        index.scan()
+        priority = ["behavior_packs/tools", "behavior_packs/blasters"]
+        
+        conflicts = find_conflicts(index.definitions, priority)
+        
+        assert [(c["identifier"], c["packs"], c["overrides_vanilla"]) for c in conflicts] == [
+            ("dane:laser", ["behavior_packs/tools", "behavior_packs/blasters"], False),
+            ("minecraft:iron_pickaxe", ["behavior_packs/tools"], True),
+        ]
+        assert [group["kind"] for group in who_defines(index.definitions, "dane:bolt", priority)] == [
+            "client_entity", "entity"
+        ]
+        assert who_defines(index.definitions, "dane:nothing", priority) == []
+
+
+class TestDependencyOrder:
+    
+    def pack(self, uuid, *dependencies):
+        return {"uuid": uuid, "dependencies": [{"uuid": dep} for dep in dependencies]}
+    
+    def test_dependents_come_first(self):
+        packs = [self.pack("base"), self.pack("addon", "base"), self.pack("other")]
+        entries = [{"pack_id": "base"}, {"pack_id": "other"}, {"pack_id": "addon"}]
+        
+        ordered, problems = order_by_dependencies(entries, packs)
+        
+        assert [entry["pack_id"] for entry in ordered] == ["other", "addon", "base"]
+        assert problems == []
+    
+    def test_cycle(self):
+        packs = [self.pack("a", "b"), self.pack("b", "a")]
+        
+        ordered, problems = order_by_dependencies([{"pack_id": "a"}, {"pack_id": "b"}], packs)
+        
+        assert [entry["pack_id"] for entry in ordered] == ["a", "b"]
+        assert problems == ["dependency cycle between packs a, b"]
+
+
+class TestMain:
+    
+    def test_writes_then_reports_clean(self, root, capsys):
+        assert main(["--root", str(root)]) == 0
+        assert main(["--root", str(root), "--check"]) == 0
+        
+        behavior = json.loads((root / "world_configs" / "world_behavior_packs.json").read_text())
+        assert [entry["pack_id"] for entry in behavior] == ["bbbb", "aaaa"]
+        assert "0 files out of date" in capsys.readouterr().out.splitlines()[-1]
+    
+    def test_check_reports_drift_and_keeps_order(self, root, capsys):
+        main(["--root", str(root)])
+        valid = root / "valid_known_packs.json"
+        entries = json.loads(valid.read_text())
+        entries.reverse()
+        entries[0]["version"] = "0.9.0"
+        entries.append({"file_system": "RawPath", "path": "behavior_packs/gone", "uuid": "dddd", "version": "1.0.0"})
+        valid.write_text(json.dumps(entries, indent=4) + "\n")
+        capsys.readouterr()
+        
+        assert main(["--root", str(root), "--check"]) == 1
+        out = capsys.readouterr().out
+        assert "resource_packs/blaster_resources is" in out
+        assert "behavior_packs/gone has no matching pack" in out
+        
+        main(["--root", str(root)])
+        paths = [entry["path"] for entry in json.loads(valid.read_text())]
+        assert paths == ["resource_packs/blaster_resources", "behavior_packs/tools", "behavior_packs/blasters"]
+    
+    def test_orders_world_list_by_dependencies(self, root, capsys):
+        write_pack(root / "addons", "behavior_packs", "blasters", "bbbb", (1, 2, 0), dependencies=["aaaa"])
+        main(["--root", str(root)])
+        behavior = root / "world_configs" / "world_behavior_packs.json"
+        
+        assert [entry["pack_id"] for entry in json.loads(behavior.read_text())] == ["bbbb", "aaaa"]
+        
+        behavior.write_text(json.dumps([{"pack_id": "aaaa", "version": [1, 0, 0]},
+                                        {"pack_id": "bbbb", "version": [1, 2, 0]}]))
+        capsys.readouterr()
+        assert main(["--root", str(root), "--check"]) == 1
+        assert "packs must be listed ahead of the packs they depend on" in capsys.readouterr().out
+    
+    def test_who_and_conflicts(self, defined, capsys):
+        assert main(["--root", str(defined), "--who", "dane:laser"]) == 0
+        assert capsys.readouterr().out == (
+            "dane:laser (item): behavior_packs/blasters (items/laser.json), behavior_packs/tools (items/laser.json)\n"
+        )
+        assert main(["--root", str(defined), "--who", "dane:nothing"]) == 1
+        capsys.readouterr()
+        
+        assert main(["--root", str(defined), "--conflicts"]) == 0
+        out = capsys.readouterr().out
+        assert "minecraft:iron_pickaxe (item, overrides vanilla): behavior_packs/tools (items/iron_pickaxe.json)" in out
+        assert out.endswith("2 conflicts; where several packs are listed, the first one wins\n")
+    
+    def test_repository_registration_is_up_to_date(self, tmp_path):
+        repo = Path(__file__).parent.parent
+        
+        assert main(["--root", str(repo), "--cache", str(tmp_path / "cache.json"), "--check"]) == 0
@@ -0,0 +1,106 @@
+import struct
+import zlib
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pack_optimize
+from pack_optimize import PNG_SIGNATURE, PNGError, _chunks, minify_json, optimize, optimize_png, unfilter
+
+TEXTURES = Path(__file__).parent.parent / "addons" / "resource_packs" / "blaster_resources" / "textures"
+
+
+def chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def make_png(width, height, color_type=6, depth=8, extra=()):
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    stride = (width * channels * depth + 7) // 8
+    raw = b"".join(bytes([0]) + bytes((x * 7 + y * 13) % 256 for x in range(stride)) for y in range(height))
+    ihdr = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, 0)
+    # Poorly compressed, split across two IDAT chunks, with metadata chunks around them
+    idat = zlib.compress(raw, 0)
+    return PNG_SIGNATURE + b"".join([
+        chunk(b"IHDR", ihdr),
+        chunk(b"tEXt", b"Comment\x00made by a test"),
+        *extra,
+        chunk(b"IDAT", idat[:10]),
+        chunk(b"IDAT", idat[10:]),
+        chunk(b"tIME", b"\x07\xe9\x01\x01\x00\x00\x00"),
+        chunk(b"IEND", b""),
+    ])
+
+
+def pixels(data):
+    chunks = _chunks(data)
+    width, height, depth, color_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[0][1])
+    bits = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type] * depth
+    raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    return [bytes(row) for row in unfilter(raw, height, (width * bits + 7) // 8, max(1, bits // 8))]
+
+
+class TestPNG:
+    
+    def test_lossless_and_smaller(self):
+        original = make_png(32, 32)
+        optimized = optimize_png(original)
+        
+        assert len(optimized) < len(original)
+        assert pixels(optimized) == pixels(original)
+        assert [kind for kind, _ in _chunks(optimized)] == [b"IHDR", b"IDAT", b"IEND"]
+    
+    def test_keeps_palette_and_transparency(self):
+        extra = [chunk(b"PLTE", bytes(range(48))), chunk(b"tRNS", b"\x00\x80")]
+        original = make_png(16, 16, color_type=3, depth=4, extra=extra)
+        optimized = optimize_png(original)
+        
+        assert [kind for kind, _ in _chunks(optimized)] == [b"IHDR", b"PLTE", b"tRNS", b"IDAT", b"IEND"]
+        assert pixels(optimized) == pixels(original)
+    
+    def test_large_images_keep_their_filters(self, monkeypatch):
+        original = make_png(64, 64)
+        monkeypatch.setattr(pack_optimize, "REFILTER_MAX_BYTES", 1024)
+        monkeypatch.setattr(pack_optimize, "unfilter", lambda *args: pytest.fail("re-filtered a large image"))
+        optimized = optimize_png(original)
+        
+        assert len(optimized) < len(original)
+        assert pixels(optimized) == pixels(original)
+    
+    @pytest.mark.parametrize("name", ["items/blaster.png", "items/blaster_bolt.png", "entity/blaster_bolt.png"])
+    def test_repository_textures(self, name):
+        original = (TEXTURES / name).read_bytes()
+        optimized = optimize_png(original)
+        
+        assert len(optimized) < len(original)
+        assert pixels(optimized) == pixels(original)
+    
+    def test_invalid_pngs(self):
+        with pytest.raises(PNGError):
+            optimize_png(b"not a png")
+        corrupt = bytearray(make_png(4, 4))
+        corrupt[20] ^= 0xFF
+        with pytest.raises(PNGError):
+            optimize_png(bytes(corrupt))
+        
+        assert optimize("broken.png", bytes(corrupt)) == bytes(corrupt)
+
+
+class TestJSON:
+    
+    def test_minifies(self):
+        data = b'{\n    "format_version": "1.10.0",\n    "name": "caf\xc3\xa9"\n}\n'
+        assert minify_json(data) == '{"format_version":"1.10.0","name":"café"}'.encode()
+    
+    def test_comments_and_trailing_junk(self):
+        data = b'// header\n{\n  "url": "http://x", /* inline */ "n": [1, 2]\n}\nEOF < /dev/null'
+        assert minify_json(data) == b'{"url":"http://x","n":[1,2]}'
+    
+    def test_unparseable_is_unchanged(self):
+        assert minify_json(b'{"broken": ') == b'{"broken": '
+        assert optimize("items/sword.json", b"\xff\xfe") == b"\xff\xfe"
+    
+    def test_other_files_are_unchanged(self):
+        assert optimize("texts/en_US.lang", b"item.name=Blaster  \n") == b"item.name=Blaster  \n"
@@ -0,0 +1,228 @@
+import json
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pack_validate
+from pack_validate import PackValidator, main, molang_error, validate_file
+
+REPO_ADDONS = Path(__file__).parent.parent / "addons"
+
+
+def write(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(value if isinstance(value, str) else json.dumps(value, indent=2))
+
+
+def item(identifier, icon=None, **components):
+    if icon:
+        components["minecraft:icon"] = {"texture": icon}
+    return {
+        "format_version": "1.20.20",
+        "minecraft:item": {"description": {"identifier": identifier}, "components": components},
+    }
+
+
+def manifest(uuid, module_type):
+    return {
+        "format_version": 2,
+        "header": {"name": "pack", "uuid": uuid, "version": [1, 0, 0]},
+        "modules": [{"type": module_type, "uuid": uuid[:-1] + "f", "version": [1, 0, 0]}],
+    }
+
+
+@pytest.fixture
+def addons(tmp_path):
+    addons = tmp_path / "addons"
+    bp = addons / "behavior_packs" / "blasters"
+    rp = addons / "resource_packs" / "blaster_resources"
+    write(bp / "manifest.json", manifest("11111111-1111-1111-1111-111111111111", "data"))
+    write(bp / "items" / "blaster.json", item("dane:blaster", icon="blaster", **{
+        "minecraft:shooter": {"ammunition": [{"item": "dane:bolt"}]},
+    }))
+    write(bp / "items" / "bolt.json", item("dane:bolt", icon="bolt", **{
+        "minecraft:projectile": {"projectile_entity": "dane:bolt"},
+    }))
+    write(bp / "entities" / "bolt.json", {
+        "format_version": "1.21.40",
+        "minecraft:entity": {"description": {"identifier": "dane:bolt"}, "components": {}},
+    })
+    write(rp / "manifest.json", manifest("22222222-2222-2222-2222-222222222222", "resources"))
+    write(rp / "entity" / "bolt.json", {
+        "format_version": "1.10.0",
+        "minecraft:client_entity": {"description": {"identifier": "dane:bolt"}},
+    })
+    write(rp / "textures" / "item_texture.json", {
+        "texture_name": "atlas.items",
+        "texture_data": {
+            "blaster": {"textures": "textures/items/blaster"},
+            "bolt": {"textures": "textures/items/bolt"},
+        },
+    })
+    (rp / "textures" / "items").mkdir(parents=True)
+    (rp / "textures" / "items" / "blaster.png").write_bytes(b"png")
+    (rp / "textures" / "items" / "bolt.png").write_bytes(b"png")
+    return addons
+
+
+def messages(result):
+    return sorted((p["file"].split("/", 2)[2], p["message"]) for p in result["problems"])
+
+
+class TestMolang:
+    
+    @pytest.mark.parametrize("expression", [
+        "context.other->q.remaining_durability + 0.05 * context.other->q.max_durability",
+        "q.any_tag('stone', 'metal', 'diamond_pick_diggable')",
+        "math.random(0, 1) > 0.5 ? 1 : 0",
+        "v.x = 1; return v.x;",
+        "loop(10, {v.x = v.x + 1;});",
+        "q.is_sneaking && !q.is_moving",
+    ])
+    def test_valid(self, expression):
+        assert molang_error(expression) is None
+    
+    @pytest.mark.parametrize("expression,error", [
+        ("query.max_durability * ", "expression ends with '*'"),
+        ("q.any_tag('stone)", "unterminated string"),
+        ("(q.health + 1", "unclosed '('"),
+        ("q.health + 1)", "unbalanced ')'"),
+        ("q.health q.max_health", "missing operator before 'q.max_health'"),
+        ("q.clamp(1,,2)", "missing operand before ','"),
+        ("querry.health > 1", "unknown namespace in 'querry.health'"),
+    ])
+    def test_invalid(self, expression, error):
+        assert molang_error(expression) == error
+
+
+class TestValidateFile:
+    
+    def test_item_rules(self):
+        data = json.dumps({
+            "format_version": "1.10",
+            "minecraft:item": {
+                "description": {"identifier": "dane:Blaster"},
+                "components": {},
+            },
+        }).encode()
+        
+        problems = validate_file("item", "behavior", data)["problems"]
+        
+        assert problems == [("error", "identifier 'dane:Blaster' is not namespace:name in lower case")]
+    
+    def test_legacy_format_for_custom_item(self):
+        data = json.dumps(item("dane:blaster") | {"format_version": "1.10.0"}).encode()
+        
+        assert validate_file("item", "behavior", data)["problems"] == [
+            ("warning", "custom item uses format_version 1.10.0; custom items need 1.16.100 or later")
+        ]
+    
+    def test_molang_in_strings(self):
+        data = json.dumps(item("minecraft:bow", **{
+            "minecraft:repairable": {"repair_items": [{"items": ["minecraft:string"], "repair_amount": "query.max_durability *"}]},
+        })).encode()
+        
+        problems = validate_file("item", "behavior", data)["problems"]
+        
+        assert problems == [("error", "minecraft:item/components/minecraft:repairable/repair_items[0]/repair_amount: "
+                                      "invalid Molang (expression ends with '*'): query.max_durability *")]
+    
+    def test_json_problems(self):
+        assert validate_file("json", "behavior", b"{broken")["problems"][0][1].startswith("invalid JSON")
+        assert validate_file("json", "behavior", b'// comment\n{"a": 1}')["problems"] == []
+        assert validate_file("manifest", "behavior", b'{"format_version": 2}\nEOF < /dev/null')["problems"] == [
+            ("warning", "content after the end of the JSON value"),
+            ("error", "manifest has no header"),
+        ]
+    
+    def test_manifest_module_type(self):
+        data = json.dumps(manifest("33333333-3333-3333-3333-333333333333", "resources")).encode()
+        
+        assert validate_file("manifest", "behavior", data)["problems"] == [
+            ("error", "module type 'resources' does not belong in a behavior pack")
+        ]
+
+
+class TestPackValidator:
+    
+    def test_clean_tree(self, addons):
+        result = PackValidator(addons, jobs=1).validate()
+        
+        assert result["packs"] == 2
+        assert result["files"] == 7
+        assert result["problems"] == []
+    
+    def test_cross_references(self, addons):
+        bp = addons / "behavior_packs" / "blasters"
+        write(bp / "items" / "blaster.json", item("dane:blaster", icon="blastr", **{
+            "minecraft:shooter": {"ammunition": [{"item": "dane:missing_bolt"}]},
+        }))
+        (bp / "entities" / "bolt.json").unlink()
+        (addons / "resource_packs" / "blaster_resources" / "textures" / "items" / "bolt.png").unlink()
+        write(addons / "resource_packs" / "copy" / "manifest.json",
+              manifest("22222222-2222-2222-2222-222222222222", "resources"))
+        
+        result = PackValidator(addons, jobs=1).validate()
+        
+        assert messages(result) == [
+            ("entity/bolt.json", "client entity dane:bolt has no behavior pack entity"),
+            ("items/blaster.json", "ammunition dane:missing_bolt is not defined by any behavior pack"),
+            ("items/blaster.json", "icon texture 'blastr' is not in any resource pack's item_texture.json"),
+            ("items/bolt.json", "projectile entity dane:bolt is not defined by any behavior pack"),
+            ("manifest.json", "pack uuid 22222222-2222-2222-2222-222222222222 is also used by "
+                              "resource_packs/blaster_resources/manifest.json"),
+            ("textures/item_texture.json", "texture 'bolt': textures/items/bolt is not in this pack "
+                                           "(fine only if it is a vanilla texture)"),
+        ]
+        assert result["errors"] == 4
+        assert result["warnings"] == 2
+    
+    def test_cached_results(self, addons, monkeypatch):
+        validator = PackValidator(addons, jobs=1)
+        assert validator.validate()["validated"] == 7
+        
+        calls = []
+        original = pack_validate.validate_file
+        monkeypatch.setattr(pack_validate, "validate_file", lambda *args: calls.append(args) or original(*args))
+        
+        assert validator.validate()["validated"] == 0
+        
+        # Same content under a new name reuses the result; a real change does not
+        bolt = addons / "behavior_packs" / "blasters" / "items" / "bolt.json"
+        (bolt.parent / "bolt_copy.json").write_bytes(bolt.read_bytes())
+        bolt.write_text(bolt.read_text().replace('"1.20.20"', '"1.21.0"'))
+        result = validator.validate()
+        
+        assert result["validated"] == 1
+        assert len(calls) == 1
+    
+    def test_parallel(self, addons, monkeypatch):
+        monkeypatch.setattr(pack_validate, "PARALLEL_THRESHOLD", 2)
+        write(addons / "behavior_packs" / "blasters" / "items" / "broken.json", "{")
+        
+        contexts = []
+        original = pack_validate.ProcessPoolExecutor
+        monkeypatch.setattr(pack_validate, "ProcessPoolExecutor", lambda **kwargs: (
+            contexts.append(kwargs["mp_context"].get_start_method()) or original(**kwargs)
+        ))
+        
+        result = PackValidator(addons, jobs=2).validate()
+        
+        assert result["validated"] == 8
+        assert result["errors"] == 1
+        assert contexts == ["spawn"]
+    
+    def test_repository_addons(self, tmp_path):
+        result = PackValidator(REPO_ADDONS, cache_path=tmp_path / "cache.json", jobs=1).validate()
+        
+        assert result["errors"] == 0
+    
+    def test_cli(self, addons, capsys):
+        assert main(["--addons", str(addons)]) == 0
+        assert "2 packs, 7 files (7 validated): 0 errors, 0 warnings" in capsys.readouterr().out
+        
+        write(addons / "behavior_packs" / "blasters" / "items" / "broken.json", "{")
+        assert main(["--addons", str(addons)]) == 1
+        assert "  ! behavior_packs/blasters/items/broken.json: invalid JSON" in capsys.readouterr().out
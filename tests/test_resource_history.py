@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from proc_stats import read_process_sample
+from resource_history import ResourceHistory, ResourceSampler
+
+
+class TestResourceHistory:
+    
+    def test_window_returns_recent_samples_oldest_first(self):
+        history = ResourceHistory(capacity=10)
+        for t in range(5):
+            history.append(1000.0 + t, cpu_percent=t, threads=4)
+        
+        samples = history.window(2.5, now=1004.0)
+        
+        assert [s["cpu_percent"] for s in samples] == [2.0, 3.0, 4.0]
+        assert samples[0]["threads"] == 4.0
+    
+    def test_ring_keeps_latest_capacity_samples(self):
+        history = ResourceHistory(capacity=3)
+        for t in range(7):
+            history.append(1000.0 + t, cpu_percent=t)
+        
+        samples = history.window()
+        
+        assert len(history) == 3
+        assert [s["cpu_percent"] for s in samples] == [4.0, 5.0, 6.0]
+    
+    def test_missing_values_read_back_as_none(self):
+        history = ResourceHistory(capacity=2)
+        history.append(1000.0, cpu_percent=1.5)
+        
+        sample = history.window()[0]
+        
+        assert sample["cpu_percent"] == 1.5
+        assert sample["read_bytes_per_sec"] is None
+        assert sample["timestamp"].startswith("1970-01-01")
+    
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            ResourceHistory(capacity=0)
+
+
+class TestResourceSampler:
+    
+    def test_rates_between_samples(self):
+        rates = ResourceSampler._rates(
+            {"cpu_seconds": 1.0, "read_bytes": 0, "write_bytes": None, "rss_bytes": 1, "threads": 2},
+            {"cpu_seconds": 2.0, "read_bytes": 4096, "write_bytes": None, "rss_bytes": 5, "threads": 3},
+            elapsed=2.0
+        )
+        
+        assert rates == {
+            "cpu_percent": 50.0,
+            "rss_bytes": 5,
+            "read_bytes_per_sec": 2048.0,
+            "write_bytes_per_sec": None,
+            "threads": 3,
+        }
+    
+    @pytest.mark.asyncio
+    async def test_samples_until_process_exits(self):
+        readings = iter([
+            {"cpu_seconds": 0.0, "rss_bytes": 100, "threads": 1},
+            {"cpu_seconds": 0.1, "rss_bytes": 200, "threads": 2},
+            {"cpu_seconds": 0.2, "rss_bytes": 300, "threads": 2},
+        ])
+        sampler = ResourceSampler(
+            ResourceHistory(capacity=10), interval=0.01, reader=lambda pid: next(readings, None)
+        )
+        sampler.start(1234)
+        
+        await asyncio.wait_for(sampler._task, 2)
+        assert not sampler.running
+        assert [s["rss_bytes"] for s in sampler.history.window()] == [200.0, 300.0]
+    
+    @pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="requires /proc")
+    def test_read_process_sample_current_process(self):
+        sample = read_process_sample(os.getpid())
+        
+        assert sample["rss_bytes"] > 0
+        assert sample["peak_rss_bytes"] >= sample["rss_bytes"]
+        assert sample["threads"] >= 1
+    
+    def test_read_process_sample_without_io_access(self, tmp_path):
+        (tmp_path / "7").mkdir()
+        fields = ["S"] + ["0"] * 50
+        fields[17] = "3"
+        (tmp_path / "7" / "stat").write_text(f"7 (bedrock_server) {' '.join(fields)}\n")
+        (tmp_path / "7" / "status").write_text("Name:\tbedrock_server\nVmHWM:\t  2048 kB\nVmRSS:\t  1024 kB\n")
+        
+        sample = read_process_sample(7, proc=str(tmp_path))
+        
+        assert sample["rss_bytes"] == 1024 * 1024
+        assert sample["peak_rss_bytes"] == 2048 * 1024
+        assert sample["read_bytes"] is None
+        assert sample["write_bytes"] is None
+        assert read_process_sample(8, proc=str(tmp_path)) is None
@@ -1,14 +1,19 @@
 import asyncio
+import json
+import logging
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import ANY, Mock, patch, AsyncMock
 import subprocess
+import tarfile
 from datetime import datetime
 
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from server_wrapper import ServerManager
+from fastapi import HTTPException
+import server_wrapper
+from server_wrapper import ServerManager, ServerSupervisor, update_properties
 
 
 class TestServerManager:
@@ -20,7 +25,7 @@ class TestServerManager:
     def test_init(self, server_manager):
         assert server_manager.process is None
         assert server_manager.running is False
-        assert server_manager.command_history == []
+        assert len(server_manager.command_history) == 0
     
     def test_get_status_not_running(self, server_manager):
         status = server_manager.get_status()
@@ -59,6 +64,19 @@ class TestServerManager:
         assert status == {"status": "stopped", "running": False, "exit_code": 0}
         assert server_manager.running is False
     
+    def test_output_logged_at_server_level_and_collapsed(self, server_manager, caplog):
+        with caplog.at_level(logging.INFO, logger="server_wrapper"):
+            for _ in range(3):
+                server_manager._handle_output_line("[2025-08-09 10:30:15:123 WARN] Chunk lag\n")
+            server_manager._flush_console_filter()
+        
+        assert [(r.levelno, r.getMessage()) for r in caplog.records] == [
+            (logging.WARNING, "[SERVER] [2025-08-09 10:30:15:123 WARN] Chunk lag"),
+            (logging.WARNING, "[SERVER] Previous line repeated 2 times"),
+        ]
+        # Filtering only affects the log; the buffer keeps every line
+        assert server_manager.output_buffer.last_seq == 3
+    
     @pytest.mark.asyncio
     @patch('subprocess.Popen')
     async def test_start_server_success(self, mock_popen, server_manager):
@@ -84,8 +102,10 @@ class TestServerManager:
             text=True,
             bufsize=1,
             universal_newlines=True,
-            cwd='/app'
+            cwd='/app',
+            env=ANY
         )
+        assert mock_popen.call_args.kwargs['env']['LD_LIBRARY_PATH'] == '.'
         
         # Verify thread was started for output monitoring
         mock_thread.assert_called_once()
@@ -134,7 +154,7 @@ class TestServerManager:
         
         # Verify command history
         assert len(server_manager.command_history) == 1
-        assert server_manager.command_history[0]["command"] == "say Hello World"
+        assert server_manager.command_history.recent()[0]["command"] == "say Hello World"
     
     @pytest.mark.asyncio
     async def test_send_command_server_not_running(self, server_manager):
@@ -163,6 +183,51 @@ class TestServerManager:
         
         assert "Failed to send command" in str(exc_info.value)
     
+    @pytest.mark.asyncio
+    async def test_send_commands_single_write(self, server_manager):
+        mock_process = Mock()
+        server_manager.process = mock_process
+        server_manager.running = True
+        commands = ["tp Steve 0 64 0", "give Steve diamond 1", "say done"]
+        
+        result = await server_manager.send_commands(commands)
+        
+        mock_process.stdin.write.assert_called_once_with(
+            "tp Steve 0 64 0\ngive Steve diamond 1\nsay done\n"
+        )
+        mock_process.stdin.flush.assert_called_once()
+        assert result["status"] == "sent"
+        assert result["count"] == 3
+        assert [r["command"] for r in result["results"]] == commands
+        assert len(server_manager.command_history) == 1
+        assert server_manager.command_history.recent()[0]["commands"] == commands
+    
+    @pytest.mark.asyncio
+    async def test_send_commands_rejects_line_breaks(self, server_manager):
+        server_manager.process = Mock()
+        server_manager.running = True
+        
+        with pytest.raises(Exception) as exc_info:
+            await server_manager.send_commands(["say ok", "say one\nstop"])
+        
+        assert "Command 1 contains a line break" in str(exc_info.value)
+        server_manager.process.stdin.write.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_send_commands_large_batch_is_paced(self, server_manager):
+        server_manager.process = Mock()
+        server_manager.running = True
+        commands = [f"say {i}" for i in range(100)]
+        
+        result = await server_manager.send_commands(commands, client="bot")
+        
+        assert result["count"] == 100
+        # The batch left the client's bucket in debt
+        with pytest.raises(HTTPException) as exc_info:
+            await server_manager.send_command("say more", client="bot")
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers["Retry-After"]) >= 3
+    
     @pytest.mark.asyncio
     async def test_stop_server_not_running(self, server_manager):
         server_manager.running = False
@@ -211,4 +276,587 @@ class TestServerManager:
         mock_process.terminate.assert_called_once()
         
         assert result == {"status": "stopped"}
-        assert server_manager.running is False
\ No newline at end of file
+        assert server_manager.running is False
+
+
+class TestInstances:
+    
+    def test_update_properties(self, tmp_path):
+        path = tmp_path / "server.properties"
+        path.write_text("server-name=Test\n# server-port=1\nserver-port=19132\n")
+        
+        update_properties(path, {"server-port": 19134, "level-name": "Lobby"})
+        
+        assert path.read_text() == (
+            "server-name=Test\n# server-port=1\nserver-port=19134\nlevel-name=Lobby\n"
+        )
+    
+    def test_supervisor_from_config(self, tmp_path):
+        config = tmp_path / "instances.json"
+        config.write_text(json.dumps([
+            {"id": "lobby", "directory": str(tmp_path / "lobby"), "port": 19134},
+            {"id": "creative", "directory": str(tmp_path / "creative"),
+             "level_name": "Creative", "autostart": False}
+        ]))
+        
+        supervisor = ServerSupervisor.from_config(str(config))
+        
+        assert list(supervisor.managers) == ["lobby", "creative"]
+        assert supervisor.default.instance_id == "lobby"
+        assert supervisor.autostart == {"lobby"}
+        lobby = supervisor.get("lobby")
+        assert lobby.properties == {"server-port": 19134, "server-portv6": 19135}
+        assert supervisor.get("creative").properties == {"level-name": "Creative"}
+        assert lobby.log_tag == "[SERVER:lobby]"
+    
+    def test_supervisor_default_without_config(self, monkeypatch):
+        monkeypatch.delenv('SERVER_INSTANCES', raising=False)
+        
+        supervisor = ServerSupervisor.from_config()
+        
+        assert list(supervisor.managers) == ["default"]
+        assert supervisor.default.directory == '/app'
+    
+    def test_supervisor_duplicate_ids(self):
+        with pytest.raises(ValueError):
+            ServerSupervisor([ServerManager(instance_id="a"), ServerManager(instance_id="a")])
+    
+    def test_supervisor_unknown_instance(self):
+        supervisor = ServerSupervisor([ServerManager()])
+        
+        with pytest.raises(Exception) as exc_info:
+            supervisor.get("missing")
+        
+        assert "Unknown server: missing" in str(exc_info.value)
+    
+    @pytest.mark.asyncio
+    @patch('subprocess.Popen')
+    async def test_instance_start_uses_own_directory(self, mock_popen, tmp_path):
+        mock_popen.return_value.pid = 4242
+        manager = ServerManager(
+            instance_id="lobby", directory=str(tmp_path),
+            executable="/opt/bedrock/bedrock_server",
+            properties={"server-port": 19134}
+        )
+        
+        with patch('threading.Thread'):
+            result = await manager.start_server()
+        
+        assert result == {"status": "started", "pid": 4242}
+        args, kwargs = mock_popen.call_args
+        assert args[0] == ["/opt/bedrock/bedrock_server"]
+        assert kwargs["cwd"] == str(tmp_path)
+        assert kwargs["env"]["LD_LIBRARY_PATH"] == "/opt/bedrock"
+        assert (tmp_path / "server.properties").read_text() == "server-port=19134\n"
+
+
+class TestShutdown:
+    
+    @pytest.fixture
+    def server_manager(self):
+        import threading
+        
+        server_manager = ServerManager()
+        process = Mock()
+        exited = threading.Event()
+        
+        def wait(timeout=None):
+            if not exited.wait(timeout):
+                raise subprocess.TimeoutExpired("bedrock_server", timeout)
+            return 0
+        process.wait.side_effect = wait
+        process.poll.side_effect = lambda: 0 if exited.is_set() else None
+        process.pid = 12345
+        
+        server_manager.process = process
+        server_manager.running = True
+        server_manager.exited = exited
+        return server_manager
+    
+    @pytest.mark.asyncio
+    async def test_returns_when_server_quits(self, server_manager):
+        def on_stop(*args):
+            server_manager._handle_output_line("Saving...")
+            server_manager._handle_output_line("Quit correctly")
+            server_manager.exited.set()
+        server_manager.process.stdin.flush.side_effect = on_stop
+        
+        result = await asyncio.wait_for(server_manager.stop_server(), timeout=5)
+        
+        assert result == {"status": "stopped"}
+        server_manager.process.terminate.assert_not_called()
+        assert server_manager._captures == []
+    
+    @pytest.mark.asyncio
+    async def test_terminates_after_grace_when_process_lingers(self, server_manager):
+        server_manager.process.stdin.flush.side_effect = (
+            lambda: server_manager._handle_output_line("Quit correctly")
+        )
+        server_manager.process.terminate.side_effect = server_manager.exited.set
+        
+        with patch('server_wrapper.SHUTDOWN_GRACE', 0.1):
+            result = await asyncio.wait_for(server_manager.stop_server(), timeout=5)
+        
+        assert result == {"status": "stopped"}
+        server_manager.process.terminate.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_status_and_concurrent_stop_during_shutdown(self, server_manager):
+        first = asyncio.ensure_future(server_manager.stop_server())
+        await asyncio.sleep(0.05)
+        
+        # The event loop stays free while the world saves
+        assert server_manager.get_status()["status"] == "stopping"
+        second = asyncio.ensure_future(server_manager.stop_server())
+        
+        server_manager._handle_output_line("Quit correctly")
+        server_manager.exited.set()
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=5)
+        
+        assert results == [{"status": "stopped"}, {"status": "stopped"}]
+        server_manager.process.stdin.write.assert_called_once_with("stop\n")
+        assert server_manager.get_status() == {"status": "stopped", "running": False}
+
+
+class TestLifecycle:
+    
+    @pytest.fixture
+    def server_manager(self):
+        server_manager = ServerManager()
+        server_manager.process = Mock()
+        server_manager.process.poll.return_value = None
+        server_manager.running = True
+        server_manager.state = "starting"
+        return server_manager
+    
+    def test_output_drives_state(self, server_manager):
+        server_manager._handle_output_line("[INFO] Level Name: Bedrock level")
+        assert server_manager.state == "loading"
+        assert server_manager.ready is False
+        
+        server_manager._handle_output_line("[INFO] Server started.")
+        assert server_manager.state == "ready"
+        assert server_manager.ready is True
+        
+        server_manager._handle_output_line("[INFO] Server stop requested.")
+        assert server_manager.state == "stopping"
+    
+    def test_old_monitor_leaves_restarted_server_alone(self, server_manager):
+        old, new = server_manager.process, Mock()
+        new.poll.return_value = None
+        
+        def restart():
+            # The server is restarted before the old monitor sees end of output
+            server_manager.process = new
+            server_manager._handle_output_line("Server started.")
+            return ''
+        old.stdout.readline.side_effect = restart
+        old.wait.return_value = 0
+        
+        server_manager._monitor_output()
+        
+        assert server_manager.state == "ready"
+        new.wait.assert_not_called()
+    
+    def test_monitor_marks_own_process_stopped(self, server_manager):
+        server_manager.process.stdout.readline.return_value = ''
+        server_manager.process.wait.return_value = 0
+        
+        server_manager._monitor_output()
+        
+        assert server_manager.state == "stopped"
+    
+    @pytest.mark.asyncio
+    async def test_wait_until_ready_from_monitor_thread(self, server_manager):
+        import threading
+        
+        timer = threading.Timer(0.05, server_manager._handle_output_line, args=("Server started.",))
+        timer.start()
+        
+        result = await server_manager.wait_until_ready(timeout=5)
+        
+        assert result == {"ready": True, "state": "ready"}
+        assert server_manager._state_waiters == []
+    
+    @pytest.mark.asyncio
+    async def test_state_change_while_registering_waiter(self, server_manager):
+        import threading
+        
+        class Waiters(list):
+            def append(self, waiter):
+                # The monitor thread reaches "ready" between the check and the registration
+                monitor = threading.Thread(target=server_manager._set_state, args=("ready",))
+                monitor.start()
+                monitor.join(0.05)
+                super().append(waiter)
+        server_manager._state_waiters = Waiters()
+        
+        assert await server_manager.wait_for_state({"ready"}, timeout=1) == "ready"
+    
+    @pytest.mark.asyncio
+    async def test_wait_until_ready_process_exits(self, server_manager):
+        waiter = asyncio.ensure_future(server_manager.wait_until_ready(timeout=5))
+        await asyncio.sleep(0)
+        server_manager._set_state("stopped")
+        
+        assert await waiter == {"ready": False, "state": "stopped"}
+    
+    @pytest.mark.asyncio
+    async def test_wait_until_ready_timeout(self, server_manager):
+        result = await server_manager.wait_until_ready(timeout=0.05)
+        assert result == {"ready": False, "state": "starting"}
+    
+    @pytest.mark.asyncio
+    async def test_wait_until_ready_not_running(self):
+        result = await ServerManager().wait_until_ready(timeout=5)
+        assert result == {"ready": False, "state": "stopped"}
+
+
+class TestCommandResponse:
+    
+    @pytest.fixture
+    def server_manager(self):
+        server_manager = ServerManager()
+        server_manager.process = Mock()
+        server_manager.running = True
+        return server_manager
+    
+    @pytest.mark.asyncio
+    async def test_wait_for_match_from_monitor_thread(self, server_manager):
+        import threading
+        
+        def reply(*args):
+            # Output arrives on the monitor thread, not the event loop
+            lines = ["There are 1/10 players online:", "Steve"]
+            threading.Thread(
+                target=lambda: [server_manager._handle_output_line(f"{l}\n") for l in lines]
+            ).start()
+        server_manager.process.stdin.flush.side_effect = reply
+        
+        result = await server_manager.send_command("list", wait=True, match="players online")
+        
+        assert result["status"] == "completed"
+        assert result["command"] == "list"
+        assert result["output"] == ["There are 1/10 players online:"]
+        assert server_manager._captures == []
+    
+    @pytest.mark.asyncio
+    async def test_wait_without_match_stops_when_quiet(self, server_manager):
+        def reply(*args):
+            server_manager._handle_output_line("Day is 3")
+            server_manager._handle_output_line("Time is 6000")
+        server_manager.process.stdin.flush.side_effect = reply
+        
+        result = await server_manager.send_command("time query daytime", wait=True, timeout=10)
+        
+        assert result["status"] == "completed"
+        assert result["output"] == ["Day is 3", "Time is 6000"]
+    
+    @pytest.mark.asyncio
+    async def test_wait_timed_out(self, server_manager):
+        result = await server_manager.send_command("list", wait=True, timeout=0.05, match="online")
+        
+        assert result["status"] == "timed_out"
+        assert result["output"] == []
+        assert len(server_manager.command_history) == 1
+    
+    @pytest.mark.asyncio
+    async def test_wait_invalid_pattern(self, server_manager):
+        with pytest.raises(Exception) as exc_info:
+            await server_manager.send_command("list", wait=True, match="(")
+        
+        assert "Invalid match pattern" in str(exc_info.value)
+        assert len(server_manager.command_history) == 0
+
+
+# Stand-in for bedrock_server: echoes each stdin line and exits on "stop"
+FAKE_SERVER = """
+import sys
+print("Opening level 'worlds/Bedrock level/db'", flush=True)
+print("Server started.", flush=True)
+for line in sys.stdin:
+    line = line.strip()
+    print(f"echo: {line}", flush=True)
+    if line == "stop":
+        print("Quit correctly", flush=True)
+        break
+"""
+
+
+@pytest.fixture
+def fake_server_exec():
+    """Run FAKE_SERVER in place of ./bedrock_server for the asyncio engine"""
+    real_exec = asyncio.create_subprocess_exec
+    
+    async def spawn(*args, **kwargs):
+        kwargs.pop('cwd', None)
+        return await real_exec(sys.executable, '-c', FAKE_SERVER, **kwargs)
+    
+    with patch('asyncio.create_subprocess_exec', side_effect=spawn) as mock_exec:
+        yield mock_exec
+
+
+class TestAsyncioEngine:
+    
+    def test_engine_from_environment(self, monkeypatch):
+        monkeypatch.setenv('SERVER_ENGINE', 'asyncio')
+        assert ServerManager().engine == "asyncio"
+    
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            ServerManager(engine="fork")
+    
+    @pytest.mark.asyncio
+    async def test_start_send_stop(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        lines = []
+        server_manager._handle_output_line = lambda line: lines.append(line.strip())
+        
+        result = await server_manager.start_server()
+        assert result["status"] == "started"
+        assert server_manager.get_status()["running"] is True
+        
+        await asyncio.gather(*(server_manager.send_command(f"say {i}") for i in range(5)))
+        assert len(server_manager.command_history) == 5
+        
+        result = await server_manager.stop_server()
+        assert result == {"status": "stopped"}
+        assert server_manager.running is False
+        assert lines[:2] == ["Opening level 'worlds/Bedrock level/db'", "Server started."]
+        assert [f"echo: say {i}" for i in range(5)] == lines[2:7]
+        assert "Quit correctly" in lines
+    
+    @pytest.mark.asyncio
+    async def test_send_command_wait(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        await server_manager.start_server()
+        # Let the startup banner go by before capturing
+        await server_manager.send_command("say ready", wait=True, match="echo: say ready")
+        
+        result = await server_manager.send_command("list", wait=True)
+        assert result["status"] == "completed"
+        assert result["output"] == ["echo: list"]
+        
+        result = await server_manager.send_command("stop", wait=True, match="Quit")
+        assert result["output"] == ["echo: stop", "Quit correctly"]
+        await server_manager.stop_server()
+    
+    @pytest.mark.asyncio
+    async def test_lifecycle_until_ready_and_stopped(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        assert server_manager.state == "stopped"
+        
+        await server_manager.start_server()
+        result = await server_manager.wait_until_ready(timeout=5)
+        
+        assert result == {"ready": True, "state": "ready"}
+        assert server_manager.ready is True
+        
+        await server_manager.stop_server()
+        assert server_manager.state == "stopped"
+        assert server_manager.ready is False
+    
+    @pytest.mark.asyncio
+    async def test_send_command_after_exit(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        await server_manager.start_server()
+        await server_manager.send_command("stop")
+        await server_manager.process.wait(timeout=5)
+        
+        status = server_manager.get_status()
+        assert status == {"status": "stopped", "running": False, "exit_code": 0}
+    
+    @pytest.mark.asyncio
+    async def test_oversized_output_line_is_skipped(self, fake_server_exec, monkeypatch):
+        monkeypatch.setattr(server_wrapper, 'OUTPUT_LINE_LIMIT', 1024)
+        server_manager = ServerManager(engine="asyncio")
+        await server_manager.start_server()
+        await server_manager.wait_until_ready(timeout=5)
+        
+        await server_manager.send_command("say " + "x" * 5000)
+        result = await server_manager.send_command("say after", wait=True, match="echo: say after")
+        
+        assert result["status"] == "completed"
+        assert server_manager.state == "ready"
+        lines = [entry["line"] for entry in server_manager.output_buffer.read(since=0)["lines"]]
+        assert "echo: say after" in lines
+        assert all(len(line) < 1024 for line in lines)
+        await server_manager.stop_server()
+    
+    @pytest.mark.asyncio
+    async def test_cancel_fails_queued_and_in_flight_writes(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        await server_manager.start_server()
+        stalled = asyncio.Event()
+        
+        async def stall():
+            stalled.set()
+            await asyncio.Event().wait()
+        
+        server_manager.process.stdin.drain = stall
+        in_flight = asyncio.ensure_future(server_manager._write_stdin("say one\n"))
+        await stalled.wait()
+        queued = asyncio.ensure_future(server_manager._write_stdin("say two\n"))
+        await asyncio.sleep(0)
+        
+        server_manager._cancel_tasks()
+        
+        for write in (in_flight, queued):
+            with pytest.raises(BrokenPipeError):
+                await asyncio.wait_for(write, timeout=1)
+        with pytest.raises(BrokenPipeError):
+            await server_manager._write_stdin("say three\n")
+        server_manager.process.kill()
+        await server_manager.process.wait(timeout=5)
+    
+    @pytest.mark.asyncio
+    async def test_write_cut_off_by_stop_does_not_wedge_scheduler(self, fake_server_exec):
+        server_manager = ServerManager(engine="asyncio")
+        await server_manager.start_server()
+        stalled = asyncio.Event()
+        
+        async def stall():
+            stalled.set()
+            await asyncio.Event().wait()
+        
+        server_manager.process.stdin.drain = stall
+        stuck = asyncio.ensure_future(server_manager.send_command("say stuck"))
+        await stalled.wait()
+        server_manager._cancel_tasks()
+        server_manager.process.kill()
+        await server_manager.process.wait(timeout=5)
+        server_manager.running = False
+        with pytest.raises(HTTPException):
+            await asyncio.wait_for(stuck, timeout=1)
+        
+        await server_manager.start_server()
+        result = await asyncio.wait_for(server_manager.send_command("say ping"), timeout=5)
+        
+        assert result["status"] == "sent"
+        await server_manager.stop_server()
+
+FAKE_SAVING_SERVER = """
+import os, sys
+worlds = sys.argv[1]
+queries = 0
+print("Server started.", flush=True)
+for line in sys.stdin:
+    line = line.strip()
+    if line == "save hold":
+        print("Saving...", flush=True)
+    elif line == "save query":
+        queries += 1
+        if queries == 1:
+            print("A previous save has not been completed.", flush=True)
+            continue
+        files = []
+        for root, _, names in os.walk(worlds):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                files.append(f"{os.path.relpath(path, worlds)}:{os.path.getsize(path) - 1}")
+        print("Data saved. Files are now ready to be copied.", flush=True)
+        print(", ".join(files), flush=True)
+    elif line == "save resume":
+        print("Changes to the level are resumed.", flush=True)
+    elif line == "stop":
+        print("Quit correctly", flush=True)
+        break
+"""
+
+
+class TestBackup:
+    
+    @pytest.fixture
+    def saving_server(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BACKUP_DIR', str(tmp_path / "backups"))
+        db = tmp_path / "worlds" / "Bedrock level" / "db"
+        db.mkdir(parents=True)
+        (db / "000005.ldb").write_bytes(b"table-data")
+        (db / "CURRENT").write_bytes(b"MANIFEST-000004\n")
+        real_exec = asyncio.create_subprocess_exec
+        
+        async def spawn(*args, **kwargs):
+            kwargs.pop('cwd', None)
+            return await real_exec(sys.executable, '-c', FAKE_SAVING_SERVER,
+                                   str(tmp_path / "worlds"), **kwargs)
+        
+        with patch('asyncio.create_subprocess_exec', side_effect=spawn):
+            yield ServerManager(engine="asyncio", directory=str(tmp_path))
+    
+    @pytest.mark.asyncio
+    async def test_online_backup_uses_save_protocol(self, saving_server):
+        await saving_server.start_server()
+        await saving_server.wait_until_ready(timeout=5)
+        
+        snapshot = await saving_server.backup(label="nightly")
+        commands = [entry["command"] for entry in saving_server.command_history.recent()]
+        await saving_server.stop_server()
+        
+        assert commands == ["save hold", "save query", "save query", "save resume"]
+        assert snapshot["online"] is True
+        assert snapshot["label"] == "nightly"
+        manifest = saving_server.backups.load(snapshot["id"])
+        ldb = manifest["files"]["Bedrock level/db/000005.ldb"]
+        # Only the length reported by save query is copied
+        assert saving_server.backups.object_path(ldb["hash"]).read_bytes() == b"table-dat"
+    
+    @pytest.mark.asyncio
+    async def test_offline_backup_and_restore(self, saving_server, tmp_path):
+        snapshot = await saving_server.backup()
+        current = tmp_path / "worlds" / "Bedrock level" / "db" / "CURRENT"
+        current.write_bytes(b"MANIFEST-000009\n")
+        
+        result = await saving_server.restore(snapshot["id"])
+        
+        assert snapshot["online"] is False
+        assert result["levels"] == ["Bedrock level"]
+        assert current.read_bytes() == b"MANIFEST-000004\n"
+        assert "server" not in result
+    
+    @pytest.mark.asyncio
+    async def test_interrupted_import_releases_store(self, saving_server):
+        info = tarfile.TarInfo("Bedrock level/db/000007.ldb")
+        info.size = 10_000
+        
+        async def upload():
+            yield info.tobuf()
+            raise ConnectionResetError("client went away")
+        
+        with pytest.raises(ConnectionResetError):
+            await saving_server.import_world(upload())
+        
+        snapshot = await asyncio.wait_for(saving_server.backup(), timeout=5)
+        
+        assert [s["id"] for s in saving_server.backups.list()] == [snapshot["id"]]
+    
+    @pytest.mark.asyncio
+    async def test_restore_checks_objects_before_stopping(self, saving_server):
+        snapshot = await saving_server.backup()
+        manifest = saving_server.backups.load(snapshot["id"])
+        for entry in manifest["files"].values():
+            saving_server.backups.object_path(entry["hash"]).unlink(missing_ok=True)
+        await saving_server.start_server()
+        await saving_server.wait_until_ready(timeout=5)
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await saving_server.restore(snapshot["id"])
+        
+        assert exc_info.value.status_code == 409
+        assert saving_server.state == "ready"
+        await saving_server.stop_server()
+    
+    @pytest.mark.asyncio
+    async def test_failed_restore_restarts_server(self, saving_server, monkeypatch):
+        snapshot = await saving_server.backup()
+        await saving_server.start_server()
+        await saving_server.wait_until_ready(timeout=5)
+        
+        def fail(*args):
+            raise OSError("disk full")
+        monkeypatch.setattr(saving_server.backups, "restore", fail)
+        
+        with pytest.raises(OSError):
+            await saving_server.restore(snapshot["id"])
+        
+        assert saving_server.running is True
+        await saving_server.stop_server()